@@ -0,0 +1,91 @@
+# adzuna_stub_server.py
+"""
+Local stand-in for the Adzuna search API, for testing ingest_jobs.py offline.
+
+    python adzuna_stub_server.py --jobs-per-query 500 --latency 0.05 --fail-rate 0.05
+    ADZUNA_API_URL=http://127.0.0.1:8001/v1/api/jobs/us/search \\
+        ADZUNA_APP_ID=stub ADZUNA_APP_KEY=stub python ingest_jobs.py --async --rate 50
+
+Results are deterministic: each query has `jobs_per_query` postings, served
+newest first, and `--new-jobs` extra postings can be published on restart
+to exercise incremental runs.
+"""
+import argparse
+import json
+import random
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+SAMPLE_SKILLS = ["Python", "SQL", "AWS", "Docker", "Kubernetes", "TensorFlow", "PyTorch", "Django", "REST APIs", "CI/CD"]
+
+
+def make_job(query: str, number: int) -> dict:
+    """The `number`-th posting for a query (higher numbers are newer)."""
+    seed = zlib.crc32(f"{query}:{number}".encode("utf-8"))
+    rng = random.Random(seed)
+    skills = rng.sample(SAMPLE_SKILLS, 3)
+    return {
+        "id": str(1_000_000_000 + seed % 1_000_000_000),
+        "title": f"{query.title()} #{number}",
+        "company": {"display_name": f"Stub Company {seed % 97}"},
+        "description": f"We are hiring a {query} with experience in {', '.join(skills)} and data analysis.",
+    }
+
+
+class StubAdzunaHandler(BaseHTTPRequestHandler):
+    jobs_per_query = 500
+    new_jobs = 0
+    latency = 0.0
+    fail_rate = 0.0
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        try:
+            page = int(url.path.rstrip("/").rsplit("/", 1)[-1])
+        except ValueError:
+            self.send_error(404)
+            return
+        params = parse_qs(url.query)
+        query = params.get("what", [""])[0]
+        per_page = int(params.get("results_per_page", ["50"])[0])
+
+        time.sleep(self.latency)
+        if random.random() < self.fail_rate:
+            self.send_error(503, "Stub failure")
+            return
+
+        total = self.jobs_per_query + self.new_jobs
+        newest = total - (page - 1) * per_page
+        numbers = range(newest, max(0, newest - per_page), -1)
+        body = json.dumps({"count": total, "results": [make_job(query, n) for n in numbers]}).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # Keep the output readable under load
+
+
+def serve(host: str = "127.0.0.1", port: int = 8001) -> ThreadingHTTPServer:
+    return ThreadingHTTPServer((host, port), StubAdzunaHandler)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve a local stub of the Adzuna search API.")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--jobs-per-query", type=int, default=500)
+    parser.add_argument("--new-jobs", type=int, default=0, help="Extra postings per query, for incremental runs.")
+    parser.add_argument("--latency", type=float, default=0.05, help="Seconds added to every response.")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="Fraction of requests answered with 503.")
+    args = parser.parse_args()
+
+    StubAdzunaHandler.jobs_per_query = args.jobs_per_query
+    StubAdzunaHandler.new_jobs = args.new_jobs
+    StubAdzunaHandler.latency = args.latency
+    StubAdzunaHandler.fail_rate = args.fail_rate
+    print(f"Stub Adzuna API listening on http://127.0.0.1:{args.port}/v1/api/jobs/us/search/<page>")
+    serve(port=args.port).serve_forever()
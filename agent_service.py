@@ -0,0 +1,480 @@
+# agent_service.py
+"""
+One FastAPI service for all the BrainFog agents.
+
+    uvicorn agent_service:app --port 8003
+    curl -N -X POST localhost:8003/wellbeing/stream -H 'Content-Type: application/json' -d '{"message": "hey"}'
+
+Every agent has its own endpoint(s) and its own limiter: at most
+`concurrency` requests run at once, up to `queue` more wait, and anything
+beyond that gets an immediate 429 with Retry-After instead of piling up.
+So a slow agent (syllabus roadmaps, group solving) fills its own queue
+without starving the others. Limits come from AGENT_LIMITS below and can be
+overridden with AGENT_<NAME>_CONCURRENCY / AGENT_<NAME>_QUEUE.
+
+LLM-bound graphs run on the event loop. CPU-bound work (group solving,
+batch scheduling, cohort risk scoring) runs in a process pool of
+AGENT_CPU_WORKERS processes; tutor retrieval runs in a thread, since NumPy
+releases the GIL and the index is already shared memory.
+
+The /stream endpoints send `token` events ({"text": ...}) followed by one
+`done` event with the rest of the result, or an `error` event. If the client
+disconnects, the graph run is cancelled and the upstream LLM stream is
+closed, so no more tokens are generated. /metrics reports per-agent limiter
+counters, stream time to first token, the shared LLM gateway's metrics and,
+with AGENT_INSTRUMENTATION=1, per-node metrics (see instrumentation.py), which
+/metrics/prometheus serves in the Prometheus text format.
+"""
+import asyncio
+import json
+import multiprocessing
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from pydantic import BaseModel, Field
+
+import content_copilot
+import digest_generator
+import early_intervention
+import group_matching
+import instrumentation
+import personalised_planner
+import study_scheduler
+import syllabus_agent
+import tutor_agent
+import wellbeing_assistant
+from llm_gateway import get_gateway
+
+# agent: (concurrency, queue)
+AGENT_LIMITS = {
+    "wellbeing": (32, 64),
+    "tutor": (16, 32),
+    "planner": (8, 16),
+    "syllabus": (4, 8),
+    "quiz": (4, 8),
+    "groups": (2, 4),
+    "digest": (8, 16),
+    "early_intervention": (4, 8),
+}
+CPU_WORKERS = int(os.getenv("AGENT_CPU_WORKERS", str(os.cpu_count() or 2)))
+MAX_GROUP_SOLVER_SECONDS = 10.0
+
+
+class Reservation:
+    """
+    One admitted request's place in an AgentLimiter: counted as waiting from
+    the moment it is admitted, as running once it holds a slot. `release()`
+    is idempotent, so the handler and the stream can both call it.
+    """
+
+    def __init__(self, limiter: "AgentLimiter"):
+        self.limiter = limiter
+        self.created = time.perf_counter()
+        self.state = "waiting"
+        limiter.waiting += 1
+
+    async def acquire(self):
+        await self.limiter._semaphore.acquire()
+        self.limiter.waiting -= 1
+        self.limiter.running += 1
+        self.state = "running"
+
+    def release(self):
+        if self.state == "waiting":
+            self.limiter.waiting -= 1
+        elif self.state == "running":
+            self.limiter.running -= 1
+            self.limiter._semaphore.release()
+        self.state = "released"
+
+
+class AgentLimiter:
+    """Concurrency cap plus a bounded wait queue for one agent, with its request counters."""
+
+    def __init__(self, name: str, concurrency: int, queue: int, window: int = 1000):
+        self.name = name
+        self.concurrency = concurrency
+        self.queue = queue
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self.running = 0
+        self.waiting = 0
+        self.completed = 0
+        self.errors = 0
+        self.rejected = 0
+        self.latencies = deque(maxlen=window)
+
+    @classmethod
+    def from_env(cls, name: str, concurrency: int, queue: int) -> "AgentLimiter":
+        key = name.upper()
+        return cls(name, int(os.getenv(f"AGENT_{key}_CONCURRENCY", concurrency)),
+                   int(os.getenv(f"AGENT_{key}_QUEUE", queue)))
+
+    def reserve(self) -> Reservation:
+        """
+        Admits a request, or raises a 429 if every slot is busy and the queue
+        is full. The reservation counts against the queue straight away, with
+        no await in between, so a concurrent burst can't all pass the check.
+        """
+        if self.running + self.waiting >= self.concurrency + self.queue:
+            self.rejected += 1
+            raise HTTPException(status_code=429, detail=f"The {self.name} agent is busy. Please retry shortly.",
+                                headers={"Retry-After": "1"})
+        return Reservation(self)
+
+    @asynccontextmanager
+    async def run(self, reservation: Reservation):
+        """Waits for a slot for an admitted request, and gives it back on exit."""
+        try:
+            await reservation.acquire()
+            try:
+                yield
+                self.completed += 1
+                self.latencies.append(time.perf_counter() - reservation.created)
+            except Exception:
+                self.errors += 1
+                raise
+        finally:
+            reservation.release()
+
+    @asynccontextmanager
+    async def slot(self):
+        async with self.run(self.reserve()):
+            yield
+
+    def snapshot(self) -> Dict[str, float]:
+        latencies = sorted(self.latencies)
+
+        def percentile(p: float) -> float:
+            return latencies[min(len(latencies) - 1, int(p * len(latencies)))] if latencies else 0.0
+
+        return {
+            "concurrency": self.concurrency,
+            "queue": self.queue,
+            "running": self.running,
+            "waiting": self.waiting,
+            "completed": self.completed,
+            "errors": self.errors,
+            "rejected": self.rejected,
+            "latency_p50_seconds": percentile(0.50),
+            "latency_p95_seconds": percentile(0.95),
+        }
+
+
+LIMITERS: Dict[str, AgentLimiter] = {name: AgentLimiter.from_env(name, *limits)
+                                     for name, limits in AGENT_LIMITS.items()}
+
+_POOL: Optional[ProcessPoolExecutor] = None
+
+
+def get_pool() -> ProcessPoolExecutor:
+    global _POOL
+    if _POOL is None:
+        # Spawned workers import only the modules the submitted functions need,
+        # and don't inherit the event loop or the gateway's connections
+        _POOL = ProcessPoolExecutor(max_workers=CPU_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+    return _POOL
+
+
+async def run_cpu(function: Callable, *args) -> Any:
+    return await asyncio.get_running_loop().run_in_executor(get_pool(), function, *args)
+
+
+async def run_agent(agent: str, work: Callable[[], Awaitable[Any]]) -> Any:
+    async with LIMITERS[agent].slot():
+        with instrumentation.trace(agent):
+            return await work()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Importing the agents is cheap; build the streaming graphs and the tutor
+    # index (and load LangGraph) before serving, so the first request doesn't pay for it
+    tutor_agent.get_app()
+    tutor_agent.get_index()
+    wellbeing_assistant.get_app()
+    yield
+    global _POOL
+    if _POOL is not None:
+        _POOL.shutdown(cancel_futures=True)
+        _POOL = None
+
+app = FastAPI(title="BrainFog Agent Service", lifespan=lifespan)
+
+
+class WellbeingRequest(BaseModel):
+    message: str
+
+
+class TutorRequest(BaseModel):
+    question: str
+
+
+class PlannerRequest(BaseModel):
+    profile: Dict[str, Any]
+    weeks: int = 1
+
+
+class PlannerBatchRequest(BaseModel):
+    profiles: List[Dict[str, Any]]
+    weeks: int = 1
+
+
+class SyllabusRequest(BaseModel):
+    text: str
+
+
+class QuizRequest(BaseModel):
+    content: str
+
+
+class GroupsRequest(BaseModel):
+    profiles: List[Dict[str, Any]]
+    group_size: int = Field(3, ge=2)
+    time_limit: float = group_matching.GROUP_SOLVER_SECONDS
+
+
+class DigestRequest(BaseModel):
+    record: Dict[str, Any]
+
+
+class StudentRequest(BaseModel):
+    student: Dict[str, Any]
+
+
+class ScreenRequest(BaseModel):
+    students: List[Dict[str, Any]]
+    threshold: float = early_intervention.RISK_THRESHOLD
+    limit: Optional[int] = None
+
+
+class StreamMetrics:
+    """Per-agent stream counters and a window of recent times to first byte."""
+
+    def __init__(self, window: int = 1000):
+        self.streams = 0
+        self.completed = 0
+        self.cancelled = 0
+        self.errors = 0
+        self.first_byte_latencies = deque(maxlen=window)
+
+    def snapshot(self) -> Dict[str, float]:
+        latencies = sorted(self.first_byte_latencies)
+
+        def percentile(p: float) -> float:
+            return latencies[min(len(latencies) - 1, int(p * len(latencies)))] if latencies else 0.0
+
+        return {
+            "streams": self.streams,
+            "completed": self.completed,
+            "cancelled": self.cancelled,
+            "errors": self.errors,
+            "ttfb_p50_seconds": percentile(0.50),
+            "ttfb_p95_seconds": percentile(0.95),
+        }
+
+
+STREAM_METRICS: Dict[str, StreamMetrics] = {"wellbeing": StreamMetrics(), "tutor": StreamMetrics()}
+
+
+def sse_event(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+_END_OF_RUN = object()
+
+
+async def stream_graph(agent: str, graph, inputs: dict, summarize: Callable[[dict], dict],
+                       reservation: Reservation) -> AsyncIterator[str]:
+    """
+    Runs the graph and turns its custom-stream tokens into SSE events.
+
+    The run happens in its own task feeding a queue. Starlette cancels this
+    generator when the client disconnects, and we then cancel the task
+    explicitly: cancelling the graph's iterator from inside Starlette's
+    cancel scope would also cancel LangGraph's own cleanup and leave the node
+    (and its LLM stream) running.
+
+    The endpoint has already reserved a place with the agent's limiter; the
+    slot is taken and released here, and sse_response releases the
+    reservation too in case this generator never starts.
+    """
+    async with LIMITERS[agent].run(reservation):
+        with instrumentation.trace(f"{agent}/stream"):
+            async for event in _stream_events(agent, graph, inputs, summarize):
+                yield event
+
+
+async def _stream_events(agent: str, graph, inputs: dict, summarize: Callable[[dict], dict]) -> AsyncIterator[str]:
+    metrics = STREAM_METRICS[agent]
+    metrics.streams += 1
+    start = time.perf_counter()
+    first_byte = True
+    state = {}
+    queue: asyncio.Queue = asyncio.Queue()
+
+    async def run():
+        try:
+            async for update in graph.astream(inputs, stream_mode=["custom", "values"]):
+                queue.put_nowait(update)
+        finally:
+            queue.put_nowait(_END_OF_RUN)
+
+    task = asyncio.create_task(run())
+    try:
+        while (update := await queue.get()) is not _END_OF_RUN:
+            mode, chunk = update
+            if mode == "values":
+                state = chunk
+            elif "token" in chunk:
+                if first_byte:
+                    metrics.first_byte_latencies.append(time.perf_counter() - start)
+                    first_byte = False
+                yield sse_event("token", {"text": chunk["token"]})
+        await task  # Raises the graph's error, if it failed
+        metrics.completed += 1
+        yield sse_event("done", summarize(state))
+    except (GeneratorExit, asyncio.CancelledError):
+        metrics.cancelled += 1
+        raise
+    except Exception as e:
+        metrics.errors += 1
+        yield sse_event("error", {"detail": str(e)})
+    finally:
+        task.cancel()
+
+
+class ReservedStreamingResponse(StreamingResponse):
+    """Releases the request's limiter reservation once the response is over, however it ended."""
+
+    def __init__(self, content: AsyncIterator[str], reservation: Reservation, **kwargs):
+        super().__init__(content, **kwargs)
+        self.reservation = reservation
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            # A client that disconnects before the first chunk leaves the generator unstarted,
+            # so its own cleanup never runs
+            self.reservation.release()
+
+
+def sse_response(events: AsyncIterator[str], reservation: Reservation) -> StreamingResponse:
+    # No proxy buffering, so each token reaches the client as soon as it's sent
+    return ReservedStreamingResponse(events, reservation, media_type="text/event-stream",
+                                     headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+@app.post("/wellbeing")
+async def wellbeing(request: WellbeingRequest):
+    result = await run_agent("wellbeing", lambda: wellbeing_assistant.get_app().ainvoke(
+        {"student_input": request.message}))
+    return {"intent": result.get("classified_intent"), "response": result.get("agent_response")}
+
+
+@app.post("/wellbeing/stream")
+async def wellbeing_stream(request: WellbeingRequest):
+    graph = wellbeing_assistant.get_app()
+    reservation = LIMITERS["wellbeing"].reserve()
+    return sse_response(stream_graph("wellbeing", graph, {"student_input": request.message},
+                                     lambda state: {"intent": state.get("classified_intent")}, reservation),
+                        reservation)
+
+
+@app.post("/tutor")
+async def tutor(request: TutorRequest):
+    result = await run_agent("tutor", lambda: tutor_agent.get_app().ainvoke({"question": request.question}))
+    return {"answer": result.get("answer"), "grounded": bool(result.get("documents"))}
+
+
+@app.post("/tutor/stream")
+async def tutor_stream(request: TutorRequest):
+    graph = tutor_agent.get_app()
+    reservation = LIMITERS["tutor"].reserve()
+    return sse_response(stream_graph("tutor", graph, {"question": request.question},
+                                     lambda state: {"grounded": bool(state.get("documents"))}, reservation),
+                        reservation)
+
+
+@app.post("/planner")
+async def planner(request: PlannerRequest):
+    result = await run_agent("planner", lambda: personalised_planner.get_app().ainvoke(
+        {"student_profile": request.profile, "weeks": request.weeks}))
+    return result["final_plan"]
+
+
+@app.post("/planner/batch")
+async def planner_batch(request: PlannerBatchRequest):
+    # Pure scheduling, no LLM: the whole batch is one job in the process pool
+    plans = await run_agent("planner", lambda: run_cpu(study_scheduler.schedule_batch, request.profiles,
+                                                       request.weeks, 1))
+    return {"plans": plans}
+
+
+@app.post("/syllabus")
+async def syllabus(request: SyllabusRequest):
+    return await run_agent("syllabus", lambda: syllabus_agent.generate_roadmap(request.text))
+
+
+@app.post("/quiz")
+async def quiz(request: QuizRequest):
+    return await run_agent("quiz", lambda: content_copilot.generate_quiz(request.content))
+
+
+@app.post("/groups")
+async def groups(request: GroupsRequest):
+    async def work():
+        # The solver holds the CPU for up to time_limit, so it runs in the pool
+        try:
+            planned = await run_cpu(group_matching.plan_groups, request.profiles, request.group_size,
+                                    min(request.time_limit, MAX_GROUP_SOLVER_SECONDS))
+        except ValueError as e:
+            raise HTTPException(status_code=422, detail=str(e))
+        return await group_matching.justify_groups(planned)
+
+    return await run_agent("groups", work)
+
+
+@app.post("/digest")
+async def digest(request: DigestRequest):
+    result = await run_agent("digest", lambda: digest_generator.get_app().ainvoke({"raw_data": request.record}))
+    return result["final_digest"]
+
+
+@app.post("/early-intervention")
+async def early_intervention_student(request: StudentRequest):
+    result = await run_agent("early_intervention", lambda: early_intervention.get_app().ainvoke(
+        {"student_data": request.student}))
+    return {key: result[key] for key in ("analysis_findings", "risk_score", "core_problem", "recommendations")}
+
+
+@app.post("/early-intervention/screen")
+async def early_intervention_screen(request: ScreenRequest):
+    async def work():
+        ranking = await run_cpu(early_intervention.rank_records, request.students, request.threshold,
+                                request.limit, time.time())
+        return await early_intervention.add_plans(ranking)
+
+    return await run_agent("early_intervention", work)
+
+
+@app.get("/metrics")
+async def metrics():
+    return {
+        "agents": {agent: limiter.snapshot() for agent, limiter in LIMITERS.items()},
+        "streams": {agent: stream_metrics.snapshot() for agent, stream_metrics in STREAM_METRICS.items()},
+        "llm": get_gateway().metrics.snapshot(),
+        "nodes": instrumentation.snapshot(),
+    }
+
+
+@app.get("/metrics/prometheus")
+async def prometheus_metrics():
+    # Per-node metrics; empty unless the service runs with AGENT_INSTRUMENTATION=1
+    return PlainTextResponse(instrumentation.render_prometheus(), media_type="text/plain; version=0.0.4")
@@ -0,0 +1,492 @@
+# benchmark_suite.py
+"""
+Benchmark suite for the career service and the agents, in two layers. Both
+write one JSON report (--output), and `compare` lines two reports up, so a
+change can be measured against the run before it.
+
+micro   Synthetic job corpora at each of --sizes (1k to 1M jobs by default).
+        Every case runs in a fresh process, so its peak RSS is its own:
+        - load_json: jobs.json -> JobSnapshot, including the BM25 index;
+        - keyword_search: BM25 `keyword_job_search`, per query;
+        - skill_extraction: `extract_skills_from_description`, per description;
+        - convert_store / load_store: the binary job store, written and opened;
+        - embed / vector_search: the hashed TF-IDF index, built and queried
+          through `query_semantic_job_search` (up to --vector-max jobs, since
+          the matrix takes 4KB per job).
+        A case that runs out of memory is reported as an error and the rest go on.
+        The JSON cases at 1M jobs peak at about 5.5GB.
+load    End-to-end load generator. Starts the career service on a synthetic
+        corpus of --jobs jobs, and agent_service against fake_llm_server with
+        --llm-latency seconds per completion, then drives each of --targets
+        from --concurrency clients for --duration seconds. Reports the status
+        codes, throughput, p50/p95/p99 latency and the server's peak RSS.
+
+    python benchmark_suite.py micro --sizes 1000 10000 100000 --output micro.json
+    python benchmark_suite.py load --llm-latency 0.2 --concurrency 32 --output load.json
+    python benchmark_suite.py compare before.json after.json
+"""
+import argparse
+import asyncio
+import contextlib
+import datetime
+import json
+import multiprocessing
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Dict, Iterator, List, Optional
+
+SIZES = [1_000, 10_000, 100_000, 1_000_000]
+QUERIES = 200
+VECTOR_MAX_JOBS = 100_000
+LOAD_JOBS = 10_000
+TARGETS = ["match-careers", "wellbeing", "tutor", "planner", "digest", "early-intervention"]
+COMPARED_METRICS = ["seconds", "throughput_per_second", "p50_ms", "p95_ms", "p99_ms", "peak_rss_mb"]
+
+# Common job-ad words first, so term frequencies fall off roughly like real text
+COMMON_WORDS = ("experience team work data with our you will and the to of in for skills role "
+                "development software engineering business support build design customers "
+                "systems product cloud platform analysis management solutions learning").split()
+VOCABULARY = COMMON_WORDS + [f"term{i}" for i in range(5_000)]
+_WORD_WEIGHTS = [1 / rank for rank in range(1, len(VOCABULARY) + 1)]
+TITLES = ["Data Scientist", "Backend Developer", "Machine Learning Engineer", "Data Analyst", "DevOps Engineer",
+          "Cloud Architect", "Software Engineer", "Analytics Engineer", "Platform Engineer", "Research Scientist"]
+INTERESTS = ["machine learning research", "building web services", "cloud infrastructure", "data visualisation",
+             "startups and product work", "healthcare analytics"]
+
+
+# --- Synthetic data ---
+
+def _skill_synonyms() -> List[tuple]:
+    from skill_extractor import SKILL_TAXONOMY
+    return [(canonical, synonym) for canonical, synonyms in SKILL_TAXONOMY.items() for synonym in synonyms]
+
+
+def synthetic_jobs(count: int, seed: int = 0, words: int = 60) -> Iterator[dict]:
+    """Jobs shaped like jobs.json rows, with 2-5 taxonomy skills mentioned in each description."""
+    rng = random.Random(seed)
+    synonyms = _skill_synonyms()
+    for i in range(count):
+        chosen = rng.sample(synonyms, rng.randint(2, 5))
+        text = rng.choices(VOCABULARY, _WORD_WEIGHTS, k=words)
+        for _, synonym in chosen:
+            text.insert(rng.randrange(len(text) + 1), synonym)
+        yield {
+            "id": str(i + 1),
+            "title": rng.choice(TITLES),
+            "company": f"Company {rng.randrange(max(1, count // 20))}",
+            "required_skills": sorted({canonical.capitalize() for canonical, _ in chosen}),
+            "description": " ".join(text) + ".",
+        }
+
+
+def synthetic_profiles(count: int, seed: int = 1) -> List[dict]:
+    """Request bodies for /match-careers."""
+    rng = random.Random(seed)
+    synonyms = _skill_synonyms()
+    return [{"student_id": i,
+             "skills": [canonical.capitalize() for canonical, _ in rng.sample(synonyms, rng.randint(1, 4))],
+             "interests": rng.choice(INTERESTS),
+             "performance_summary": " ".join(rng.choices(VOCABULARY, _WORD_WEIGHTS, k=12))}
+            for i in range(count)]
+
+
+def profile_text(profile: dict) -> str:
+    return f"{' '.join(profile['skills'])} {profile['interests']} {profile['performance_summary']}"
+
+
+def write_jobs(jobs: Iterator[dict], path: str):
+    """Writes a jobs.json array without holding the jobs in memory."""
+    with open(path, "w") as f:
+        f.write("[\n")
+        for i, job in enumerate(jobs):
+            f.write((",\n" if i else "") + json.dumps(job))
+        f.write("\n]\n")
+
+
+# --- Measurement ---
+
+def _percentile(values: List[float], p: float) -> float:
+    return values[min(len(values) - 1, int(p * len(values)))]
+
+
+def latency_stats(latencies: List[float], elapsed: float) -> Dict[str, float]:
+    """Throughput and latency percentiles (in milliseconds) for `latencies`, which took `elapsed` seconds."""
+    latencies = sorted(latencies)
+    if not latencies:
+        return {"count": 0, "throughput_per_second": 0.0}
+    return {
+        "count": len(latencies),
+        "throughput_per_second": len(latencies) / elapsed if elapsed else 0.0,
+        "mean_ms": sum(latencies) / len(latencies) * 1e3,
+        "p50_ms": _percentile(latencies, 0.50) * 1e3,
+        "p95_ms": _percentile(latencies, 0.95) * 1e3,
+        "p99_ms": _percentile(latencies, 0.99) * 1e3,
+    }
+
+
+def time_each(function: Callable, inputs) -> Dict[str, float]:
+    """Calls `function` on each input in turn. Producing the inputs isn't counted in the throughput."""
+    latencies = []
+    for item in inputs:
+        start = time.perf_counter()
+        function(item)
+        latencies.append(time.perf_counter() - start)
+    return latency_stats(latencies, sum(latencies))
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process."""
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2 ** 20 if sys.platform == "darwin" else peak / 2 ** 10  # bytes on macOS, KB on Linux
+
+
+def process_peak_rss_mb(pid: int) -> Optional[float]:
+    """Peak RSS of another process, where /proc reports it (Linux)."""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 2 ** 10
+    except OSError:
+        pass
+    return None
+
+
+@contextlib.contextmanager
+def quiet():
+    """Keeps the services' progress prints (one per search) out of the report."""
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        yield
+
+
+# --- Micro-benchmarks (each case runs in its own process) ---
+
+def _import_service():
+    # The service loads JOBS_FILE when imported; point it at nothing so the cases time their own loads
+    os.environ["JOBS_FILE"] = os.path.join(tempfile.gettempdir(), "benchmark-suite-no-jobs.json")
+    with quiet():
+        import career_pathfinder_service
+    return career_pathfinder_service
+
+
+def _json_case(jobs_file: str, size: int, queries: int, seed: int) -> List[dict]:
+    service = _import_service()
+    from ingest_jobs import extract_skills_from_description
+
+    start = time.perf_counter()
+    with quiet():
+        snapshot = service.load_job_snapshot(jobs_file)
+    results = [{"benchmark": "load_json", "jobs": size, "seconds": time.perf_counter() - start,
+                "jobs_file_mb": os.path.getsize(jobs_file) / 2 ** 20}]
+    texts = [profile_text(profile) for profile in synthetic_profiles(queries, seed + 1)]
+    with quiet():
+        stats = time_each(lambda text: service.keyword_job_search(text, 10, snapshot), texts)
+    results.append({"benchmark": "keyword_search", "jobs": size, **stats})
+    descriptions = (job["description"] for job in synthetic_jobs(size, seed))
+    results.append({"benchmark": "skill_extraction", "jobs": size,
+                    **time_each(extract_skills_from_description, descriptions)})
+    peak = peak_rss_mb()
+    return [{**result, "peak_rss_mb": peak} for result in results]
+
+
+def _prepare_store(jobs_file: str, size: int, vector: bool) -> List[dict]:
+    from job_embeddings import build_embedding_index
+    from job_store import convert_json_to_store
+
+    results = []
+    start = time.perf_counter()
+    with quiet():
+        convert_json_to_store(jobs_file)
+    results.append({"benchmark": "convert_store", "jobs": size, "seconds": time.perf_counter() - start})
+    if vector:
+        start = time.perf_counter()
+        with quiet():
+            build_embedding_index(jobs_file, "hashed-tfidf")
+        results.append({"benchmark": "embed", "jobs": size, "seconds": time.perf_counter() - start})
+    peak = peak_rss_mb()
+    return [{**result, "peak_rss_mb": peak} for result in results]
+
+
+def _store_case(jobs_file: str, size: int, queries: int, seed: int) -> List[dict]:
+    service = _import_service()
+
+    start = time.perf_counter()
+    with quiet():
+        snapshot = service.load_job_snapshot(jobs_file)
+    results = [{"benchmark": "load_store", "jobs": size, "seconds": time.perf_counter() - start}]
+    if snapshot.vector_index is not None:
+        texts = [profile_text(profile) for profile in synthetic_profiles(queries, seed + 1)]
+        with quiet():
+            stats = time_each(lambda text: service.query_semantic_job_search(text, 10, snapshot), texts)
+        results.append({"benchmark": "vector_search", "jobs": size, **stats})
+    peak = peak_rss_mb()
+    return [{**result, "peak_rss_mb": peak} for result in results]
+
+
+def _in_fresh_process(case: Callable, *args) -> List[dict]:
+    context = multiprocessing.get_context("spawn")
+    try:
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+            return pool.submit(case, *args).result()
+    except BrokenProcessPool:
+        return [{"benchmark": case.__name__.strip("_"), "jobs": args[1],
+                 "error": "the worker process died (out of memory?)"}]
+
+
+def run_micro(sizes: List[int] = SIZES, queries: int = QUERIES, vector_max: int = VECTOR_MAX_JOBS,
+              seed: int = 0) -> List[dict]:
+    results = []
+    for size in sizes:
+        with tempfile.TemporaryDirectory() as workdir:
+            jobs_file = os.path.join(workdir, "jobs.json")
+            write_jobs(synthetic_jobs(size, seed), jobs_file)
+            # The JSON case first: once jobs.bin exists, load_job_snapshot opens that instead
+            for case, args in ((_json_case, (jobs_file, size, queries, seed)),
+                               (_prepare_store, (jobs_file, size, size <= vector_max)),
+                               (_store_case, (jobs_file, size, queries, seed))):
+                for result in _in_fresh_process(case, *args):
+                    print(format_result(result))
+                    results.append(result)
+    return results
+
+
+# --- Load tests ---
+
+@contextlib.contextmanager
+def server(command: List[str], port: int, ready_path: str, env: Dict[str, str], log_path: str,
+           timeout: float = 120.0):
+    """Runs a server subprocess until the block exits, once GET `ready_path` answers."""
+    import httpx
+
+    with open(log_path, "w") as log:
+        process = subprocess.Popen(command, env={**os.environ, **env}, stdout=log, stderr=subprocess.STDOUT)
+        try:
+            deadline = time.monotonic() + timeout
+            while True:
+                if process.poll() is not None:
+                    raise RuntimeError(f"{' '.join(command)} exited with {process.returncode}; see {log_path}")
+                try:
+                    if httpx.get(f"http://127.0.0.1:{port}{ready_path}", timeout=1.0).status_code < 500:
+                        break
+                except httpx.HTTPError:
+                    pass
+                if time.monotonic() > deadline:
+                    raise RuntimeError(f"{' '.join(command)} was not ready after {timeout:.0f}s; see {log_path}")
+                time.sleep(0.25)
+            yield process
+        finally:
+            process.terminate()
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+                process.wait()
+
+
+def uvicorn_command(app: str, port: int) -> List[str]:
+    return [sys.executable, "-m", "uvicorn", app, "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"]
+
+
+def agent_payloads() -> Dict[str, List[dict]]:
+    """Request bodies for each agent endpoint, from the agents' own sample data."""
+    import digest_generator
+    import early_intervention
+    import personalised_planner
+
+    return {
+        "wellbeing": [{"message": message} for message in (
+            "I'm so stressed about my exams next week", "I keep putting off my essay",
+            "I don't see the point of studying anymore", "Can you help me plan my revision?")],
+        "tutor": [{"question": question} for question in (
+            "What is photosynthesis?", "How do plants make their food?", "Who won the 1998 World Cup?")],
+        "planner": [{"profile": personalised_planner.student_profile, "weeks": 1}],
+        "digest": [{"record": digest_generator.student_weekly_data}],
+        "early-intervention": [{"student": early_intervention.student_data_alex},
+                               {"student": early_intervention.student_data_maria}],
+    }
+
+
+async def drive(url: str, payloads: List[dict], concurrency: int, duration: float) -> Dict[str, float]:
+    """POSTs the payloads in turn from `concurrency` clients for `duration` seconds."""
+    import httpx
+
+    latencies, statuses = [], Counter()
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(timeout=120.0, limits=limits) as client:
+        start = time.perf_counter()
+        deadline = start + duration
+
+        async def client_loop(offset: int):
+            i = offset
+            while time.perf_counter() < deadline:
+                request_start = time.perf_counter()
+                try:
+                    response = await client.post(url, json=payloads[i % len(payloads)])
+                    status = str(response.status_code)
+                except httpx.HTTPError as e:
+                    response, status = None, type(e).__name__
+                statuses[status] += 1
+                if status == "200":
+                    latencies.append(time.perf_counter() - request_start)
+                elif status == "429":
+                    # Back off like a well-behaved client instead of spinning on rejections
+                    await asyncio.sleep(min(float(response.headers.get("Retry-After", 1)),
+                                            max(0.0, deadline - time.perf_counter())))
+                i += concurrency
+
+        await asyncio.gather(*(client_loop(offset) for offset in range(concurrency)))
+        elapsed = time.perf_counter() - start
+    # Throughput and latency count successful responses only; the rest are in `statuses`
+    return {**latency_stats(latencies, elapsed), "seconds": elapsed, "requests": sum(statuses.values()),
+            "statuses": dict(statuses)}
+
+
+def run_load(targets: List[str] = TARGETS, concurrency: int = 32, duration: float = 20.0, jobs: int = LOAD_JOBS,
+             llm_latency: float = 0.2, base_port: int = 8100, llm_env: Dict[str, str] = None) -> List[dict]:
+    repo = os.path.dirname(os.path.abspath(__file__))
+    results = []
+    career_port, fake_port, agent_port = base_port, base_port + 1, base_port + 2
+    with tempfile.TemporaryDirectory() as workdir, contextlib.ExitStack() as stack:
+        def record(target: str, port: int, process: subprocess.Popen, payloads: List[dict], **extra):
+            stats = asyncio.run(drive(f"http://127.0.0.1:{port}/{target}", payloads, concurrency, duration))
+            result = {"benchmark": f"load:/{target}", "concurrency": concurrency, **extra, **stats,
+                      "peak_rss_mb": process_peak_rss_mb(process.pid)}
+            print(format_result(result))
+            results.append(result)
+
+        if "match-careers" in targets:
+            jobs_file = os.path.join(workdir, "jobs.json")
+            write_jobs(synthetic_jobs(jobs), jobs_file)
+            with server(uvicorn_command("career_pathfinder_service:app", career_port), career_port, "/openapi.json",
+                        {"JOBS_FILE": jobs_file, "JOBS_RELOAD_INTERVAL": "0"},
+                        os.path.join(workdir, "career_service.log")) as process:
+                record("match-careers", career_port, process, synthetic_profiles(500), jobs=jobs)
+
+        agent_targets = [target for target in targets if target != "match-careers"]
+        if agent_targets:
+            stack.enter_context(server([sys.executable, os.path.join(repo, "fake_llm_server.py"), "--port",
+                                        str(fake_port), "--latency", str(llm_latency)], fake_port, "/stats", {},
+                                       os.path.join(workdir, "fake_llm.log")))
+            # No LLM cache, so every request pays for its LLM calls
+            env = {"LLM_API_URL": f"http://127.0.0.1:{fake_port}/v1", "LLM_CACHE_PATH": "", **(llm_env or {})}
+            process = stack.enter_context(server(uvicorn_command("agent_service:app", agent_port), agent_port,
+                                                 "/metrics", env, os.path.join(workdir, "agent_service.log")))
+            payloads = agent_payloads()
+            for target in agent_targets:
+                record(target, agent_port, process, payloads[target], llm_latency=llm_latency)
+    return results
+
+
+# --- Reports ---
+
+def format_result(result: dict) -> str:
+    name = f"{result['benchmark']} ({result['jobs']} jobs)" if "jobs" in result else result["benchmark"]
+    if "error" in result:
+        return f"  {name:<40} ERROR: {result['error']}"
+    parts = []
+    if "p50_ms" in result:
+        parts.append(f"{result['throughput_per_second']:10.1f}/s  p50 {result['p50_ms']:8.2f}ms  "
+                     f"p95 {result['p95_ms']:8.2f}ms  p99 {result['p99_ms']:8.2f}ms")
+    elif "seconds" in result:
+        parts.append(f"{result['seconds']:10.3f}s")
+    if "statuses" in result:
+        parts.append(f"statuses {result['statuses']}")
+    if result.get("peak_rss_mb") is not None:
+        parts.append(f"peak RSS {result['peak_rss_mb']:.0f}MB")
+    return f"  {name:<40}" + "  ".join(parts)
+
+
+def run_metadata(command: str, args: dict) -> dict:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {"command": command, "args": args, "commit": commit,
+            "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(), "platform": platform.platform(), "cpu_count": os.cpu_count()}
+
+
+def _result_key(result: dict) -> tuple:
+    return result["benchmark"], result.get("jobs"), result.get("concurrency")
+
+
+def compare(before_path: str, after_path: str):
+    """Prints each metric of the cases both reports share, with the after/before ratio."""
+    with open(before_path) as f:
+        before = {_result_key(result): result for result in json.load(f)["results"]}
+    with open(after_path) as f:
+        after = json.load(f)["results"]
+    print(f"{before_path} -> {after_path}")
+    for result in after:
+        old = before.get(_result_key(result))
+        if old is None or "error" in old or "error" in result:
+            continue
+        name = f"{result['benchmark']} ({result['jobs']} jobs)" if "jobs" in result else result["benchmark"]
+        print(f"  {name}")
+        for metric in COMPARED_METRICS:
+            if old.get(metric) and result.get(metric) is not None:
+                print(f"    {metric:<24}{old[metric]:12.3f} -> {result[metric]:12.3f}  "
+                      f"({result[metric] / old[metric]:.2f}x)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Micro-benchmarks and load tests for the career service and agents.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    micro = subparsers.add_parser("micro", help="Search, skill extraction and job loading at scaled corpus sizes.")
+    micro.add_argument("--sizes", type=int, nargs="+", default=SIZES)
+    micro.add_argument("--queries", type=int, default=QUERIES, help="Search queries per corpus size.")
+    micro.add_argument("--vector-max", type=int, default=VECTOR_MAX_JOBS,
+                       help="Largest corpus to build and search the vector index for.")
+    micro.add_argument("--seed", type=int, default=0)
+    micro.add_argument("--output", default="benchmark_results.json")
+
+    load = subparsers.add_parser("load", help="Load-test /match-careers and the agents against a fake LLM.")
+    load.add_argument("--targets", nargs="+", choices=TARGETS, default=TARGETS)
+    load.add_argument("--concurrency", type=int, default=32, help="Concurrent clients per target.")
+    load.add_argument("--duration", type=float, default=20.0, help="Seconds per target.")
+    load.add_argument("--jobs", type=int, default=LOAD_JOBS, help="Synthetic jobs for the career service.")
+    load.add_argument("--llm-latency", type=float, default=0.2, help="Seconds the fake LLM takes per completion.")
+    load.add_argument("--llm-concurrency", type=int, default=None,
+                      help="LLM_MAX_CONCURRENCY for agent_service (default: the environment's).")
+    load.add_argument("--llm-rps", type=float, default=None,
+                      help="LLM_REQUESTS_PER_SECOND for agent_service (default: the environment's).")
+    load.add_argument("--base-port", type=int, default=8100, help="Ports base..base+2 are used.")
+    load.add_argument("--output", default="benchmark_results.json")
+
+    comparison = subparsers.add_parser("compare", help="Compare two reports.")
+    comparison.add_argument("before")
+    comparison.add_argument("after")
+    args = parser.parse_args()
+
+    if args.command == "compare":
+        compare(args.before, args.after)
+        sys.exit(0)
+    if args.command == "micro":
+        print(f"Micro-benchmarks at {args.sizes} jobs:")
+        results = run_micro(args.sizes, args.queries, args.vector_max, args.seed)
+    else:
+        llm_env = {}
+        if args.llm_concurrency is not None:
+            llm_env["LLM_MAX_CONCURRENCY"] = str(args.llm_concurrency)
+        if args.llm_rps is not None:
+            llm_env["LLM_REQUESTS_PER_SECOND"] = str(args.llm_rps)
+        print(f"Load tests, {args.concurrency} clients for {args.duration:.0f}s per target:")
+        results = run_load(args.targets, args.concurrency, args.duration, args.jobs, args.llm_latency,
+                           args.base_port, llm_env)
+    report = {"meta": run_metadata(args.command, {key: value for key, value in vars(args).items()
+                                                 if key not in ("command", "output")}),
+              "results": results}
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Saved {len(results)} results to '{args.output}'.")
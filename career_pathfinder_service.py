@@ -1,7 +1,23 @@
 import json
+import heapq
+import math
+import os
+import re
+import threading
+from collections import Counter
+from collections.abc import Mapping
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from typing import List, Dict
+from typing import List, Dict, Tuple
+
+import numpy as np
+
+from job_embeddings import JobVectorIndex, index_paths
+from job_store import JobStore, iter_job_records, store_path
+from skill_index import CourseIndex, SkillIndex
 
 
 class StudentProfile(BaseModel):
@@ -28,16 +44,222 @@ class CareerPathResponse(BaseModel):
     summary: str
 
 
-JOBS_FILE = "jobs.json"
-JOBS_DB = {} 
-ALL_JOBS_LIST = [] 
+# jobs.json, or jobs.ndjson written by `ingest_jobs.py --stream`
+JOBS_FILE = os.getenv("JOBS_FILE", "jobs.json")
+# Seconds between checks for a refreshed jobs.json (0 disables the watcher)
+JOBS_RELOAD_INTERVAL = float(os.getenv("JOBS_RELOAD_INTERVAL", "30"))
+
+# Keyword search index over job descriptions (BM25).
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+_TOKEN_RE = re.compile(r"[a-z0-9+#]+")
+
+def tokenize(text: str) -> List[str]:
+    """Lowercases the text and splits it into search tokens."""
+    return _TOKEN_RE.findall(text.lower())
+
+def add_to_inverted_index(index: Dict[str, List[Tuple[int, int]]], doc_lengths: Dict[int, int],
+                          job_id: int, description: str):
+    """Tokenizes one description (lowercasing it once) and adds its postings."""
+    tokens = tokenize(description or '')
+    doc_lengths[job_id] = len(tokens)
+    for term, tf in Counter(tokens).items():
+        index.setdefault(term, []).append((job_id, tf))
+
+def build_inverted_index(jobs):
+    """
+    Builds the token -> postings index from an iterable of jobs, once, when
+    the jobs are loaded. Queries then only touch the postings of their terms.
+    """
+    index: Dict[str, List[Tuple[int, int]]] = {}
+    doc_lengths: Dict[int, int] = {}
+    for job in jobs:
+        add_to_inverted_index(index, doc_lengths, int(job['id']), job.get('description'))
+    avg_length = sum(doc_lengths.values()) / len(doc_lengths) if doc_lengths else 0.0
+    return index, doc_lengths, avg_length
+
+def iter_jobs(jobs_file: str = JOBS_FILE):
+    """Yields the jobs in `jobs_file` one record at a time (JSON array or NDJSON)."""
+    return iter_job_records(jobs_file)
+
+def source_mtimes(jobs_file: str) -> Tuple[float, ...]:
+    """Modification times of the jobs file, its binary store and its embedding index (0 if missing)."""
+    mtimes = []
+    for path in (jobs_file, store_path(jobs_file), index_paths(jobs_file)["meta"]):
+        try:
+            mtimes.append(os.path.getmtime(path))
+        except OSError:
+            mtimes.append(0.0)
+    return tuple(mtimes)
+
+
+class StoredJobs(Mapping):
+    """job_id -> Job view over a binary JobStore. Jobs are built when they are read."""
+
+    def __init__(self, store: JobStore):
+        self.store = store
+
+    def __getitem__(self, job_id: int) -> Job:
+        row = self.store.row_of(job_id)
+        if row is None:
+            raise KeyError(job_id)
+        return Job(**self.store.record(row))
+
+    def __iter__(self):
+        return (int(job_id) for job_id in self.store.ids)
+
+    def __len__(self) -> int:
+        return len(self.store)
+
+
+class StoredJobSkills(StoredJobs):
+    """job_id -> required-skill bitmask, read from a binary JobStore's interned skill ids."""
+
+    def __init__(self, store: JobStore, skills: SkillIndex):
+        super().__init__(store)
+        # The store's skill ids -> bit positions in the snapshot's SkillIndex
+        self.bits = [1 << skills.add(skill) for skill in store.skills]
+
+    def __getitem__(self, job_id: int) -> int:
+        row = self.store.row_of(job_id)
+        if row is None:
+            raise KeyError(job_id)
+        mask = 0
+        for skill_id in self.store.skill_ids(row):
+            mask |= self.bits[skill_id]
+        return mask
+
+
+class JobSnapshot:
+    """
+    Immutable view of the job corpus and everything derived from it.
+    A reload builds a new snapshot and swaps it in; requests keep using the
+    snapshot they started with, so the old one is freed once they finish.
+    """
+
+    def __init__(self, jobs_db: Mapping, job_skills: Mapping, vector_index: JobVectorIndex = None,
+                 mtimes: Tuple[float, ...] = (), keyword_index: tuple = None, descriptions=None,
+                 skills: SkillIndex = None):
+        self.jobs_db = jobs_db
+        # job_id -> bitmask of required skills, with bit positions from `skills`
+        self.job_skills = job_skills
+        self.skills = skills if skills is not None else SkillIndex()
+        self.vector_index = vector_index
+        self.mtimes = mtimes
+        # BM25 index, either built up front or on first use from the `descriptions` callable
+        self._keyword_index = keyword_index
+        self._descriptions = descriptions
+        self._keyword_index_lock = threading.Lock()
+
+    @classmethod
+    def empty(cls) -> "JobSnapshot":
+        return cls({}, {}, keyword_index=({}, {}, 0.0))
+
+    @property
+    def keyword_index(self) -> Tuple[Dict[str, List[Tuple[int, int]]], Dict[int, int], float]:
+        """(inverted index, doc lengths, average doc length) for BM25 search."""
+        if self._keyword_index is None:
+            with self._keyword_index_lock:
+                if self._keyword_index is None:
+                    print(f"--- Building the keyword index for {len(self)} jobs... ---")
+                    self._keyword_index = build_inverted_index(self._descriptions())
+        return self._keyword_index
+
+    def __len__(self) -> int:
+        return len(self.jobs_db)
+
+
+def index_matches_jobs(vector_index: JobVectorIndex, jobs_db: Mapping) -> bool:
+    """True if the embedding index covers exactly the job ids in `jobs_db`."""
+    job_ids = np.fromiter(iter(jobs_db), dtype=np.int64, count=len(jobs_db))
+    return np.array_equal(np.sort(np.asarray(vector_index.ids, dtype=np.int64)), np.sort(job_ids))
+
+
+def load_job_snapshot(jobs_file: str = JOBS_FILE) -> JobSnapshot:
+    """
+    Loads the jobs and builds every index. Reads the binary store when it is at
+    least as new as the jobs file, and falls back to parsing the JSON otherwise.
+    Raises if neither can be loaded.
+    """
+    mtimes = source_mtimes(jobs_file)
+    jobs_mtime, store_mtime = mtimes[0], mtimes[1]
+    if store_mtime and store_mtime >= jobs_mtime:
+        store = JobStore(store_path(jobs_file))
+        print(f"Opened the binary job store '{store.path}'.")
+        skills = SkillIndex()
+        jobs_db = StoredJobs(store)
+        job_skills = StoredJobSkills(store, skills)
+        # Descriptions stay on disk; the keyword index is only built if keyword search is used
+        keyword_index = None
+        descriptions = store.iter_records
+    else:
+        # One pass over the records; the raw descriptions are never held as a list
+        skills = SkillIndex()
+        jobs_db, job_skills = {}, {}
+        inverted_index, doc_lengths = {}, {}
+        for job in iter_jobs(jobs_file):
+            job_id = int(job['id'])
+            jobs_db[job_id] = Job(**job)
+            job_skills[job_id] = skills.add_mask(jobs_db[job_id].required_skills)
+            add_to_inverted_index(inverted_index, doc_lengths, job_id, job.get('description'))
+        avg_doc_length = sum(doc_lengths.values()) / len(doc_lengths) if doc_lengths else 0.0
+        keyword_index = (inverted_index, doc_lengths, avg_doc_length)
+        descriptions = None
+
+    # Vector index built offline by job_embeddings.py. Falls back to BM25 if missing or stale.
+    vector_index = None
+    try:
+        vector_index = JobVectorIndex.load(jobs_file)
+        if len(vector_index) != len(jobs_db):
+            print(f"WARNING: The embedding index has {len(vector_index)} jobs but '{jobs_file}' has {len(jobs_db)}. Using keyword search.")
+            vector_index = None
+        elif not index_matches_jobs(vector_index, jobs_db):
+            # Same count but different jobs: searching it would return ids we can't look up
+            print(f"WARNING: The embedding index was built for different jobs than '{jobs_file}'. Using keyword search.")
+            vector_index = None
+        else:
+            print(f"Successfully loaded the embedding index for {len(vector_index)} jobs.")
+    except FileNotFoundError:
+        print("No embedding index found. Run 'job_embeddings.py' to enable vector search. Using keyword search.")
+    except Exception as e:
+        print(f"An error occurred while loading the embedding index: {e}")
+
+    return JobSnapshot(jobs_db, job_skills, vector_index, mtimes, keyword_index, descriptions, skills)
+
+
+_SNAPSHOT = JobSnapshot.empty()
+_RELOAD_LOCK = threading.Lock()
+
+def current_snapshot() -> JobSnapshot:
+    """The live snapshot. Readers take it once per request and never block."""
+    return _SNAPSHOT
+
+def reload_jobs(jobs_file: str = JOBS_FILE) -> JobSnapshot:
+    """Builds a new snapshot and swaps it in. On failure the current one stays live."""
+    global _SNAPSHOT
+    with _RELOAD_LOCK:  # Only serialises reloads; readers never take this lock
+        snapshot = load_job_snapshot(jobs_file)
+        _SNAPSHOT = snapshot  # A single reference assignment is atomic
+    print(f"Successfully loaded {len(snapshot)} jobs from '{jobs_file}'.")
+    return snapshot
+
+def watch_jobs_file(stop_event: threading.Event, interval: float = JOBS_RELOAD_INTERVAL, jobs_file: str = JOBS_FILE):
+    """Reloads the jobs whenever the jobs file or its embedding index changes on disk."""
+    failed_mtimes = None
+    while not stop_event.wait(interval):
+        mtimes = source_mtimes(jobs_file)
+        if mtimes == current_snapshot().mtimes or mtimes == failed_mtimes:
+            continue
+        print(f"--- Detected a change to '{jobs_file}', reloading jobs... ---")
+        try:
+            reload_jobs(jobs_file)
+        except Exception as e:
+            failed_mtimes = mtimes  # Don't retry until the files change again
+            print(f"An error occurred while reloading {jobs_file}: {e}. Keeping the previous jobs.")
 
 try:
-    with open(JOBS_FILE, 'r') as f:
-        ALL_JOBS_LIST = json.load(f)
-        for job in ALL_JOBS_LIST:
-            JOBS_DB[int(job['id'])] = Job(**job)
-    print(f"Successfully loaded {len(JOBS_DB)} jobs from '{JOBS_FILE}'.")
+    reload_jobs(JOBS_FILE)
 except FileNotFoundError:
     print(f"WARNING: '{JOBS_FILE}' not found. The API will not have job data.")
     print("Please run the 'ingest_jobs.py' script first to create it.")
@@ -51,60 +273,95 @@ MOCK_COURSES_DB: List[Course] = [
     Course(id=203, title="Mastering Docker and Kubernetes", skill_taught="Kubernetes"),
     Course(id=204, title="Web Development with Django", skill_taught="Django"),
 ]
+COURSE_INDEX = CourseIndex(MOCK_COURSES_DB)
 
-app = FastAPI(title="BrainFog AI Career Pathfinder")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    stop_event = threading.Event()
+    if JOBS_RELOAD_INTERVAL > 0:
+        threading.Thread(target=watch_jobs_file, args=(stop_event,), name="jobs-watcher", daemon=True).start()
+    yield
+    stop_event.set()
 
+app = FastAPI(title="BrainFog AI Career Pathfinder", lifespan=lifespan)
 
-def query_semantic_job_search(profile_text: str) -> List[int]:
+
+def query_semantic_job_search(profile_text: str, top_k: int = 10, snapshot: JobSnapshot = None) -> List[int]:
     """
-    MODIFIED MOCK FUNCTION: Simulates semantic search against the loaded file data.
+    Finds the jobs most similar to the profile text, using the embedding
+    index when it is available and BM25 keyword search otherwise.
     """
-    print(f"--- Simulating semantic search over {len(ALL_JOBS_LIST)} loaded jobs... ---")
-    search_terms = profile_text.lower().split()
-    scores = {}
-    for job in ALL_JOBS_LIST:
-        score = 0
-        for term in search_terms:
-            if term in job['description'].lower():
-                score += 1
-        if score > 0:
-            scores[int(job['id'])] = score
-    
-    # Sort by score, highest first
-    sorted_job_ids = sorted(scores, key=scores.get, reverse=True)
-    return sorted_job_ids[:10] # Return top 10 matches
+    if snapshot is None:
+        snapshot = current_snapshot()
+    if snapshot.vector_index is not None:
+        print(f"--- Vector search over {len(snapshot.vector_index)} embedded jobs... ---")
+        return snapshot.vector_index.search(profile_text, top_k)
+    return keyword_job_search(profile_text, top_k, snapshot)
 
-def fetch_job_details_from_db(job_id: int) -> Job:
-    """Fetches job details from the in-memory dictionary."""
-    return JOBS_DB.get(job_id)
+def query_semantic_job_search_batch(profile_texts: List[str], top_k: int = 10, snapshot: JobSnapshot = None):
+    """Batch version of query_semantic_job_search. Yields one id list per profile, in order."""
+    if snapshot is None:
+        snapshot = current_snapshot()
+    if snapshot.vector_index is not None:
+        print(f"--- Batch vector search for {len(profile_texts)} profiles over {len(snapshot.vector_index)} embedded jobs... ---")
+        yield from snapshot.vector_index.search_batch(profile_texts, top_k)
+    else:
+        for profile_text in profile_texts:
+            yield keyword_job_search(profile_text, top_k, snapshot)
 
-def fetch_courses_for_skill(skill: str) -> List[Course]:
-    """Finds courses from the mock course DB."""
-    return [course for course in MOCK_COURSES_DB if course.skill_taught.lower() == skill.lower()]
+def keyword_job_search(profile_text: str, top_k: int = 10, snapshot: JobSnapshot = None) -> List[int]:
+    """
+    Ranks jobs against the profile text with BM25 over the inverted index.
+    Only the postings of the query terms are scored, so the cost depends on
+    how many jobs match rather than on the size of the corpus.
+    """
+    if snapshot is None:
+        snapshot = current_snapshot()
+    inverted_index, doc_lengths, avg_doc_length = snapshot.keyword_index
+    num_docs = len(doc_lengths)
+    print(f"--- Searching {num_docs} indexed jobs... ---")
+    scores: Dict[int, float] = {}
+    for term, query_tf in Counter(tokenize(profile_text)).items():
+        postings = inverted_index.get(term)
+        if not postings:
+            continue
+        idf = math.log(1 + (num_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+        for job_id, tf in postings:
+            length_norm = 1 - BM25_B + BM25_B * doc_lengths[job_id] / avg_doc_length
+            term_score = idf * tf * (BM25_K1 + 1) / (tf + BM25_K1 * length_norm)
+            scores[job_id] = scores.get(job_id, 0.0) + query_tf * term_score
 
+    # Heap-based top-k instead of sorting every score
+    top_matches = heapq.nlargest(top_k, scores.items(), key=lambda item: item[1])
+    return [job_id for job_id, _ in top_matches]
 
-@app.post("/match-careers", response_model=CareerPathResponse)
-async def match_careers(profile: StudentProfile):
-    if not JOBS_DB:
-        raise HTTPException(status_code=503, detail="Job data is not available. Please run the ingestion script.")
+def fetch_job_details_from_db(job_id: int, snapshot: JobSnapshot = None) -> Job:
+    """Fetches job details from the snapshot's job mapping."""
+    if snapshot is None:
+        snapshot = current_snapshot()
+    return snapshot.jobs_db.get(job_id)
 
-    profile_text = f"{' '.join(profile.skills)} {profile.interests} {profile.performance_summary}"
-    matching_job_ids = query_semantic_job_search(profile_text)
-    
-    if not matching_job_ids:
-        raise HTTPException(status_code=404, detail="Could not find any matching careers for this profile.")
-    
-    top_match = fetch_job_details_from_db(matching_job_ids[0])
+def fetch_courses_for_skill(skill: str) -> List[Course]:
+    """Finds courses from the mock course DB, through the skill -> courses index."""
+    return COURSE_INDEX.courses_for(skill)
+
+
+def profile_to_text(profile: StudentProfile) -> str:
+    return f"{' '.join(profile.skills)} {profile.interests} {profile.performance_summary}"
 
-    student_skills_set = set(skill.lower() for skill in profile.skills)
-    required_skills_set = set(skill.lower() for skill in top_match.required_skills)
+def build_career_path(profile: StudentProfile, top_match: Job, snapshot: JobSnapshot = None) -> CareerPathResponse:
+    """Skill-gap analysis and course recommendations for the student's top match."""
+    if snapshot is None:
+        snapshot = current_snapshot()
+    student_mask = snapshot.skills.mask(profile.skills)
+    required_mask = snapshot.job_skills[top_match.id]
     
-    missing_skills = list(required_skills_set - student_skills_set)
-    strong_skills = list(student_skills_set.intersection(required_skills_set))
+    missing_skills = snapshot.skills.names_of(required_mask & ~student_mask)
+    strong_skills = snapshot.skills.names_of(required_mask & student_mask)
 
     course_recommendations = {}
     for skill in missing_skills:
-        recommended_courses = fetch_courses_for_skill(skill.capitalize())
+        recommended_courses = fetch_courses_for_skill(skill)
         if recommended_courses:
             course_recommendations[skill.capitalize()] = recommended_courses
 
@@ -119,4 +376,61 @@ async def match_careers(profile: StudentProfile):
         skill_gap=missing_skills,
         course_recommendations=course_recommendations,
         summary=summary
-    )
\ No newline at end of file
+    )
+
+
+@app.post("/match-careers", response_model=CareerPathResponse)
+async def match_careers(profile: StudentProfile):
+    snapshot = current_snapshot()
+    if not snapshot.jobs_db:
+        raise HTTPException(status_code=503, detail="Job data is not available. Please run the ingestion script.")
+
+    matching_job_ids = query_semantic_job_search(profile_to_text(profile), snapshot=snapshot)
+    
+    if not matching_job_ids:
+        raise HTTPException(status_code=404, detail="Could not find any matching careers for this profile.")
+    
+    top_match = fetch_job_details_from_db(matching_job_ids[0], snapshot)
+    return build_career_path(profile, top_match, snapshot=snapshot)
+
+
+def stream_career_paths(profiles: List[StudentProfile], snapshot: JobSnapshot):
+    """
+    Yields one NDJSON line per student, in request order. Profiles are scored
+    against the corpus in chunks, and skill-gap analyses are shared by every
+    student in the batch with the same top match and skills.
+    """
+    path_cache: Dict[Tuple[int, int], CareerPathResponse] = {}
+
+    profile_texts = [profile_to_text(profile) for profile in profiles]
+    for profile, matching_job_ids in zip(profiles, query_semantic_job_search_batch(profile_texts, snapshot=snapshot)):
+        if not matching_job_ids:
+            line = {"student_id": profile.student_id, "error": "Could not find any matching careers for this profile."}
+        else:
+            top_match = fetch_job_details_from_db(matching_job_ids[0], snapshot)
+            key = (top_match.id, snapshot.skills.mask(profile.skills))
+            if key not in path_cache:
+                path_cache[key] = build_career_path(profile, top_match, snapshot)
+            line = {"student_id": profile.student_id, **path_cache[key].model_dump()}
+        yield json.dumps(line) + "\n"
+
+
+@app.post("/match-careers/batch")
+async def match_careers_batch(profiles: List[StudentProfile]):
+    """Cohort-wide career matching, streamed back as NDJSON (one student per line)."""
+    snapshot = current_snapshot()
+    if not snapshot.jobs_db:
+        raise HTTPException(status_code=503, detail="Job data is not available. Please run the ingestion script.")
+    return StreamingResponse(stream_career_paths(profiles, snapshot), media_type="application/x-ndjson")
+
+
+@app.post("/admin/reload-jobs")
+async def reload_jobs_now():
+    """Rebuilds the job snapshot from disk without restarting the service."""
+    try:
+        snapshot = await run_in_threadpool(reload_jobs, JOBS_FILE)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail=f"'{JOBS_FILE}' not found. Please run the ingestion script.")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Could not reload jobs, keeping the previous data: {e}")
+    return {"jobs_loaded": len(snapshot), "vector_search": snapshot.vector_index is not None}
@@ -62,9 +62,9 @@ def query_semantic_job_search(profile_text: str) -> List[int]:
     """
     MOCK FUNCTION: Simulates a semantic search query.
     
-    PRODUCTION: This function would use a sentence-transformer model to encode
-    the profile_text into a vector, then query a vector database (like ChromaDB)
-    to find the IDs of the most semantically similar job descriptions.
+    PRODUCTION: career_pathfinder_service.py encodes the profile_text with the
+    sentence-transformer model and searches the embedding matrix built offline
+    by job_embeddings.py to find the IDs of the most similar job descriptions.
     """
     print(f"--- Simulating semantic search for profile: '{profile_text[:50]}...' ---")
     # Simple logic for the mock: find jobs with the most overlapping skills
@@ -0,0 +1,218 @@
+# content_copilot.py
+"""
+Quiz generation agent from AI_Content_Co_Pilot.ipynb, as an importable module.
+
+The graph identifies the key concepts in a piece of course content, then fans
+out one `generate_question` branch per concept with LangGraph's `Send`, so all
+questions are generated concurrently. Branch results are merged by a list
+reducer and put back in concept order. A concept whose question can't be
+generated or parsed is reported in `failed_concepts` without failing the quiz.
+
+    LLM_API_URL=http://127.0.0.1:8002/v1 python content_copilot.py chapters/ --output quizzes.json
+"""
+import argparse
+import asyncio
+import json
+import operator
+import os
+from functools import lru_cache
+from typing import Annotated, Any, Dict, List, TypedDict
+
+from dotenv import load_dotenv
+
+from instrumentation import record_parse_failure, state_graph
+from llm_gateway import get_llm
+
+load_dotenv()
+
+llm = get_llm(temperature=0.7)
+
+# Branches per quiz run at once, and quizzes generated at once by generate_quizzes().
+# The gateway's own concurrency cap still applies on top of both.
+QUESTION_CONCURRENCY = int(os.getenv("QUIZ_QUESTION_CONCURRENCY", "8"))
+CHAPTER_CONCURRENCY = int(os.getenv("QUIZ_CHAPTER_CONCURRENCY", "4"))
+
+course_content_text = """
+The Solar System consists of the Sun and the astronomical objects bound to it by gravity. Of the objects that orbit the Sun directly, the largest are the eight planets, with the remainder being smaller objects, such as the five dwarf planets and small Solar System bodies.
+
+The four inner planets are Mercury, Venus, Earth, and Mars. They are called terrestrial planets because they have solid, rocky surfaces. The two largest planets, Jupiter and Saturn, are gas giants, being composed mainly of hydrogen and helium. The two outermost planets, Uranus and Neptune, are ice giants, being composed mostly of substances with relatively high melting points compared with hydrogen and helium, called volatiles, such as water, ammonia, and methane.
+
+Mars is often called the 'Red Planet' because of its reddish appearance, which is caused by iron oxide (rust) on its surface. It has two small moons, Phobos and Deimos. Jupiter is the largest planet in the Solar System, more than twice as massive as all the other planets combined. It is famous for its Great Red Spot, a giant storm that has raged for at least 350 years.
+"""
+
+
+class QuizGenerationState(TypedDict):
+    content_text: str
+    key_concepts: List[str]
+    # One entry per concept branch, merged by the reducer in completion order
+    question_results: Annotated[List[Dict[str, Any]], operator.add]
+    quiz_questions: List[Dict[str, Any]]
+    failed_concepts: List[str]
+    formatted_quiz_json: str
+
+
+class ConceptState(TypedDict):
+    content_text: str
+    concept: str
+    index: int
+
+
+def parse_concepts(text: str) -> List[str]:
+    """A JSON list of strings, or one concept per line as the notebook parsed it."""
+    cleaned = text.strip().replace("```json", "").replace("```", "")
+    try:
+        concepts = json.loads(cleaned)
+        if isinstance(concepts, list):
+            return [str(concept).strip() for concept in concepts if str(concept).strip()]
+    except json.JSONDecodeError:
+        record_parse_failure()
+    return [line.strip().replace('"', '').replace(',', '')
+            for line in cleaned.replace('[', '').replace(']', '').split('\n') if line.strip()]
+
+
+async def identify_key_concepts(state):
+    print("---NODE: Identifying Key Concepts---")
+    content_text = state["content_text"]
+
+    prompt = f"""
+    Based on the following course content, identify the top 3-5 most important, distinct, and testable key concepts or facts.
+    Present these concepts as a simple list of strings.
+
+    Course Content:
+    "{content_text}"
+
+    Example Format:
+    ["Concept 1", "Concept 2", "Concept 3"]
+
+    Key Concepts:
+    """
+
+    response = await llm.ainvoke(prompt)
+    concepts = parse_concepts(response.content)
+
+    print(f"Identified Concepts: {concepts}")
+    return {"key_concepts": concepts}
+
+
+def fan_out_concepts(state):
+    """One generate_question branch per concept; straight to formatting if there are none."""
+    if not state["key_concepts"]:
+        return "format_quiz_json"
+    from langgraph.types import Send
+
+    return [Send("generate_question", {"content_text": state["content_text"], "concept": concept, "index": index})
+            for index, concept in enumerate(state["key_concepts"])]
+
+
+async def generate_question(state: ConceptState):
+    concept = state["concept"]
+    print(f"  - Generating question for concept: '{concept}'")
+    prompt = f"""
+        You are an expert quiz creator. Based on the provided course content, create one high-quality multiple-choice question specifically about the following concept: "{concept}".
+
+        The question should have 4 options, with only one being correct. The incorrect options (distractors) should be plausible but clearly wrong based on the text.
+
+        Course Content:
+        "{state["content_text"]}"
+
+        Format your response as a JSON object with the keys "question", "options" (a list of 4 strings), and "answer" (the correct option text).
+
+        JSON Response:
+        """
+
+    result = {"index": state["index"], "concept": concept}
+    try:
+        response = await llm.ainvoke(prompt)
+        cleaned_response = response.content.strip().replace("```json", "").replace("```", "")
+        question_json = json.loads(cleaned_response)
+        if not isinstance(question_json, dict) or not {"question", "options", "answer"} <= question_json.keys():
+            raise ValueError("missing question, options or answer")
+        result["question"] = question_json
+    except Exception as e:
+        if isinstance(e, ValueError):  # Not JSON, or not the expected keys
+            record_parse_failure()
+        # Only this concept is lost; the rest of the quiz still comes back
+        print(f"  - FAILED to generate a question for concept: '{concept}' ({e})")
+        result["error"] = str(e)
+    return {"question_results": [result]}
+
+
+def format_quiz_json(state):
+    print("---NODE: Formatting Final JSON---")
+    results = sorted(state.get("question_results", []), key=lambda result: result["index"])
+    questions = [result["question"] for result in results if "question" in result]
+    failed = [result["concept"] for result in results if "question" not in result]
+    return {"quiz_questions": questions, "failed_concepts": failed,
+            "formatted_quiz_json": json.dumps(questions, indent=2)}
+
+
+@lru_cache(maxsize=None)
+def get_app():
+    """The compiled graph, built on first use."""
+    from langgraph.graph import END
+
+    workflow = state_graph(QuizGenerationState, "quiz")
+
+    workflow.add_node("identify_key_concepts", identify_key_concepts)
+    workflow.add_node("generate_question", generate_question)
+    workflow.add_node("format_quiz_json", format_quiz_json)
+
+    workflow.set_entry_point("identify_key_concepts")
+    workflow.add_conditional_edges("identify_key_concepts", fan_out_concepts, ["generate_question", "format_quiz_json"])
+    workflow.add_edge("generate_question", "format_quiz_json")
+    workflow.add_edge("format_quiz_json", END)
+
+    return workflow.compile()
+
+
+async def generate_quiz(content_text: str) -> Dict[str, Any]:
+    result = await get_app().ainvoke({"content_text": content_text, "question_results": []},
+                               {"max_concurrency": QUESTION_CONCURRENCY})
+    return {"key_concepts": result["key_concepts"], "questions": result["quiz_questions"],
+            "failed_concepts": result["failed_concepts"]}
+
+
+async def generate_quizzes(chapters: Dict[str, str], concurrency: int = CHAPTER_CONCURRENCY) -> Dict[str, Dict[str, Any]]:
+    """Quizzes for many chapters ({name: text}), keyed and ordered like the input. A failed chapter gets an "error"."""
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(text: str) -> Dict[str, Any]:
+        async with semaphore:
+            try:
+                return await generate_quiz(text)
+            except Exception as e:
+                print(f"  - FAILED to generate a quiz ({e})")
+                return {"error": str(e)}
+
+    results = await asyncio.gather(*(one(text) for text in chapters.values()))
+    return dict(zip(chapters, results))
+
+
+def load_chapters(path: str) -> Dict[str, str]:
+    """A single text file, or every .txt/.md file in a directory (sorted by name)."""
+    if os.path.isfile(path):
+        with open(path) as f:
+            return {os.path.basename(path): f.read()}
+    chapters = {}
+    for name in sorted(os.listdir(path)):
+        if name.endswith((".txt", ".md")):
+            with open(os.path.join(path, name)) as f:
+                chapters[name] = f.read()
+    return chapters
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate multiple-choice quizzes from course content.")
+    parser.add_argument("path", nargs="?", help="A chapter file or a directory of .txt/.md chapters. "
+                                                "Defaults to the built-in sample.")
+    parser.add_argument("--output", default=None, help="Write the quizzes here as JSON instead of printing them.")
+    args = parser.parse_args()
+
+    chapters = load_chapters(args.path) if args.path else {"sample": course_content_text}
+    quizzes = asyncio.run(generate_quizzes(chapters))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(quizzes, f, indent=2)
+        print(f"Saved quizzes for {len(quizzes)} chapters to '{args.output}'.")
+    else:
+        print(json.dumps(quizzes, indent=2))
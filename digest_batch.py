@@ -0,0 +1,234 @@
+# digest_batch.py
+"""
+Cohort batch mode for the weekly parent digests (digest_generator.py).
+
+Instead of three LLM calls per student, students are packed PACK_SIZE at a
+time into one structured call that returns a JSON object keyed by student id,
+each with a "summary_paragraph" and a "suggested_support". Every digest is
+validated on its own: students missing from the answer, or with a malformed
+digest, are packed again and retried (up to MAX_PACK_ATTEMPTS), so one bad
+digest doesn't cost the rest of the pack.
+
+Packs run with bounded concurrency while records are read lazily, so the
+input can be a large JSONL file or stdin. Results are appended to the output
+JSONL as each pack finishes, and the output doubles as the checkpoint: a
+rerun skips every student that already has a digest and retries the ones
+that failed. If a student appears more than once, the last line wins.
+
+    LLM_API_URL=http://127.0.0.1:8002/v1 python digest_batch.py weekly.jsonl --output digests.jsonl
+    LLM_API_URL=http://127.0.0.1:8002/v1 python digest_batch.py --synthetic 50000 --output digests.jsonl
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+from typing import Dict, Iterable, Iterator, Set, Tuple
+
+from dotenv import load_dotenv
+
+from llm_gateway import get_gateway, get_llm
+
+load_dotenv()
+
+llm = get_llm(temperature=0.7)
+
+PACK_SIZE = int(os.getenv("DIGEST_PACK_SIZE", "10"))
+PACK_CONCURRENCY = int(os.getenv("DIGEST_CONCURRENCY", "16"))
+MAX_PACK_ATTEMPTS = int(os.getenv("DIGEST_MAX_ATTEMPTS", "3"))
+DIGEST_KEYS = ("summary_paragraph", "suggested_support")
+
+
+def record_id(record: dict, line_number: int) -> str:
+    return str(record.get("student_id") or f"line-{line_number}")
+
+
+def read_records(path: str) -> Iterator[Tuple[str, dict]]:
+    """(id, record) from a JSONL file, a JSON list, or stdin ("-"), read lazily for JSONL."""
+    if path.endswith(".json"):
+        with open(path) as f:
+            yield from ((record_id(record, i), record) for i, record in enumerate(json.load(f), start=1))
+        return
+    f = sys.stdin if path == "-" else open(path)
+    try:
+        for line_number, line in enumerate(f, start=1):
+            if line.strip():
+                record = json.loads(line)
+                yield record_id(record, line_number), record
+    finally:
+        if f is not sys.stdin:
+            f.close()
+
+
+def synthetic_records(count: int, seed: int = 0) -> Iterator[Tuple[str, dict]]:
+    rng = random.Random(seed)
+    courses = ["Trigonometry", "Biology", "World History", "Chemistry", "English Literature"]
+    skills = ["Word Problems", "Essay Structure", "Lab Reports", "Dates and Events", "Equations"]
+    for i in range(count):
+        yield f"student-{i}", {
+            "student_name": f"Student {i}",
+            "course_name": rng.choice(courses),
+            "module_completed": f"Module {rng.randint(1, 8)}",
+            "quiz_score": rng.randint(40, 100),
+            "time_spent_hours": round(rng.uniform(0.5, 9), 1),
+            "assignments_submitted": rng.randint(0, 4),
+            "assignments_missed": rng.randint(0, 2),
+            "lowest_performing_skill": rng.choice(skills),
+        }
+
+
+def pack_prompt(pack: Dict[str, dict]) -> str:
+    return f"""
+    You are a helpful school assistant writing weekly updates for parents. For EACH student below:
+    1. Work out 3-4 simple, factual points about the week (achievements, struggles, and effort).
+    2. Turn them into a single, supportive, and easy-to-read paragraph for the parent. Keep a positive and
+       encouraging tone, but be clear about any areas for improvement.
+    3. Give one simple, positive, and actionable tip the parent can use to support their child this week.
+
+    Students (keyed by id):
+    {json.dumps(pack, indent=2)}
+
+    Respond with ONLY a JSON object with one entry per student id, exactly as given, each of the form
+    {{"summary_paragraph": "...", "suggested_support": "..."}}.
+
+    JSON Response:
+    """
+
+
+def parse_pack(content: str, ids: Iterable[str]) -> Dict[str, Dict[str, str]]:
+    """The valid digests in an answer, by id. Anything missing or malformed is left out."""
+    try:
+        answer = json.loads(content.strip().replace("```json", "").replace("```", ""))
+    except json.JSONDecodeError:
+        return {}
+    if not isinstance(answer, dict):
+        return {}
+    digests = {}
+    for student in ids:
+        digest = answer.get(student)
+        if isinstance(digest, dict) and all(isinstance(digest.get(key), str) and digest[key].strip()
+                                            for key in DIGEST_KEYS):
+            digests[student] = {key: digest[key].strip() for key in DIGEST_KEYS}
+    return digests
+
+
+async def digest_pack(pack: Dict[str, dict]) -> Tuple[Dict[str, Dict[str, str]], Dict[str, str]]:
+    """(digests, errors) by student id for one pack."""
+    remaining, digests, error = dict(pack), {}, "no valid digest in the answer"
+    for _ in range(MAX_PACK_ATTEMPTS):
+        try:
+            response = await llm.ainvoke(pack_prompt(remaining))
+            valid = parse_pack(response.content, remaining)
+        except Exception as e:
+            valid, error = {}, str(e)
+        digests.update(valid)
+        # Only the students without a valid digest go round again
+        remaining = {student: record for student, record in remaining.items() if student not in valid}
+        if not remaining:
+            break
+    return digests, {student: error for student in remaining}
+
+
+def load_checkpoint(output: str) -> Set[str]:
+    """
+    Ids that already have a digest in `output`. A torn last line from an
+    interrupted run is dropped; any other line that isn't a valid result is
+    skipped with a warning, so its student is simply digested again.
+    """
+    if not os.path.exists(output):
+        return set()
+    with open(output, "rb+") as f:
+        data = f.read()
+        if data and not data.endswith(b"\n"):
+            f.truncate(data.rfind(b"\n") + 1)
+            data = data[:data.rfind(b"\n") + 1]
+    done = set()
+    for number, line in enumerate(data.splitlines(), start=1):
+        if not line.strip():
+            continue
+        try:
+            result = json.loads(line)
+        except ValueError:
+            result = None
+        if not isinstance(result, dict) or "id" not in result:
+            print(f"WARNING: Skipping unreadable line {number} of '{output}'.")
+            continue
+        if "final_digest" in result:
+            done.add(result["id"])
+        else:
+            done.discard(result["id"])
+    return done
+
+
+async def run_batch(records: Iterable[Tuple[str, dict]], output: str, pack_size: int = PACK_SIZE,
+                    concurrency: int = PACK_CONCURRENCY) -> Dict[str, float]:
+    done = load_checkpoint(output)
+    metrics = get_gateway().metrics
+    calls_before = metrics.calls
+    stats = {"skipped": 0, "digests": 0, "failed": 0}
+    start = time.perf_counter()
+
+    with open(output, "a") as out:
+        def write(results: Tuple[Dict[str, Dict[str, str]], Dict[str, str]], names: Dict[str, str]):
+            digests, errors = results
+            for student, digest in digests.items():
+                out.write(json.dumps({"id": student, "student_name": names[student], "final_digest": digest}) + "\n")
+            for student, error in errors.items():
+                out.write(json.dumps({"id": student, "student_name": names[student], "error": error}) + "\n")
+            out.flush()  # Each finished pack is durable before the next is counted
+            stats["digests"] += len(digests)
+            stats["failed"] += len(errors)
+
+        in_flight: Dict[asyncio.Task, Dict[str, str]] = {}
+
+        async def drain(limit: int):
+            while len(in_flight) > limit:
+                finished, _ = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+                for task in finished:
+                    write(task.result(), in_flight.pop(task))
+
+        pack: Dict[str, dict] = {}
+
+        async def submit():
+            nonlocal pack
+            # Bounded: wait for a slot before taking more records off the input
+            await drain(concurrency - 1)
+            names = {student: record.get("student_name", student) for student, record in pack.items()}
+            in_flight[asyncio.create_task(digest_pack(pack))] = names
+            pack = {}
+
+        for student, record in records:
+            if student in done:
+                stats["skipped"] += 1
+                continue
+            pack[student] = record
+            if len(pack) >= pack_size:
+                await submit()
+        if pack:
+            await submit()
+        await drain(0)
+
+    elapsed = time.perf_counter() - start
+    stats.update({"seconds": elapsed, "llm_calls": metrics.calls - calls_before,
+                  "digests_per_minute": stats["digests"] / elapsed * 60 if elapsed else 0.0})
+    return stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate weekly parent digests for a whole cohort.")
+    parser.add_argument("path", nargs="?", help="Weekly records as JSONL (or a .json list, or - for stdin).")
+    parser.add_argument("--synthetic", type=int, default=None, help="Use this many synthetic students instead.")
+    parser.add_argument("--output", default="digests.jsonl", help="JSONL output; rerunning resumes from it.")
+    parser.add_argument("--pack-size", type=int, default=PACK_SIZE)
+    parser.add_argument("--concurrency", type=int, default=PACK_CONCURRENCY)
+    args = parser.parse_args()
+    if args.path is None and args.synthetic is None:
+        parser.error("give a records file or --synthetic N")
+
+    records = synthetic_records(args.synthetic) if args.synthetic is not None else read_records(args.path)
+    stats = asyncio.run(run_batch(records, args.output, args.pack_size, args.concurrency))
+    print(f"{stats['digests']} digests, {stats['failed']} failed, {stats['skipped']} already done, "
+          f"{stats['llm_calls']} LLM calls in {stats['seconds']:.1f}s "
+          f"({stats['digests_per_minute']:.0f} digests/minute) -> '{args.output}'")
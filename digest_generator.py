@@ -0,0 +1,134 @@
+# digest_generator.py
+"""
+Weekly parent digest agent from AI_Digest_Generator.ipynb, as an importable
+module. One student per run, three LLM calls in a row: bullet points, a
+paragraph for the parent, and a support tip. For whole cohorts use
+digest_batch.py, which packs many students into each call.
+
+    LLM_API_URL=http://127.0.0.1:8002/v1 python digest_generator.py
+"""
+import asyncio
+import json
+from functools import lru_cache
+from typing import Any, Dict, TypedDict
+
+from dotenv import load_dotenv
+
+from instrumentation import state_graph
+from llm_gateway import get_llm
+
+load_dotenv()
+
+llm = get_llm(temperature=0.7)
+
+student_weekly_data = {
+    "student_name": "Alex",
+    "course_name": "Trigonometry",
+    "module_completed": "Module 3: Sine and Cosine Functions",
+    "quiz_score": 85,  # good score
+    "time_spent_hours": 4.5,  # below the average of 5 hours
+    "assignments_submitted": 2,
+    "assignments_missed": 1,  # key point to mention
+    "lowest_performing_skill": "Word Problems"
+}
+
+
+class DigestGenerationState(TypedDict):
+    raw_data: Dict[str, Any]
+    bullet_points: str
+    synthesized_paragraph: str
+    final_digest: Dict[str, str]
+
+
+async def generate_bullet_points(state):
+    print("---NODE: Generating Bullet Points---")
+    raw_data = state["raw_data"]
+
+    prompt = f"""
+    Based on the following student data, generate a list of 3-4 simple, factual bullet points summarizing the week.
+    Focus on achievements, struggles, and effort.
+
+    Student Data:
+    {json.dumps(raw_data, indent=2)}
+
+    Summary Bullet Points:
+    """
+
+    response = await llm.ainvoke(prompt)
+    bullet_points = response.content
+    print(f"Generated Bullet Points:\n{bullet_points}")
+    return {"bullet_points": bullet_points}
+
+
+async def synthesize_paragraph(state):
+    print("---NODE: Synthesizing Paragraph---")
+    bullet_points = state["bullet_points"]
+    student_name = state["raw_data"]["student_name"]
+
+    prompt = f"""
+    You are a helpful school assistant writing a weekly update for a parent.
+    Rewrite the following bullet points about a student named {student_name} into a single, supportive, and easy-to-read paragraph.
+    Maintain a positive and encouraging tone, but be clear about any areas for improvement.
+
+    Bullet Points:
+    {bullet_points}
+
+    Synthesized Paragraph:
+    """
+
+    response = await llm.ainvoke(prompt)
+    paragraph = response.content
+    print(f"Synthesized Paragraph: {paragraph}")
+    return {"synthesized_paragraph": paragraph}
+
+
+async def generate_actionable_tip(state):
+    print("---NODE: Generating Actionable Tip---")
+    paragraph = state["synthesized_paragraph"]
+    student_name = state["raw_data"]["student_name"]
+
+    prompt = f"""
+    Based on the following weekly summary for a student named {student_name}, what is one simple, positive, and actionable tip you can provide to the parent to help support their child this week?
+
+    Summary:
+    "{paragraph}"
+
+    Actionable Tip:
+    """
+
+    response = await llm.ainvoke(prompt)
+    tip = response.content
+    print(f"Generated Tip: {tip}")
+    final_digest = {
+        "summary_paragraph": paragraph,
+        "suggested_support": tip
+    }
+    return {"final_digest": final_digest}
+
+
+@lru_cache(maxsize=None)
+def get_app():
+    """The compiled graph, built on first use."""
+    from langgraph.graph import END
+
+    workflow = state_graph(DigestGenerationState, "digest")
+
+    workflow.add_node("generate_bullet_points", generate_bullet_points)
+    workflow.add_node("synthesize_paragraph", synthesize_paragraph)
+    workflow.add_node("generate_actionable_tip", generate_actionable_tip)
+
+    workflow.set_entry_point("generate_bullet_points")
+    workflow.add_edge("generate_bullet_points", "synthesize_paragraph")
+    workflow.add_edge("synthesize_paragraph", "generate_actionable_tip")
+    workflow.add_edge("generate_actionable_tip", END)
+
+    return workflow.compile()
+
+
+if __name__ == "__main__":
+    print("--- RUNNING AI DIGEST GENERATION AGENT ---")
+    result = asyncio.run(get_app().ainvoke({"raw_data": student_weekly_data}))
+
+    print("\n\n================================\n")
+    print("--- FINAL GENERATED DIGEST FOR PARENT DASHBOARD ---")
+    print(json.dumps(result['final_digest'], indent=2))
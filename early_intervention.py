@@ -0,0 +1,256 @@
+# early_intervention.py
+"""
+Early Intervention Agent from Early_Intervention_Agent.ipynb, as an importable
+module, plus a nightly screening mode for whole schools.
+
+The graph analyses one student like the notebook did, with the rules from
+risk_scoring.py. `screen_cohort` scores every student at once, ranks them, and
+only sends students at or above RISK_THRESHOLD through the LLM. Students whose
+fired rules are the same share one core-problem prompt and one
+recommendations prompt, so a school costs at most two calls per distinct
+combination of rules rather than two per student.
+
+    LLM_API_URL=http://127.0.0.1:8002/v1 python early_intervention.py --synthetic 100000 --output risks.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, TypedDict
+
+from dotenv import load_dotenv
+
+from instrumentation import record_parse_failure, state_graph
+from llm_gateway import get_llm
+from risk_scoring import (Cohort, cohort_from_records, problem_findings, rank, rule_names, score_cohort,
+                          student_findings, synthetic_cohort)
+
+load_dotenv()
+
+llm = get_llm(temperature=0)
+
+# Students below this score are reported in the ranking but not sent to the LLM
+RISK_THRESHOLD = float(os.getenv("RISK_THRESHOLD", "0.3"))
+NO_ISSUES = "No significant issues identified. Student is performing well."
+
+student_data_alex = {
+    "student_name": "Alex Johnson",
+    "recent_grades": [65, 72, 58, 61],
+    "assignment_completion_rate": 0.95,
+    "class_participation_events": 2,
+    "last_login": "5 days ago"
+}
+
+student_data_maria = {
+    "student_name": "Maria Garcia",
+    "recent_grades": [92, 88, 95, 91],
+    "assignment_completion_rate": 0.70,
+    "class_participation_events": 8,
+    "last_login": "1 day ago"
+}
+
+
+class AnalysisState(TypedDict):
+    student_data: Dict[str, Any]
+    analysis_findings: List[str]
+    risk_score: float
+    core_problem: str
+    recommendations: Dict[str, Any]
+
+
+async def core_problem_for(findings: List[str]) -> str:
+    if not findings:
+        return NO_ISSUES
+    bullet_list = "\n- ".join(findings)
+    prompt = f"""
+    Based on the following analytical findings about a student, synthesize them into a single, core problem statement.
+    The problem statement should be a concise summary of the root cause.
+
+    Analytical Findings:
+    - {bullet_list}
+
+    Core Problem Statement:
+    """
+    response = await llm.ainvoke(prompt)
+    return response.content
+
+
+async def recommendations_for(problem: str, student_name: Optional[str] = None) -> Dict[str, Any]:
+    if problem == NO_ISSUES:
+        return {"summary": "No intervention needed.", "steps": ["Acknowledge student's good work."]}
+    # Without a name the prompt (and its cached answer) is shared by every student with this problem
+    student = f"a student named {student_name}" if student_name else "a student"
+    prompt = f"""
+    You are an expert educational strategist. For {student}, the core problem identified is:
+    "{problem}"
+
+    Based on this problem, generate a short, actionable intervention plan for the teacher.
+    Provide your response as a JSON object with two keys: "summary" (a one-sentence summary of the plan) and "steps" (a list of 2-3 concrete, actionable steps the teacher can take).
+
+    Example Format:
+    {{
+        "summary": "A brief summary of the intervention strategy.",
+        "steps": [
+            "First concrete action step.",
+            "Second concrete action step.",
+            "Third concrete action step."
+        ]
+    }}
+
+    JSON Response:
+    """
+    response = await llm.ainvoke(prompt)
+    try:
+        recommendations = json.loads(response.content.strip().replace("```json", "").replace("```", ""))
+        if not isinstance(recommendations, dict) or not {"summary", "steps"} <= recommendations.keys():
+            raise ValueError("expected a JSON object with summary and steps")
+    except ValueError:
+        record_parse_failure()
+        raise
+    return recommendations
+
+
+def fetch_student_data(state):
+    print("---NODE: Fetching Student Data---")
+    return {"student_data": state["student_data"]}
+
+
+def analyze_data(state):
+    print("---NODE: Analyzing Data---")
+    # A one-student cohort, so single runs and school screening apply the same rules
+    # One clock reading for both, or "3 days ago" would come out a hair over 3 days
+    now = time.time()
+    cohort = cohort_from_records([state["student_data"]], now)
+    scores = score_cohort(cohort, now)
+    findings = student_findings(cohort, scores, 0)
+    print(f"Findings: {findings}")
+    return {"analysis_findings": findings, "risk_score": float(scores.score[0])}
+
+
+async def identify_core_problem(state):
+    print("---NODE: Identifying Core Problem---")
+    problem = await core_problem_for(state["analysis_findings"])
+    print(f"Identified Problem: {problem}")
+    return {"core_problem": problem}
+
+
+async def generate_recommendations(state):
+    print("---NODE: Generating Recommendations---")
+    recommendations = await recommendations_for(state["core_problem"], state["student_data"].get("student_name"))
+    print(f"Generated Recommendations: {recommendations}")
+    return {"recommendations": recommendations}
+
+
+@lru_cache(maxsize=None)
+def get_app():
+    """The compiled graph, built on first use."""
+    from langgraph.graph import END
+
+    workflow = state_graph(AnalysisState, "early_intervention")
+
+    workflow.add_node("fetch_student_data", fetch_student_data)
+    workflow.add_node("analyze_data", analyze_data)
+    workflow.add_node("identify_core_problem", identify_core_problem)
+    workflow.add_node("generate_recommendations", generate_recommendations)
+
+    workflow.set_entry_point("fetch_student_data")
+    workflow.add_edge("fetch_student_data", "analyze_data")
+    workflow.add_edge("analyze_data", "identify_core_problem")
+    workflow.add_edge("identify_core_problem", "generate_recommendations")
+    workflow.add_edge("generate_recommendations", END)
+
+    return workflow.compile()
+
+
+async def plan_for_problem(flags: int) -> Dict[str, Any]:
+    """Core problem and recommendations for one combination of fired rules."""
+    try:
+        problem = await core_problem_for(problem_findings(flags))
+        return {"core_problem": problem, "recommendations": await recommendations_for(problem)}
+    except Exception as e:
+        print(f"  - FAILED to plan for {rule_names(flags)} ({e})")
+        return {"error": str(e)}
+
+
+def rank_students(cohort: Cohort, threshold: float = RISK_THRESHOLD, limit: Optional[int] = None,
+                  now: Optional[float] = None) -> Dict[str, Any]:
+    """
+    The students at or above `threshold` (the top `limit` of them, if given),
+    highest risk first, with their findings but no LLM plans yet. CPU only,
+    so agent_service can run it in its process pool.
+    """
+    scores = score_cohort(cohort, now)
+    ranked = rank(scores, threshold, limit)
+    students = [{"rank": position, "student_name": cohort.names[student],
+                 "risk_score": round(float(scores.score[student]), 3), "flags": int(scores.flags[student]),
+                 "rules": rule_names(int(scores.flags[student])),
+                 "findings": student_findings(cohort, scores, student)}
+                for position, student in enumerate(ranked, start=1)]
+    return {"students_screened": len(cohort.names), "flagged": int((scores.flags > 0).sum()),
+            "threshold": threshold, "students": students}
+
+
+def rank_records(records: List[dict], threshold: float = RISK_THRESHOLD, limit: Optional[int] = None,
+                 now: Optional[float] = None) -> Dict[str, Any]:
+    now = time.time() if now is None else now  # The same `now` for parsing logins and scoring them
+    return rank_students(cohort_from_records(records, now), threshold, limit, now)
+
+
+async def add_plans(ranking: Dict[str, Any]) -> Dict[str, Any]:
+    """Attaches the intervention plan for each student's combination of problems, one plan per combination."""
+    combinations = sorted({student["flags"] for student in ranking["students"]})
+    print(f"{ranking['flagged']} of {ranking['students_screened']} students flagged, {len(ranking['students'])} "
+          f"at or above {ranking['threshold']}; {len(combinations)} distinct problems to plan for")
+    plans = dict(zip(combinations, await asyncio.gather(*(plan_for_problem(flags) for flags in combinations))))
+    students = [{**{key: value for key, value in student.items() if key != "flags"}, **plans[student["flags"]]}
+                for student in ranking["students"]]
+    return {"students_screened": ranking["students_screened"], "threshold": ranking["threshold"],
+            "students": students}
+
+
+async def screen_cohort(cohort: Cohort, threshold: float = RISK_THRESHOLD, limit: Optional[int] = None,
+                        now: Optional[float] = None) -> Dict[str, Any]:
+    """
+    The ranked at-risk students, each with their findings and intervention
+    plan. Pass the `now` the cohort was built with.
+    """
+    return await add_plans(rank_students(cohort, threshold, limit, now))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Screen students for early intervention.")
+    parser.add_argument("path", nargs="?", help="A JSON list of student records like the notebook's. "
+                                                "Without it (or --synthetic), runs the graph for the two samples.")
+    parser.add_argument("--synthetic", type=int, default=None, help="Screen this many synthetic students instead.")
+    parser.add_argument("--threshold", type=float, default=RISK_THRESHOLD)
+    parser.add_argument("--limit", type=int, default=None, help="Only the highest-risk N students.")
+    parser.add_argument("--output", default=None, help="Write the ranked list here as JSON instead of printing it.")
+    args = parser.parse_args()
+
+    if args.path is None and args.synthetic is None:
+        for student_data in (student_data_alex, student_data_maria):
+            print(f"RUNNING ANALYSIS FOR {student_data['student_name'].upper()}")
+            result = asyncio.run(get_app().ainvoke({"student_data": student_data}))
+            print(f"\nFINAL RECOMMENDATION FOR {student_data['student_name'].upper()}")
+            print(f"Summary: {result['recommendations']['summary']}")
+            for i, step in enumerate(result['recommendations']['steps']):
+                print(f"{i + 1}. {step}")
+            print("\n\n================================\n\n")
+    else:
+        now = time.time()
+        if args.synthetic is not None:
+            cohort = synthetic_cohort(args.synthetic, now)
+        else:
+            with open(args.path) as f:
+                cohort = cohort_from_records(json.load(f), now)
+        start = time.perf_counter()
+        report = asyncio.run(screen_cohort(cohort, args.threshold, args.limit, now))
+        print(f"Screened {report['students_screened']} students in {time.perf_counter() - start:.2f}s")
+        if args.output:
+            with open(args.output, "w") as f:
+                json.dump(report, f, indent=2)
+            print(f"Saved {len(report['students'])} at-risk students to '{args.output}'.")
+        else:
+            print(json.dumps(report, indent=2))
@@ -0,0 +1,172 @@
+# fake_llm_server.py
+"""
+Local fake of an OpenAI-compatible chat completions API, for running the
+agents and load tests without a real LLM.
+
+    python fake_llm_server.py --latency 0.2 --port 8002
+    LLM_API_URL=http://127.0.0.1:8002/v1 python wellbeing_assistant.py
+
+Answers are deterministic and shaped like what each agent expects (a label
+for classifiers, "yes" for graders, JSON for JSON prompts), so every graph
+runs end to end. Requests with "stream": true get the answer back as SSE
+chunks, one word every --token-latency seconds; GET /stats shows how many
+streams finished and how many the client abandoned.
+"""
+import argparse
+import asyncio
+import json
+import random
+import re
+
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse, StreamingResponse
+
+app = FastAPI(title="Fake LLM")
+app.state.latency = 0.0
+app.state.jitter = 0.0
+app.state.fail_rate = 0.0
+app.state.malformed_rate = 0.0
+app.state.token_latency = 0.02
+app.state.stream_stats = {"completed": 0, "cancelled": 0, "tokens_sent": 0}
+
+INTENT_KEYWORDS = {
+    "stress": ["exam", "freaking", "anxious", "overwhelmed", "panic", "stress"],
+    "time_management": ["get started", "procrastinat", "deadline", "schedule", "organized", "time"],
+    "motivation": ["giving up", "give up", "pointless", "stuck", "motivat", "unmotivated"],
+}
+
+
+QUESTION_STOPWORDS = {"what", "which", "does", "where", "when", "with", "that", "this", "from", "their", "they",
+                      "have", "about", "there", "were", "into", "your", "explain", "describe", "happens", "many"}
+
+
+def fake_relevant(documents: str, question: str) -> bool:
+    """A stand-in grader: at least two of the question's content words appear in the documents."""
+    words = {word for word in re.findall(r"[a-z]{4,}", question.lower()) if word not in QUESTION_STOPWORDS}
+    documents = documents.lower()
+    return bool(words) and sum(word in documents for word in words) >= min(2, len(words))
+
+
+def fake_completion(prompt: str) -> str:
+    """A deterministic answer shaped like what the prompt asks for."""
+    if "Respond with ONLY the category name" in prompt:
+        message = prompt.rsplit("User Message:", 1)[-1].lower()
+        for intent, keywords in INTENT_KEYWORDS.items():
+            if any(keyword in message for keyword in keywords):
+                return intent
+        return "general_query"
+    if "'yes' or 'no'" in prompt:
+        documents, _, question = prompt.rpartition("User Question:")
+        return "yes" if fake_relevant(documents, question) else "no"
+    if '"RELEVANT: yes"' in prompt:
+        context, _, question = prompt.rpartition("Context:")[2].rpartition("Question:")
+        if not fake_relevant(context, question):
+            return "RELEVANT: no"
+        return f"RELEVANT: yes\nThis is a fake answer from the course materials to: {question.strip()}"
+    if "Students (keyed by id):" in prompt:
+        students = json.loads(prompt.split("Students (keyed by id):", 1)[1].split("Respond with ONLY", 1)[0])
+        return json.dumps({student: {"summary_paragraph": f"{record.get('student_name', student)} had a steady week "
+                                                          f"in {record.get('course_name', 'class')}.",
+                                     "suggested_support": "Ask about one thing they learned this week."}
+                           for student, record in students.items()})
+    if '"learning_materials"' in prompt:
+        unit = re.search(r"Syllabus Unit:\s*(Unit\s+\d+|\w+(?: \w+)?)", prompt)
+        title = unit.group(1) if unit else "Course overview"
+        return json.dumps([{"week": week, "title": f"{title}, part {week}", "learning_materials": ["Fake reading"],
+                            "assessments": ["Fake quiz"]} for week in (1, 2)])
+    if "list of strings" in prompt:
+        return json.dumps([f"Fake concept {i}" for i in range(1, 5)])
+    if '"question", "options"' in prompt:
+        concept = re.search(r'concept: "([^"]*)"', prompt)
+        topic = concept.group(1) if concept else "the content"
+        options = [f"Option {letter}" for letter in "ABCD"]
+        return json.dumps({"question": f"Which statement about {topic} is true?", "options": options,
+                           "answer": options[0]})
+    if '"summary"' in prompt and '"steps"' in prompt:
+        return json.dumps({"summary": "Fake summary.", "steps": ["Fake step one.", "Fake step two."]})
+    if "JSON" in prompt:
+        if "array" in prompt or "list of" in prompt.lower():
+            return "[]"
+        return json.dumps({"summary": "Fake summary.", "steps": ["Fake step."]})
+    words = re.findall(r"\w+", prompt)
+    return f"This is a fake response to a {len(words)}-word prompt."
+
+
+def count_tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+def stream_chunks(body: dict, prompt: str, content: str):
+    """OpenAI-style SSE chunks for `content`, ending with a usage chunk when asked for."""
+    stats = app.state.stream_stats
+
+    def chunk(delta: dict, finish_reason=None) -> str:
+        payload = {"id": "fake-completion", "object": "chat.completion.chunk", "model": body.get("model", "fake"),
+                   "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}]}
+        return f"data: {json.dumps(payload)}\n\n"
+
+    async def events():
+        try:
+            yield chunk({"role": "assistant"})
+            for word in re.findall(r"\S+\s*", content):
+                await asyncio.sleep(app.state.token_latency)
+                stats["tokens_sent"] += 1
+                yield chunk({"content": word})
+            yield chunk({}, "stop")
+            if (body.get("stream_options") or {}).get("include_usage"):
+                usage = {"prompt_tokens": count_tokens(prompt), "completion_tokens": count_tokens(content),
+                         "total_tokens": count_tokens(prompt) + count_tokens(content)}
+                yield f"data: {json.dumps({'id': 'fake-completion', 'choices': [], 'usage': usage})}\n\n"
+            yield "data: [DONE]\n\n"
+            stats["completed"] += 1
+        except asyncio.CancelledError:
+            stats["cancelled"] += 1
+            raise
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+
+@app.get("/stats")
+async def stats():
+    return app.state.stream_stats
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(body: dict):
+    await asyncio.sleep(max(0.0, app.state.latency + random.uniform(-app.state.jitter, app.state.jitter)))
+    if random.random() < app.state.fail_rate:
+        return JSONResponse(status_code=503, content={"error": {"message": "Fake overload"}})
+    prompt = "\n".join(message.get("content") or "" for message in body.get("messages", []))
+    content = fake_completion(prompt)
+    if content.startswith(("[", "{")) and random.random() < app.state.malformed_rate:
+        content = content[:-1]  # Truncated JSON, like a model that stopped early
+    if body.get("stream"):
+        return stream_chunks(body, prompt, content)
+    return {
+        "id": "fake-completion",
+        "object": "chat.completion",
+        "model": body.get("model", "fake"),
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+        "usage": {"prompt_tokens": count_tokens(prompt), "completion_tokens": count_tokens(content),
+                  "total_tokens": count_tokens(prompt) + count_tokens(content)},
+    }
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Serve a fake OpenAI-compatible LLM API.")
+    parser.add_argument("--port", type=int, default=8002)
+    parser.add_argument("--latency", type=float, default=0.2, help="Seconds added to every completion.")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Uniform +/- seconds around the latency.")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="Fraction of requests answered with 503.")
+    parser.add_argument("--malformed-rate", type=float, default=0.0, help="Fraction of JSON answers truncated.")
+    parser.add_argument("--token-latency", type=float, default=0.02, help="Seconds between streamed words.")
+    args = parser.parse_args()
+
+    app.state.latency = args.latency
+    app.state.jitter = args.jitter
+    app.state.fail_rate = args.fail_rate
+    app.state.malformed_rate = args.malformed_rate
+    app.state.token_latency = args.token_latency
+    uvicorn.run(app, host="127.0.0.1", port=args.port, log_level="warning")
@@ -1,13 +1,20 @@
 import os
 import json
-from langchain_groq import ChatGroq
-from langgraph.graph import END, StateGraph
-from typing import TypedDict, List, Dict, Any
+import asyncio
+from typing import List, Dict, Any
 from dotenv import load_dotenv
 
+from group_solver import GroupSolver
+from llm_gateway import get_llm
+
 load_dotenv()
 
-llm = ChatGroq(temperature=0.8, model_name="openai/gpt-oss-120b")
+llm = get_llm(temperature=0.8)
+
+# Groups are formed locally (group_solver.py); the LLM only writes the
+# justifications, for up to this many groups per call
+JUSTIFICATION_BATCH_SIZE = int(os.getenv("GROUP_JUSTIFICATION_BATCH_SIZE", "50"))
+GROUP_SOLVER_SECONDS = float(os.getenv("GROUP_SOLVER_SECONDS", "2"))
 
 student_profiles = [
     {"name": "Alice", "strengths": ["Research", "Writing"], "weaknesses": ["Presentation", "Design"]},
@@ -19,25 +26,90 @@ student_profiles = [
 ]
 
 group_size = 3
-prompt = f"""
-You are an expert project manager and team builder. Your task is to form optimal student groups for a project.
-Based on the following student profiles, create {len(student_profiles) // group_size} groups of {group_size}.
 
-The goal is to create **balanced** groups where students' strengths can help cover their teammates' weaknesses.
-Provide a brief justification for why each group is a good match.
 
-Student Profiles:
-{json.dumps(student_profiles, indent=2)}
+def student_names(profiles: List[Dict[str, Any]]) -> List[str]:
+    """Each profile's name, or "Student <n>" (1-based position) for a profile without one."""
+    return [profile.get("name") or f"Student {number}" for number, profile in enumerate(profiles, start=1)]
+
+
+def coverage_facts(solver: GroupSolver, group: List[int], names: List[str]) -> List[str]:
+    return [f"{names[helper]} covers {names[member]}'s weakness in {skill}"
+            for member, skill, helper in solver.covered_pairs(group)]
+
+
+def local_justification(facts: List[str]) -> str:
+    if not facts:
+        return "No member's weakness is covered by a teammate; this group was formed from the remaining students."
+    return "Balanced group: " + "; ".join(facts) + "."
+
+
+async def justify_batch(batch: Dict[str, Dict[str, Any]]) -> Dict[str, str]:
+    prompt = f"""
+You are an expert project manager and team builder. The student groups below have already been formed so that
+teammates' strengths cover each other's weaknesses. For each group, write a brief (1-2 sentence) justification
+of why it is a good match, based on the facts given.
+
+Groups:
+{json.dumps(batch, indent=2)}
 
-Format your response as a JSON object. The top-level keys should be "Group 1", "Group 2", etc.
-The value for each key should be an object containing "members" (a list of student names) and "justification" (a string).
+Format your response as a JSON object whose keys are the group names ("Group 1", ...) and whose values are the
+justification strings.
 
 JSON Output:
 """
+    try:
+        response = await llm.ainvoke(prompt)
+        cleaned_response = response.content.strip().replace("```json", "").replace("```", "")
+        justifications = json.loads(cleaned_response)
+        if not isinstance(justifications, dict):
+            raise ValueError("expected a JSON object")
+    except Exception as e:
+        print(f"  - FAILED to get justifications for {len(batch)} groups ({e}). Using the coverage facts instead.")
+        return {}
+    return {name: text for name, text in justifications.items() if name in batch and isinstance(text, str)}
+
+
+def plan_groups(profiles: List[Dict[str, Any]], size: int = 3,
+                time_limit: float = GROUP_SOLVER_SECONDS) -> Dict[str, Dict[str, Any]]:
+    """
+    The groups and their coverage facts, with no LLM call (agent_service runs this in its process pool).
+    An empty cohort has no groups; raises ValueError for a group size below 2.
+    """
+    solver = GroupSolver(profiles, size)
+    if not profiles:
+        return {}
+    grouping = solver.solve(time_limit)
+    names = student_names(profiles)
+    return {
+        f"Group {number}": {"members": [names[student] for student in group],
+                            "facts": coverage_facts(solver, group, names)}
+        for number, group in enumerate(grouping.groups, start=1)
+    }
+
+
+async def justify_groups(groups: Dict[str, Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    names = list(groups)
+    batches = [{name: groups[name] for name in names[i:i + JUSTIFICATION_BATCH_SIZE]}
+               for i in range(0, len(names), JUSTIFICATION_BATCH_SIZE)]
+    justifications = {}
+    for result in await asyncio.gather(*(justify_batch(batch) for batch in batches)):
+        justifications.update(result)
+
+    return {
+        name: {"members": group["members"],
+               "justification": justifications.get(name) or local_justification(group["facts"])}
+        for name, group in groups.items()
+    }
+
+
+async def form_groups(profiles: List[Dict[str, Any]], size: int = 3,
+                      time_limit: float = GROUP_SOLVER_SECONDS) -> Dict[str, Dict[str, Any]]:
+    return await justify_groups(plan_groups(profiles, size, time_limit))
+
 
-response = llm.invoke(prompt)
-cleaned_response = response.content.strip().replace("```json", "").replace("```", "")
-suggested_groups = json.loads(cleaned_response)
+if __name__ == "__main__":
+    suggested_groups = asyncio.run(form_groups(student_profiles, group_size))
 
-print("--- AI-SUGGESTED GROUPS ---")
-print(json.dumps(suggested_groups, indent=2))
+    print("--- AI-SUGGESTED GROUPS ---")
+    print(json.dumps(suggested_groups, indent=2))
@@ -0,0 +1,213 @@
+# group_solver.py
+"""
+Local optimizer for forming balanced student project groups.
+
+Each student's strengths and weaknesses are interned into bitmasks
+(skill_index.SkillIndex). A group's coverage is the number of members'
+weaknesses that some teammate has as a strength:
+
+    coverage(group) = sum(popcount(weak[m] & OR(strong[t] for t != m)) for m in group)
+
+The objective is the sum of sqrt(coverage) over groups. The square root makes
+lifting a weak group worth more than pushing a strong one higher, so groups
+come out balanced. Groups are seeded greedily, then improved by simulated
+annealing over member swaps between groups, within a time budget.
+
+    python group_solver.py --students 5000 --group-size 3
+"""
+import argparse
+import math
+import random
+import time
+from typing import List, NamedTuple, Optional, Sequence
+
+from skill_index import SkillIndex, normalize_skill
+
+SEED_CANDIDATES = 32  # Unassigned students sampled per greedy pick
+ITERATIONS_PER_GROUP = 5000
+
+
+class Grouping(NamedTuple):
+    groups: List[List[int]]  # Student indices per group
+    coverage: List[int]      # Covered weaknesses per group
+    objective: float
+
+
+class GroupSolver:
+    """Forms groups of `group_size` from student profiles with "strengths" and "weaknesses" lists."""
+
+    def __init__(self, profiles: Sequence[dict], group_size: int = 3, seed: int = 0):
+        if group_size < 2:
+            raise ValueError("group_size must be at least 2")
+        self.profiles = profiles
+        self.group_size = group_size
+        self.skills = SkillIndex()
+        self.strong = [self.skills.add_mask(profile.get("strengths", [])) for profile in profiles]
+        self.weak = [self.skills.add_mask(profile.get("weaknesses", [])) for profile in profiles]
+        # Skill names as first written, for explanations
+        self.labels = {}
+        for profile in profiles:
+            for skill in (*profile.get("strengths", []), *profile.get("weaknesses", [])):
+                self.labels.setdefault(normalize_skill(skill), skill)
+        self.rng = random.Random(seed)
+
+    def coverage(self, group: Sequence[int]) -> int:
+        strong, weak = self.strong, self.weak
+        # Prefix/suffix ORs give every member's "teammates' strengths" in O(k)
+        size = len(group)
+        suffix = [0] * (size + 1)
+        for i in range(size - 1, -1, -1):
+            suffix[i] = suffix[i + 1] | strong[group[i]]
+        covered, prefix = 0, 0
+        for i, member in enumerate(group):
+            covered += (weak[member] & (prefix | suffix[i + 1])).bit_count()
+            prefix |= strong[member]
+        return covered
+
+    def evaluate(self, groups: List[List[int]]) -> Grouping:
+        coverage = [self.coverage(group) for group in groups]
+        return Grouping(groups, coverage, sum(math.sqrt(c) for c in coverage))
+
+    def group_sizes(self) -> List[int]:
+        """len // group_size groups; leftover students make some groups one larger. No students, no groups."""
+        if not self.profiles:
+            return []
+        count = max(1, len(self.profiles) // self.group_size)
+        base, extra = divmod(len(self.profiles), count)
+        return [base + 1 if i < extra else base for i in range(count)]
+
+    def seed_groups(self) -> List[List[int]]:
+        """Greedy: start each group from the most-in-need student, add whoever covers the most."""
+        unassigned = sorted(range(len(self.profiles)), key=lambda s: -self.weak[s].bit_count())
+        unassigned.reverse()  # Most in need at the end, where removal is cheap
+        groups = []
+        for size in self.group_sizes():
+            group = [unassigned.pop()]
+            while len(group) < size:
+                sample = (range(len(unassigned)) if len(unassigned) <= SEED_CANDIDATES
+                          else self.rng.sample(range(len(unassigned)), SEED_CANDIDATES))
+                best = max(sample, key=lambda i: self.coverage(group + [unassigned[i]]))
+                # O(1) removal: swap the pick to the end. This only reorders the tail
+                # of the need ranking slightly, which the annealing evens out.
+                unassigned[best], unassigned[-1] = unassigned[-1], unassigned[best]
+                group.append(unassigned.pop())
+            groups.append(group)
+        return groups
+
+    def anneal(self, groups: List[List[int]], time_limit: float = 2.0, max_iterations: Optional[int] = None,
+               start_temperature: float = 0.5, end_temperature: float = 0.005) -> Grouping:
+        """
+        Swaps members between random pairs of groups; worse moves pass with
+        probability exp(delta / T). Stops at `time_limit` seconds or
+        `max_iterations` (default ITERATIONS_PER_GROUP per group) and returns
+        the best grouping seen.
+        """
+        coverage = [self.coverage(group) for group in groups]
+        value = [math.sqrt(c) for c in coverage]
+        objective = best_objective = sum(value)
+        best = None  # Snapshot of the best grouping, taken only before leaving it
+        if len(groups) < 2 or time_limit <= 0:
+            return Grouping(groups, coverage, objective)
+        if max_iterations is None:
+            max_iterations = ITERATIONS_PER_GROUP * len(groups)
+
+        rng = self.rng
+        start = time.perf_counter()
+        temperature = start_temperature
+        cooling = math.log(end_temperature / start_temperature)
+        for iteration in range(max_iterations):
+            if iteration % 1024 == 0:
+                progress = max((time.perf_counter() - start) / time_limit, iteration / max_iterations)
+                if progress >= 1:
+                    break
+                temperature = start_temperature * math.exp(cooling * progress)
+
+            a, b = rng.randrange(len(groups)), rng.randrange(len(groups) - 1)
+            b += b >= a
+            group_a, group_b = groups[a], groups[b]
+            i, j = rng.randrange(len(group_a)), rng.randrange(len(group_b))
+            group_a[i], group_b[j] = group_b[j], group_a[i]
+            coverage_a, coverage_b = self.coverage(group_a), self.coverage(group_b)
+            delta = math.sqrt(coverage_a) + math.sqrt(coverage_b) - value[a] - value[b]
+            if delta >= 0 or rng.random() < math.exp(delta / temperature):
+                if delta < 0 and best is None and objective >= best_objective - 1e-9:
+                    # Undo, snapshot the best grouping, then take the worse move
+                    group_a[i], group_b[j] = group_b[j], group_a[i]
+                    best = ([list(g) for g in groups], list(coverage), objective)
+                    group_a[i], group_b[j] = group_b[j], group_a[i]
+                coverage[a], coverage[b] = coverage_a, coverage_b
+                value[a], value[b] = math.sqrt(coverage_a), math.sqrt(coverage_b)
+                objective += delta
+                if objective > best_objective + 1e-9:
+                    best_objective, best = objective, None  # The current grouping is the best again
+            else:
+                group_a[i], group_b[j] = group_b[j], group_a[i]
+        if best is not None:
+            return Grouping(*best)
+        return Grouping(groups, coverage, objective)
+
+    def solve(self, time_limit: float = 2.0) -> Grouping:
+        return self.anneal(self.seed_groups(), time_limit)
+
+    def covered_pairs(self, group: Sequence[int]) -> List[tuple]:
+        """(student, weakness, teammate) for every weakness a teammate covers."""
+        pairs = []
+        for member in group:
+            for skill in self.skills.names_of(self.weak[member]):
+                bit = 1 << self.skills.ids[skill]
+                helper = next((t for t in group if t != member and self.strong[t] & bit), None)
+                if helper is not None:
+                    pairs.append((member, self.labels.get(skill, skill), helper))
+        return pairs
+
+
+def random_grouping(solver: GroupSolver, seed: int = 0) -> Grouping:
+    """Baseline: shuffle students into groups of the same sizes."""
+    students = list(range(len(solver.profiles)))
+    random.Random(seed).shuffle(students)
+    groups, offset = [], 0
+    for size in solver.group_sizes():
+        groups.append(students[offset:offset + size])
+        offset += size
+    return solver.evaluate(groups)
+
+
+def synthetic_profiles(count: int, num_skills: int = 24, seed: int = 0) -> List[dict]:
+    rng = random.Random(seed)
+    skills = [f"Skill {i}" for i in range(num_skills)]
+    profiles = []
+    for i in range(count):
+        chosen = rng.sample(skills, rng.randint(3, 6))
+        split = len(chosen) // 2
+        profiles.append({"name": f"Student {i}", "strengths": chosen[:split], "weaknesses": chosen[split:]})
+    return profiles
+
+
+def benchmark(students: int = 5000, group_size: int = 3, time_limit: float = 3.0):
+    profiles = synthetic_profiles(students)
+    solver = GroupSolver(profiles, group_size)
+
+    def describe(label: str, grouping: Grouping, seconds: float):
+        coverage = sorted(grouping.coverage)
+        print(f"{label:>10}: objective {grouping.objective:9.1f}, covered weaknesses {sum(coverage):6d}, "
+              f"groups with none {sum(c == 0 for c in coverage):5d}, median {coverage[len(coverage) // 2]} "
+              f"({seconds:.2f}s)")
+
+    print(f"{students} students, groups of {group_size}:")
+    start = time.perf_counter()
+    describe("random", random_grouping(solver), time.perf_counter() - start)
+    start = time.perf_counter()
+    seeded = solver.seed_groups()
+    seed_seconds = time.perf_counter() - start
+    describe("greedy", solver.evaluate(seeded), seed_seconds)
+    start = time.perf_counter()
+    describe("annealed", solver.anneal(seeded, time_limit), seed_seconds + time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the group solver on a synthetic cohort.")
+    parser.add_argument("--students", type=int, default=5000)
+    parser.add_argument("--group-size", type=int, default=3)
+    parser.add_argument("--time-limit", type=float, default=3.0)
+    args = parser.parse_args()
+    benchmark(args.students, args.group_size, args.time_limit)
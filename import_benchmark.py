@@ -0,0 +1,84 @@
+# import_benchmark.py
+"""
+Cold-start benchmark for the agent modules.
+
+Each module is imported in a fresh interpreter under `python -X importtime`,
+from an empty working directory, and the report shows:
+- its cumulative import time (best of --repeat runs);
+- the time its `get_app()` takes to build the graph on first use;
+- any files the import created.
+Pass --repo to measure another checkout, e.g. the previous commit in a git
+worktree, for a before/after comparison.
+
+    python import_benchmark.py
+    git worktree add /tmp/before HEAD~1 && python import_benchmark.py --repo /tmp/before
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+from typing import List, Optional, Tuple
+
+MODULES = ["wellbeing_assistant", "personalised_planner", "syllabus_agent", "group_matching", "content_copilot",
+           "tutor_agent", "early_intervention", "digest_generator", "digest_batch", "agent_service"]
+
+_FIRST_USE = """
+import time, {module}
+start = time.perf_counter()
+if hasattr({module}, "get_app"):
+    {module}.get_app()
+    print(time.perf_counter() - start)
+"""
+
+
+def _run(code: List[str], repo: str, workdir: str) -> subprocess.CompletedProcess:
+    env = {**os.environ, "PYTHONPATH": os.path.abspath(repo), "PYTHONDONTWRITEBYTECODE": "1"}
+    return subprocess.run([sys.executable, *code], cwd=workdir, env=env, capture_output=True, text=True)
+
+
+def import_seconds(module: str, repo: str, repeat: int = 3) -> Tuple[float, List[str]]:
+    """Best cumulative import time, and the files the first import left in its working directory."""
+    best, created = float("inf"), []
+    for attempt in range(repeat):
+        with tempfile.TemporaryDirectory() as workdir:
+            result = _run(["-X", "importtime", "-c", f"import {module}"], repo, workdir)
+            if result.returncode != 0:
+                raise RuntimeError(f"import {module} failed:\n{result.stderr[-2000:]}")
+            if attempt == 0:
+                created = sorted(os.listdir(workdir))
+        for line in result.stderr.splitlines():
+            # "import time: self [us] | cumulative | imported package"
+            parts = line.split("|")
+            if len(parts) == 3 and parts[2].strip() == module:
+                best = min(best, int(parts[1]) / 1e6)
+    return best, created
+
+
+def first_use_seconds(module: str, repo: str) -> Optional[float]:
+    with tempfile.TemporaryDirectory() as workdir:
+        result = _run(["-c", _FIRST_USE.format(module=module)], repo, workdir)
+    output = result.stdout.strip().splitlines()
+    return float(output[-1]) if result.returncode == 0 and output else None
+
+
+def benchmark(modules: List[str] = MODULES, repo: str = ".", repeat: int = 3):
+    print(f"Cold imports from {os.path.abspath(repo)} (best of {repeat}):")
+    print(f"  {'module':<22}{'import':>10}{'get_app()':>12}  files created")
+    total = 0.0
+    for module in modules:
+        seconds, created = import_seconds(module, repo, repeat)
+        build = first_use_seconds(module, repo)
+        total += seconds
+        build_text = "-" if build is None else f"{build * 1e3:.0f}ms"
+        print(f"  {module:<22}{seconds * 1e3:8.0f}ms{build_text:>12}  {', '.join(created) or '-'}")
+    print(f"  {'total':<22}{total * 1e3:8.0f}ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure cold import time of the agent modules.")
+    parser.add_argument("modules", nargs="*", default=MODULES)
+    parser.add_argument("--repo", default=".", help="Checkout to import from.")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    benchmark(args.modules, args.repo, args.repeat)
@@ -1,14 +1,26 @@
 # ingest_jobs.py
+import argparse
+import asyncio
+import glob
+import itertools
+import math
 import requests
 import os
 import json
+import time
 from dotenv import load_dotenv
 
+from job_store import iter_job_records
+from rate_limit import TokenBucket, retry_async
+from skill_extractor import extract_skills
+
 # Load the environment variables from the .env file
 load_dotenv()
 
 # --- Configuration ---
-API_URL = "http://api.adzuna.com/v1/api/jobs/us/search/1" # Using 'us' for United States jobs
+# Using 'us' for United States jobs. The page number is appended to the base URL.
+API_BASE_URL = os.getenv("ADZUNA_API_URL", "http://api.adzuna.com/v1/api/jobs/us/search")
+API_URL = f"{API_BASE_URL}/1"
 APP_ID = os.getenv("ADZUNA_APP_ID")
 APP_KEY = os.getenv("ADZUNA_APP_KEY")
 
@@ -22,25 +34,106 @@ SEARCH_QUERIES = [
 ]
 RESULTS_PER_PAGE = 50 # Adzuna's max is 50
 OUTPUT_FILE = "jobs.json"
+NDJSON_OUTPUT_FILE = "jobs.ndjson"  # Streaming mode: one job per line
+
+# Async ingestion defaults
+MAX_PAGES_PER_QUERY = 20
+MAX_CONCURRENT_REQUESTS = 8
+REQUESTS_PER_SECOND = 2.0  # Token-bucket rate limit shared by every query
+MAX_RETRIES = 4
 
 def extract_skills_from_description(description: str) -> list:
-    """A simple placeholder for skill extraction."""
-    # In a real system, this would use a more sophisticated NLP model.
-    known_skills = ["python", "r", "sql", "tensorflow", "scikit-learn", "aws", "docker", "kubernetes", "ci/cd", "django", "rest apis", "data analysis", "pytorch"]
-    found_skills = {skill.capitalize() for skill in known_skills if skill in description.lower()}
-    return list(found_skills)
+    """Finds taxonomy skills in the description in one word-boundary-aware pass."""
+    return extract_skills(description or '')
+
+def process_job(job_data: dict) -> dict:
+    """Converts one Adzuna result into the jobs.json record format."""
+    return {
+        "id": job_data.get('id'),
+        "title": job_data.get('title'),
+        "company": job_data.get('company', {}).get('display_name'),
+        # We need to extract skills from the description
+        "required_skills": extract_skills_from_description(job_data.get('description', '')),
+        # Storing the full description is useful for semantic search
+        "description": job_data.get('description') 
+    }
+
+class NDJSONJobWriter:
+    """
+    Streams jobs to `path` one JSON line at a time. Lines go to `path`.partial
+    as they arrive and the file is renamed into place on commit, so readers
+    only ever see a complete file. If the run crashes, the partial file keeps
+    everything written so far. The next writer moves it to a uniquely named
+    `<name>.recovered.<time>.ndjson` instead of truncating it and lists every
+    recovery file in `recovered_paths`. The caller copies those jobs back in
+    (iter_recovered_jobs), and commit deletes the files.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.partial_path = f"{path}.partial"
+        base = os.path.splitext(path)[0]
+        if os.path.exists(self.partial_path):
+            stamp = time.strftime("%Y%m%dT%H%M%S")
+            recovered_path = next(candidate for n in itertools.count()
+                                  if not os.path.exists(candidate := f"{base}.recovered.{stamp}-{n}.ndjson"))
+            os.replace(self.partial_path, recovered_path)
+        self.recovered_paths = sorted(glob.glob(f"{glob.escape(base)}.recovered*.ndjson"))
+        self.count = 0
+        self._file = open(self.partial_path, 'w')
 
-def fetch_and_save_jobs():
+    def write(self, job: dict):
+        self._file.write(json.dumps(job) + "\n")
+        self._file.flush()
+        self.count += 1
+
+    def commit(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._file.close()
+        os.replace(self.partial_path, self.path)
+        # Their jobs were copied into this file, so they are no longer needed
+        for recovered_path in self.recovered_paths:
+            os.remove(recovered_path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.commit()
+        else:
+            self._file.close()
+            print(f"Ingestion failed. The {self.count} jobs written so far are kept in '{self.partial_path}'.")
+        return False
+
+
+def fetch_and_save_jobs(stream: bool = False):
     """
     Connects to the Adzuna API for each query, processes the results,
-    and saves them to a JSON file.
+    and saves them to a JSON file. With `stream=True`, each job is appended
+    to an NDJSON file as soon as it is processed instead.
     """
     if not APP_ID or not APP_KEY:
         print("ERROR: Adzuna App ID or Key not found in .env file.")
         print("Please create a .env file with your credentials.")
         return
 
-    all_jobs = []
+    if stream:
+        writer = NDJSONJobWriter(NDJSON_OUTPUT_FILE)
+        written_ids = set()
+
+        def emit(job):
+            if str(job['id']) not in written_ids:
+                written_ids.add(str(job['id']))
+                writer.write(job)
+
+        # Keep what crashed runs fetched; the queries below only add jobs not seen yet
+        for job in iter_recovered_jobs(writer.recovered_paths):
+            emit(job)
+    else:
+        all_jobs = []
+        emit = all_jobs.append
     print("Starting job ingestion from Adzuna...")
 
     for query in SEARCH_QUERIES:
@@ -59,21 +152,17 @@ def fetch_and_save_jobs():
             data = response.json()
             
             for job_data in data.get('results', []):
-                processed_job = {
-                    "id": job_data.get('id'),
-                    "title": job_data.get('title'),
-                    "company": job_data.get('company', {}).get('display_name'),
-                    # We need to extract skills from the description
-                    "required_skills": extract_skills_from_description(job_data.get('description', '')),
-                    # Storing the full description is useful for semantic search
-                    "description": job_data.get('description') 
-                }
-                all_jobs.append(processed_job)
+                emit(process_job(job_data))
 
         except requests.exceptions.RequestException as e:
             print(f"ERROR: Could not fetch data for query '{query}'. Reason: {e}")
             continue
 
+    if stream:
+        writer.commit()
+        print(f"\nSuccessfully streamed {writer.count} jobs to '{NDJSON_OUTPUT_FILE}'.")
+        return
+
     print(f"\nFetched a total of {len(all_jobs)} jobs.")
 
     # Save the processed data to a local file
@@ -83,5 +172,210 @@ def fetch_and_save_jobs():
     print(f"Successfully saved jobs to '{OUTPUT_FILE}'.")
 
 
+
+class RetryableHTTPError(Exception):
+    """A 429 or 5xx response that is worth retrying."""
+
+
+def load_existing_jobs(path: str) -> dict:
+    """Previously saved jobs keyed by id, for incremental runs."""
+    try:
+        return {str(job['id']): job for job in iter_job_records(path)}
+    except FileNotFoundError:
+        return {}
+
+def iter_recovered_jobs(paths: list):
+    """Jobs from crashed runs' partial files. A line cut off by the crash is skipped."""
+    for path in paths:
+        with open(path) as f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    if line.strip():
+                        print(f"WARNING: Skipping an incomplete line in '{path}'.")
+
+def iter_existing_jobs(paths: list):
+    """Streams previously saved jobs from each path that exists, in order."""
+    for path in paths:
+        if os.path.exists(path):
+            yield from iter_job_records(path)
+
+
+async def fetch_page(client, bucket: TokenBucket, semaphore: asyncio.Semaphore, query: str, page: int,
+                     incremental: bool) -> dict:
+    """Fetches one results page, rate limited and retried with backoff."""
+    import httpx
+
+    params = {
+        'app_id': APP_ID,
+        'app_key': APP_KEY,
+        'results_per_page': RESULTS_PER_PAGE,
+        'what': query,
+        'content-type': 'application/json'
+    }
+    if incremental:
+        params['sort_by'] = 'date'  # Newest first, so paging can stop at the first known page
+
+    async def attempt():
+        await bucket.acquire()
+        async with semaphore:
+            response = await client.get(f"{API_BASE_URL}/{page}", params=params)
+        if response.status_code == 429 or response.status_code >= 500:
+            raise RetryableHTTPError(f"HTTP {response.status_code}")
+        response.raise_for_status()
+        return response.json()
+
+    def log_retry(attempt_number, error):
+        print(f"  - Retrying '{query}' page {page} (attempt {attempt_number}) after: {error}")
+
+    return await retry_async(attempt, retries=MAX_RETRIES, retry_on=(RetryableHTTPError, httpx.TransportError),
+                             on_retry=log_retry)
+
+
+async def ingest_query(client, bucket, semaphore, query: str, known_ids: set, max_pages: int,
+                       incremental: bool, stats: dict, emit) -> int:
+    """
+    Pages through one query and passes each new, processed job to `emit`.
+    Full runs fetch every page after the first concurrently. Incremental runs
+    walk newest-first and stop at the first page with no unseen postings.
+    Returns the number of new jobs.
+    """
+    new_count = 0
+
+    def collect(data) -> int:
+        nonlocal new_count
+        stats['pages'] += 1
+        found = 0
+        for job_data in data.get('results', []):
+            job_id = str(job_data.get('id'))
+            if job_id in known_ids:
+                continue
+            known_ids.add(job_id)
+            emit(process_job(job_data))  # Only new postings are re-extracted
+            found += 1
+        new_count += found
+        return found
+
+    first_page = await fetch_page(client, bucket, semaphore, query, 1, incremental)
+    found = collect(first_page)
+    total_pages = min(max_pages, math.ceil(first_page.get('count', 0) / RESULTS_PER_PAGE))
+
+    if incremental:
+        page = 2
+        while found and page <= total_pages:
+            found = collect(await fetch_page(client, bucket, semaphore, query, page, incremental))
+            page += 1
+    else:
+        pages = await asyncio.gather(
+            *(fetch_page(client, bucket, semaphore, query, page, incremental) for page in range(2, total_pages + 1)),
+            return_exceptions=True,
+        )
+        for page, data in enumerate(pages, start=2):
+            if isinstance(data, Exception):
+                print(f"ERROR: Could not fetch page {page} for query '{query}'. Reason: {data}")
+                continue
+            collect(data)
+
+    print(f"  - '{query}': {new_count} new jobs.")
+    return new_count
+
+
+async def fetch_and_save_jobs_async(max_pages: int = MAX_PAGES_PER_QUERY, concurrency: int = MAX_CONCURRENT_REQUESTS,
+                                    requests_per_second: float = REQUESTS_PER_SECOND, incremental: bool = True,
+                                    stream: bool = False, output_file: str = None) -> dict:
+    """
+    Concurrent, paginated ingestion across all SEARCH_QUERIES with one pooled
+    HTTP client. Incremental runs keep the existing jobs and only add postings
+    whose id hasn't been seen. With `stream=True` jobs are written to NDJSON
+    as they arrive, so memory stays flat however large the run. Returns the
+    run statistics.
+    """
+    import httpx
+
+    if not APP_ID or not APP_KEY:
+        print("ERROR: Adzuna App ID or Key not found in .env file.")
+        print("Please create a .env file with your credentials.")
+        return {}
+
+    output_file = output_file or (NDJSON_OUTPUT_FILE if stream else OUTPUT_FILE)
+    if stream:
+        # The writer sets aside jobs from a run that crashed before it could commit
+        writer = NDJSONJobWriter(output_file)
+        # A crashed run may have stopped part-way through a query, so page
+        # through everything this time (known jobs are still skipped)
+        paginate_incrementally = incremental and not writer.recovered_paths
+        known_ids = set()
+        # Full runs start from nothing but still keep what crashed runs fetched
+        previous = [iter_existing_jobs([output_file])] if incremental else []
+        for job in itertools.chain(*previous, iter_recovered_jobs(writer.recovered_paths)):
+            if str(job['id']) not in known_ids:
+                known_ids.add(str(job['id']))
+                writer.write(job)
+        existing_count = writer.count
+        emit = writer.write
+    else:
+        existing = load_existing_jobs(output_file) if incremental else {}
+        paginate_incrementally = incremental
+        known_ids = set(existing)
+        existing_count = len(existing)
+        new_jobs = []
+        emit = new_jobs.append
+
+    stats = {'pages': 0}
+    bucket = TokenBucket(requests_per_second, capacity=concurrency)
+    semaphore = asyncio.Semaphore(concurrency)
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    print(f"Starting {'incremental' if incremental else 'full'} async job ingestion from Adzuna "
+          f"({existing_count} jobs already saved)...")
+    start = time.perf_counter()
+    async with httpx.AsyncClient(limits=limits, timeout=httpx.Timeout(30.0)) as client:
+        results = await asyncio.gather(
+            *(ingest_query(client, bucket, semaphore, query, known_ids, max_pages, paginate_incrementally, stats, emit)
+              for query in SEARCH_QUERIES),
+            return_exceptions=True,
+        )
+    elapsed = time.perf_counter() - start
+
+    new_count = 0
+    for query, result in zip(SEARCH_QUERIES, results):
+        if isinstance(result, Exception):
+            print(f"ERROR: Could not fetch data for query '{query}'. Reason: {result}")
+            continue
+        new_count += result
+
+    if stream:
+        writer.commit()
+        total_count = writer.count
+    else:
+        all_jobs = list(existing.values()) + new_jobs
+        with open(output_file, 'w') as f:
+            json.dump(all_jobs, f, indent=2)
+        total_count = len(all_jobs)
+
+    stats.update(new_jobs=new_count, total_jobs=total_count, seconds=elapsed,
+                 jobs_per_second=new_count / elapsed if elapsed else 0.0)
+    print(f"\nFetched {new_count} new jobs from {stats['pages']} pages in {elapsed:.2f}s "
+          f"({stats['jobs_per_second']:.1f} jobs/s).")
+    print(f"Successfully saved {total_count} jobs to '{output_file}'.")
+    return stats
+
+
 if __name__ == "__main__":
-    fetch_and_save_jobs()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Ingest job postings from Adzuna into jobs.json.")
+    parser.add_argument("--async", dest="use_async", action="store_true",
+                        help="Concurrent, paginated, incremental ingestion.")
+    parser.add_argument("--full", action="store_true", help="With --async: refetch everything instead of only new postings.")
+    parser.add_argument("--max-pages", type=int, default=MAX_PAGES_PER_QUERY)
+    parser.add_argument("--concurrency", type=int, default=MAX_CONCURRENT_REQUESTS)
+    parser.add_argument("--rate", type=float, default=REQUESTS_PER_SECOND, help="Requests per second.")
+    parser.add_argument("--stream", action="store_true",
+                        help=f"Append each job to '{NDJSON_OUTPUT_FILE}' as it arrives instead of writing JSON at the end.")
+    args = parser.parse_args()
+
+    if args.use_async:
+        asyncio.run(fetch_and_save_jobs_async(args.max_pages, args.concurrency, args.rate,
+                                              incremental=not args.full, stream=args.stream))
+    else:
+        fetch_and_save_jobs(stream=args.stream)
\ No newline at end of file
@@ -0,0 +1,529 @@
+# instrumentation.py
+"""
+Per-node instrumentation for the LangGraph agents.
+
+Every graph is built with `state_graph(Schema, "name")` instead of
+`StateGraph(Schema)`. With AGENT_INSTRUMENTATION=1, each node added to it is
+wrapped so that every run records:
+- wall time, and how much of it was spent waiting on the LLM versus local
+  compute (LLM time is the union of the node's in-flight LLM calls);
+- LLM calls, prompt and completion tokens, retries and cache hits, as
+  reported by llm_gateway.py;
+- answers that didn't parse into the JSON the node expected
+  (`record_parse_failure()` at the parse sites).
+
+The counters are rendered as Prometheus text by `render_prometheus()`
+(agent_service serves it at /metrics/prometheus, and AGENT_METRICS_FILE
+writes it at exit for CLI runs). With AGENT_TRACE_FILE set, each node run is
+also exported as a span to that JSONL file, under the trace opened by
+`trace(name)` around a request, if any.
+
+AGENT_PROFILE_PERCENTILE=99 turns on a sampling profiler: while a node runs,
+a background thread samples its on-CPU stacks every AGENT_PROFILE_INTERVAL_MS,
+and runs at or above that percentile of the node's recent wall times are
+written to AGENT_PROFILE_DIR as folded stacks (flamegraph.pl / speedscope).
+
+When instrumentation is off, `state_graph` returns a plain StateGraph, so
+nodes run unwrapped, and the gateway's hooks cost one context-variable lookup
+per LLM call. Instrumentation must be on before a graph is first built.
+
+    AGENT_INSTRUMENTATION=1 AGENT_TRACE_FILE=spans.jsonl uvicorn agent_service:app --port 8003
+    python instrumentation.py --benchmark
+"""
+import argparse
+import asyncio
+import atexit
+import contextlib
+import contextvars
+import functools
+import inspect
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter, deque
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+ENABLED = os.getenv("AGENT_INSTRUMENTATION", "0") == "1"
+TRACE_FILE = os.getenv("AGENT_TRACE_FILE", "")
+METRICS_FILE = os.getenv("AGENT_METRICS_FILE", "")
+# 0 disables the profiler; 99 profiles the slowest 1% of each node's runs
+PROFILE_PERCENTILE = float(os.getenv("AGENT_PROFILE_PERCENTILE", "0"))
+PROFILE_DIR = os.getenv("AGENT_PROFILE_DIR", "profiles")
+PROFILE_INTERVAL_SECONDS = float(os.getenv("AGENT_PROFILE_INTERVAL_MS", "5")) / 1e3
+# Runs a node needs before its percentile is trusted for profiling
+PROFILE_MIN_RUNS = 20
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+class NodeRun:
+    """What one node run did, filled in by the wrapper and the LLM gateway."""
+    __slots__ = ("graph", "node", "start", "started_at", "llm_seconds", "_llm_in_flight", "_llm_since",
+                 "llm_calls", "prompt_tokens", "completion_tokens", "retries", "cache_hits", "parse_failures",
+                 "status", "error", "trace_id", "parent_id", "samples")
+
+    def __init__(self, graph: str, node: str):
+        self.graph = graph
+        self.node = node
+        self.start = time.perf_counter()
+        self.started_at = time.time()
+        self.llm_seconds = 0.0
+        self._llm_in_flight = 0
+        self._llm_since = 0.0
+        self.llm_calls = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.retries = 0
+        self.cache_hits = 0
+        self.parse_failures = 0
+        self.status = "ok"
+        self.error = None
+        self.trace_id, self.parent_id = _TRACE.get() or (None, None)
+        self.samples: Optional[Counter] = None
+
+    def llm_started(self):
+        if self._llm_in_flight == 0:
+            self._llm_since = time.perf_counter()
+        self._llm_in_flight += 1
+
+    def llm_finished(self, prompt_tokens: int = 0, completion_tokens: int = 0):
+        self._llm_in_flight -= 1
+        if self._llm_in_flight == 0:
+            self.llm_seconds += time.perf_counter() - self._llm_since
+        self.prompt_tokens += prompt_tokens
+        self.completion_tokens += completion_tokens
+
+
+_CURRENT: contextvars.ContextVar[Optional[NodeRun]] = contextvars.ContextVar("agent_node_run", default=None)
+# (trace id, parent span id) of the request being served, set by trace()
+_TRACE: contextvars.ContextVar[Optional[Tuple[str, str]]] = contextvars.ContextVar("agent_trace", default=None)
+
+
+def current_run() -> Optional[NodeRun]:
+    """The node run in progress in this context, or None (always None when instrumentation is off)."""
+    return _CURRENT.get()
+
+
+def record_parse_failure():
+    """Counts an LLM answer that didn't parse into the expected JSON against the running node."""
+    run = _CURRENT.get()
+    if run is not None:
+        run.parse_failures += 1
+
+
+def _percentile(values: List[float], p: float) -> float:
+    return values[min(len(values) - 1, int(p * len(values)))] if values else 0.0
+
+
+class NodeMetrics:
+    """Cumulative counters, a latency histogram and a window of recent wall times for one node."""
+
+    def __init__(self, graph: str, node: str, window: int = 1000):
+        self.graph = graph
+        self.node = node
+        self.runs = Counter()
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.wall_seconds = 0.0
+        self.llm_seconds = 0.0
+        self.compute_seconds = 0.0
+        self.llm_calls = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.retries = 0
+        self.cache_hits = 0
+        self.parse_failures = 0
+        self.profiles = 0
+        self.recent = deque(maxlen=window)
+        self._lock = threading.Lock()  # Sync nodes finish on LangGraph's executor threads
+
+    def record(self, run: NodeRun, wall: float) -> bool:
+        """Adds a finished run. True if it was slow enough to keep its profile."""
+        if run._llm_in_flight:  # A stream the node abandoned; count it up to now
+            run.llm_seconds += time.perf_counter() - run._llm_since
+        llm = min(run.llm_seconds, wall)
+        with self._lock:
+            slow = (PROFILE_PERCENTILE > 0 and len(self.recent) >= PROFILE_MIN_RUNS
+                    and wall >= _percentile(sorted(self.recent), PROFILE_PERCENTILE / 100))
+            self.runs[run.status] += 1
+            bucket = 0
+            while bucket < len(LATENCY_BUCKETS) and wall > LATENCY_BUCKETS[bucket]:
+                bucket += 1
+            self.buckets[bucket] += 1
+            self.wall_seconds += wall
+            self.llm_seconds += llm
+            self.compute_seconds += wall - llm
+            self.llm_calls += run.llm_calls
+            self.prompt_tokens += run.prompt_tokens
+            self.completion_tokens += run.completion_tokens
+            self.retries += run.retries
+            self.cache_hits += run.cache_hits
+            self.parse_failures += run.parse_failures
+            self.recent.append(wall)
+            if slow and run.samples:
+                self.profiles += 1
+        return slow
+
+    def snapshot(self) -> Dict[str, float]:
+        recent = sorted(self.recent)
+        runs = sum(self.runs.values())
+        return {
+            "runs": runs,
+            "errors": runs - self.runs["ok"],
+            "wall_p50_seconds": _percentile(recent, 0.50),
+            "wall_p95_seconds": _percentile(recent, 0.95),
+            "llm_share": self.llm_seconds / self.wall_seconds if self.wall_seconds else 0.0,
+            "llm_calls": self.llm_calls,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "retries": self.retries,
+            "cache_hits": self.cache_hits,
+            "parse_failures": self.parse_failures,
+            "profiles": self.profiles,
+        }
+
+
+NODE_METRICS: Dict[Tuple[str, str], NodeMetrics] = {}
+_REGISTRY_LOCK = threading.Lock()
+
+
+def node_metrics(graph: str, node: str) -> NodeMetrics:
+    with _REGISTRY_LOCK:
+        if (graph, node) not in NODE_METRICS:
+            NODE_METRICS[(graph, node)] = NodeMetrics(graph, node)
+        return NODE_METRICS[(graph, node)]
+
+
+def snapshot() -> Dict[str, Dict[str, float]]:
+    return {f"{graph}.{node}": metrics.snapshot() for (graph, node), metrics in sorted(NODE_METRICS.items())}
+
+
+def _label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def render_prometheus() -> str:
+    """Every node's metrics in the Prometheus text exposition format."""
+    nodes = sorted(NODE_METRICS.items())
+    lines = []
+
+    def family(name: str, kind: str, help_text: str, samples: Iterator[Tuple[str, str, float]]):
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        for suffix, labels, value in samples:
+            lines.append(f"{name}{suffix}{{{labels}}} {value:.6g}" if isinstance(value, float)
+                         else f"{name}{suffix}{{{labels}}} {value}")
+
+    def labels(metrics: NodeMetrics, **extra) -> str:
+        pairs = {"graph": metrics.graph, "node": metrics.node, **extra}
+        return ",".join(f'{key}="{_label(str(value))}"' for key, value in pairs.items())
+
+    family("agent_node_runs_total", "counter", "Node runs, by outcome.",
+           (("", labels(m, status=status), count) for _, m in nodes for status, count in sorted(m.runs.items())))
+
+    def histogram():
+        for _, m in nodes:
+            cumulative = 0
+            for bound, count in zip(LATENCY_BUCKETS + (float("inf"),), m.buckets):
+                cumulative += count
+                yield "_bucket", labels(m, le="+Inf" if bound == float("inf") else bound), cumulative
+            yield "_sum", labels(m), m.wall_seconds
+            yield "_count", labels(m), sum(m.buckets)
+
+    family("agent_node_seconds", "histogram", "Node wall time.", histogram())
+    for name, attribute, help_text in (
+            ("agent_node_llm_seconds_total", "llm_seconds", "Node time spent waiting on the LLM."),
+            ("agent_node_compute_seconds_total", "compute_seconds", "Node time not spent waiting on the LLM."),
+            ("agent_node_llm_calls_total", "llm_calls", "LLM calls made by the node, including cache hits."),
+            ("agent_node_prompt_tokens_total", "prompt_tokens", "Prompt tokens sent by the node."),
+            ("agent_node_completion_tokens_total", "completion_tokens", "Completion tokens received by the node."),
+            ("agent_node_llm_retries_total", "retries", "LLM requests retried for the node."),
+            ("agent_node_llm_cache_hits_total", "cache_hits", "LLM calls answered from the cache."),
+            ("agent_node_json_parse_failures_total", "parse_failures",
+             "LLM answers that didn't parse into the expected JSON."),
+            ("agent_node_profiles_total", "profiles", "Slow runs whose profile was written.")):
+        family(name, "counter", help_text, (("", labels(m), getattr(m, attribute)) for _, m in nodes))
+    return "\n".join(lines) + "\n"
+
+
+class SpanExporter:
+    """Appends finished spans to a JSONL file, one object per line."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._file = None
+
+    def export(self, span: Dict[str, Any]):
+        line = json.dumps(span) + "\n"
+        with self._lock:
+            if self._file is None:
+                self._file = open(self.path, "a", buffering=1)
+            self._file.write(line)
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+def _new_id(length: int = 8) -> str:
+    return os.urandom(length).hex()
+
+
+@contextlib.contextmanager
+def trace(name: str, **attributes):
+    """
+    Groups the node spans of one request under a root span named `name`.
+    A no-op unless spans are being exported.
+    """
+    if _EXPORTER is None:
+        yield
+        return
+    trace_id, span_id = _new_id(16), _new_id()
+    token = _TRACE.set((trace_id, span_id))
+    started_at, start, status = time.time(), time.perf_counter(), "ok"
+    try:
+        yield
+    except BaseException as e:
+        status = "cancelled" if isinstance(e, asyncio.CancelledError) else "error"
+        raise
+    finally:
+        _TRACE.reset(token)
+        _EXPORTER.export({"trace_id": trace_id, "span_id": span_id, "parent_id": None, "name": name,
+                          "start": started_at, "duration_ms": (time.perf_counter() - start) * 1e3,
+                          "status": status, "attributes": attributes})
+
+
+class SamplingProfiler:
+    """
+    Samples the stacks of every thread running an instrumented node, from a
+    background thread. A sample belongs to a run if the run's wrapper frame
+    is on the stack, so concurrent runs on one event loop stay apart. Only
+    on-CPU time is seen: a coroutine waiting on I/O has no stack to sample.
+    """
+
+    def __init__(self, interval: float = PROFILE_INTERVAL_SECONDS):
+        self.interval = interval
+        self._runs: Dict[int, NodeRun] = {}  # id(wrapper frame) -> run
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def register(self, frame, run: NodeRun):
+        run.samples = Counter()
+        with self._lock:
+            self._runs[id(frame)] = run
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._sample_forever, name="node-profiler", daemon=True)
+                self._thread.start()
+
+    def unregister(self, frame):
+        with self._lock:
+            self._runs.pop(id(frame), None)
+
+    def _sample_forever(self):
+        me = threading.get_ident()
+        while True:
+            time.sleep(self.interval)
+            with self._lock:
+                if not self._runs:
+                    continue
+                for thread_id, frame in sys._current_frames().items():
+                    if thread_id != me:
+                        self._attribute(frame)
+
+    def _attribute(self, frame):
+        stack = []
+        while frame is not None:
+            run = self._runs.get(id(frame))
+            if run is not None:
+                run.samples[";".join(reversed(stack))] += 1
+                return
+            code = frame.f_code
+            stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+            frame = frame.f_back
+
+    @staticmethod
+    def write(run: NodeRun, wall: float, directory: str = PROFILE_DIR) -> str:
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"{run.graph}.{run.node}.{int(run.started_at * 1e3)}.folded")
+        root = f"{run.graph}.{run.node} ({wall * 1e3:.0f}ms)"
+        with open(path, "w") as f:
+            for stack, count in run.samples.most_common():
+                f.write(f"{root};{stack} {count}\n" if stack else f"{root} {count}\n")
+        return path
+
+
+_EXPORTER: Optional[SpanExporter] = None
+_PROFILER: Optional[SamplingProfiler] = None
+_METRICS_FILE: Optional[str] = None
+# Kept across importlib.reload (which reuses this module's globals), so the exit hook is registered once
+_EXIT_HOOK_REGISTERED = globals().get("_EXIT_HOOK_REGISTERED", False)
+
+
+def _finish(metrics: NodeMetrics, run: NodeRun, frame):
+    wall = time.perf_counter() - run.start
+    if _PROFILER is not None:
+        _PROFILER.unregister(frame)
+    slow = metrics.record(run, wall)
+    if slow and run.samples:
+        SamplingProfiler.write(run, wall)
+    if _EXPORTER is not None:
+        _EXPORTER.export({
+            "trace_id": run.trace_id or _new_id(16), "span_id": _new_id(), "parent_id": run.parent_id,
+            "name": f"{run.graph}.{run.node}", "start": run.started_at, "duration_ms": wall * 1e3,
+            "status": run.status, "error": run.error,
+            "attributes": {"llm_ms": min(run.llm_seconds, wall) * 1e3, "llm_calls": run.llm_calls,
+                           "prompt_tokens": run.prompt_tokens, "completion_tokens": run.completion_tokens,
+                           "retries": run.retries, "cache_hits": run.cache_hits,
+                           "parse_failures": run.parse_failures, "profiled": bool(slow and run.samples)},
+        })
+
+
+def _failed(run: NodeRun, error: BaseException):
+    run.status = "cancelled" if isinstance(error, asyncio.CancelledError) else "error"
+    run.error = f"{type(error).__name__}: {error}"
+
+
+def instrument_node(graph: str, node: str, action: Callable) -> Callable:
+    """Wraps one node function (sync or async) so that each run is measured."""
+    metrics = node_metrics(graph, node)
+
+    if inspect.iscoroutinefunction(action):
+        @functools.wraps(action)
+        async def instrumented(state, **kwargs):
+            run = NodeRun(graph, node)
+            frame = sys._getframe()
+            if _PROFILER is not None:
+                _PROFILER.register(frame, run)
+            token = _CURRENT.set(run)
+            try:
+                return await action(state, **kwargs)
+            except BaseException as e:
+                _failed(run, e)
+                raise
+            finally:
+                _CURRENT.reset(token)
+                _finish(metrics, run, frame)
+    else:
+        @functools.wraps(action)
+        def instrumented(state, **kwargs):
+            run = NodeRun(graph, node)
+            frame = sys._getframe()
+            if _PROFILER is not None:
+                _PROFILER.register(frame, run)
+            token = _CURRENT.set(run)
+            try:
+                return action(state, **kwargs)
+            except BaseException as e:
+                _failed(run, e)
+                raise
+            finally:
+                _CURRENT.reset(token)
+                _finish(metrics, run, frame)
+    return instrumented
+
+
+def state_graph(schema, graph: str):
+    """A StateGraph whose nodes are instrumented under `graph`, or a plain one when instrumentation is off."""
+    from langgraph.graph import StateGraph
+
+    workflow = StateGraph(schema)
+    if not ENABLED:
+        return workflow
+    add_node = workflow.add_node
+
+    def add_instrumented_node(node, action=None, **kwargs):
+        if action is None and callable(node):
+            node, action = node.__name__, node
+        return add_node(node, instrument_node(graph, node, action), **kwargs)
+
+    workflow.add_node = add_instrumented_node
+    return workflow
+
+
+def configure(enabled: bool = ENABLED, trace_file: str = TRACE_FILE, profile_percentile: float = PROFILE_PERCENTILE,
+              metrics_file: str = METRICS_FILE):
+    """Applies the settings (read from the environment at import). Graphs built earlier keep their nodes."""
+    global ENABLED, PROFILE_PERCENTILE, _EXPORTER, _PROFILER, _METRICS_FILE, _EXIT_HOOK_REGISTERED
+    ENABLED = enabled
+    PROFILE_PERCENTILE = profile_percentile if enabled else 0.0
+    if _EXPORTER is not None:
+        _EXPORTER.close()
+    _EXPORTER = SpanExporter(trace_file) if enabled and trace_file else None
+    _PROFILER = (_PROFILER or SamplingProfiler()) if enabled and profile_percentile > 0 else None
+    _METRICS_FILE = metrics_file if enabled else None
+    if not _EXIT_HOOK_REGISTERED:
+        atexit.register(_flush_at_exit)
+        _EXIT_HOOK_REGISTERED = True
+
+
+def _flush_at_exit():
+    """Writes the metrics file and closes the span file, for whatever configure set last."""
+    if _METRICS_FILE:
+        with open(_METRICS_FILE, "w") as f:
+            f.write(render_prometheus())
+    if _EXPORTER is not None:
+        _EXPORTER.close()
+
+
+configure()
+
+
+def benchmark(runs: int = 2000, nodes: int = 3):
+    """Per-node overhead of the wrapper on a graph of no-op nodes, off and on."""
+    import tempfile
+    from typing import TypedDict
+
+    from langgraph.graph import END
+
+    class BenchmarkState(TypedDict):
+        count: int
+
+    async def step(state):
+        return {"count": state["count"] + 1}
+
+    def build():
+        workflow = state_graph(BenchmarkState, "benchmark")
+        names = [f"step_{i}" for i in range(nodes)]
+        for name in names:
+            workflow.add_node(name, step)
+        workflow.set_entry_point(names[0])
+        for current, following in zip(names, names[1:] + [END]):
+            workflow.add_edge(current, following)
+        return workflow.compile()
+
+    async def time_runs(app) -> float:
+        await app.ainvoke({"count": 0})  # Warm up
+        start = time.perf_counter()
+        for _ in range(runs):
+            await app.ainvoke({"count": 0})
+        return (time.perf_counter() - start) / runs
+
+    with tempfile.TemporaryDirectory() as workdir:
+        settings = [("off", {"enabled": False}),
+                    ("metrics", {"enabled": True}),
+                    ("metrics + spans", {"enabled": True, "trace_file": os.path.join(workdir, "spans.jsonl")}),
+                    ("metrics + spans + profiler", {"enabled": True, "trace_file": os.path.join(workdir, "spans.jsonl"),
+                                                    "profile_percentile": 99.0})]
+        print(f"{runs} runs of a {nodes}-node graph of no-op nodes:")
+        baseline = None
+        for label, setting in settings:
+            configure(**{"trace_file": "", "profile_percentile": 0.0, "metrics_file": "", **setting})
+            seconds = asyncio.run(time_runs(build()))
+            baseline = baseline or seconds
+            print(f"  {label:<28}{seconds * 1e6:8.1f}us per run, {(seconds - baseline) / nodes * 1e6:+6.1f}us per node")
+        configure(enabled=False, trace_file="", profile_percentile=0.0, metrics_file="")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Agent node instrumentation.")
+    parser.add_argument("--benchmark", action="store_true", help="Measure the wrapper's per-node overhead.")
+    parser.add_argument("--runs", type=int, default=2000)
+    args = parser.parse_args()
+    if args.benchmark:
+        benchmark(args.runs)
+    else:
+        parser.print_help()
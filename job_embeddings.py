@@ -0,0 +1,210 @@
+# job_embeddings.py
+"""
+Offline embedding step and vector index for the career service.
+
+Run this after `ingest_jobs.py` to embed every job in jobs.json into one
+contiguous float32 matrix saved next to it. The career service loads the
+matrix memory-mapped, so all uvicorn workers share the same pages.
+"""
+import argparse
+import json
+import math
+import os
+import re
+import zlib
+from collections import Counter
+from typing import List
+
+import numpy as np
+
+from job_store import iter_job_records
+
+JOBS_FILE = "jobs.json"
+EMBEDDING_MODEL_NAME = "all-MiniLM-L6-v2"  # Same local model as the tutor notebook
+HASHED_DIM = 1024
+
+_TOKEN_RE = re.compile(r"[a-z0-9+#]+")
+
+
+def index_paths(jobs_file: str) -> dict:
+    """Returns the files the index is stored in, next to the jobs file."""
+    base = os.path.splitext(jobs_file)[0]
+    return {
+        "matrix": f"{base}.embeddings.npy",
+        "ids": f"{base}.embedding_ids.npy",
+        "idf": f"{base}.embedding_idf.npy",
+        "meta": f"{base}.embeddings.json",
+    }
+
+
+def job_text(job: dict) -> str:
+    """The text that represents a job in the vector space."""
+    return f"{job.get('title') or ''}. {' '.join(job.get('required_skills') or [])}. {job.get('description') or ''}"
+
+
+class MiniLMEncoder:
+    """Sentence-transformer encoder (all-MiniLM-L6-v2, 384 dimensions)."""
+    name = "minilm"
+
+    def __init__(self):
+        from sentence_transformers import SentenceTransformer
+        self.model = SentenceTransformer(EMBEDDING_MODEL_NAME)
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        vectors = self.model.encode(texts, batch_size=64, normalize_embeddings=True)
+        return np.asarray(vectors, dtype=np.float32)
+
+
+class HashedTfidfEncoder:
+    """
+    Fallback encoder when the sentence-transformer model is not available.
+    Tokens are hashed into a fixed number of buckets and weighted by
+    sublinear TF times the IDF learned from the job corpus.
+    """
+    name = "hashed-tfidf"
+
+    def __init__(self, idf: np.ndarray):
+        self.idf = idf
+        self.dim = len(idf)
+
+    @staticmethod
+    def bucket(token: str, dim: int) -> int:
+        # crc32 is stable across processes, unlike the built-in hash()
+        return zlib.crc32(token.encode("utf-8")) % dim
+
+    @classmethod
+    def fit(cls, texts: List[str], dim: int = HASHED_DIM) -> "HashedTfidfEncoder":
+        doc_freq = np.zeros(dim, dtype=np.float64)
+        for text in texts:
+            buckets = {cls.bucket(token, dim) for token in _TOKEN_RE.findall(text.lower())}
+            doc_freq[list(buckets)] += 1
+        idf = np.log((1 + len(texts)) / (1 + doc_freq)) + 1
+        return cls(idf.astype(np.float32))
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for token, tf in Counter(_TOKEN_RE.findall(text.lower())).items():
+                vectors[row, self.bucket(token, self.dim)] += 1 + math.log(tf)
+        vectors *= self.idf
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1
+        return vectors / norms
+
+
+def load_encoder(preferred: str = "auto"):
+    """Loads the MiniLM encoder, or returns None so the caller can fall back."""
+    if preferred in ("auto", MiniLMEncoder.name):
+        try:
+            return MiniLMEncoder()
+        except Exception as e:
+            if preferred == MiniLMEncoder.name:
+                raise
+            print(f"WARNING: Could not load '{EMBEDDING_MODEL_NAME}' ({e}). Falling back to hashed TF-IDF.")
+    return None
+
+
+def save_array(path: str, array: np.ndarray):
+    # Write to a temp file and rename, so readers never see a half-written index
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        np.save(f, array)
+    os.replace(tmp_path, path)
+
+
+def save_json(path: str, value):
+    # Same temp-and-rename as save_array, for the files written next to the arrays
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(value, f)
+    os.replace(tmp_path, path)
+
+
+def build_embedding_index(jobs_file: str = JOBS_FILE, encoder: str = "auto"):
+    """Embeds every job in `jobs_file` and writes the index next to it."""
+    texts, ids = [], []
+    for job in iter_job_records(jobs_file):
+        texts.append(job_text(job))
+        ids.append(int(job["id"]))
+    ids = np.array(ids, dtype=np.int64)
+    paths = index_paths(jobs_file)
+
+    model = load_encoder(encoder)
+    if model is None:
+        model = HashedTfidfEncoder.fit(texts)
+        save_array(paths["idf"], model.idf)
+
+    print(f"Embedding {len(texts)} jobs with the '{model.name}' encoder...")
+    matrix = np.ascontiguousarray(model.encode(texts), dtype=np.float32)
+    save_array(paths["matrix"], matrix)
+    save_array(paths["ids"], ids)
+    # Written last: the reload watcher polls the meta file, so it marks the arrays as complete
+    save_json(paths["meta"], {"encoder": model.name, "dim": int(matrix.shape[1]), "num_jobs": len(ids)})
+    print(f"Successfully saved a {matrix.shape[0]}x{matrix.shape[1]} embedding matrix to '{paths['matrix']}'.")
+
+
+class JobVectorIndex:
+    """Memory-mapped job embedding matrix with cosine top-k search."""
+
+    def __init__(self, matrix: np.ndarray, ids: np.ndarray, encoder):
+        self.matrix = matrix
+        self.ids = ids
+        self.encoder = encoder
+
+    @classmethod
+    def load(cls, jobs_file: str = JOBS_FILE) -> "JobVectorIndex":
+        """Raises FileNotFoundError if `build_embedding_index` has not been run."""
+        paths = index_paths(jobs_file)
+        with open(paths["meta"], "r") as f:
+            meta = json.load(f)
+        # mmap_mode='r' keeps the matrix in the page cache, shared by every worker
+        matrix = np.load(paths["matrix"], mmap_mode="r")
+        ids = np.load(paths["ids"])
+        if meta["encoder"] == HashedTfidfEncoder.name:
+            encoder = HashedTfidfEncoder(np.load(paths["idf"]))
+        else:
+            encoder = MiniLMEncoder()
+        return cls(matrix, ids, encoder)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def search(self, text: str, top_k: int = 10) -> List[int]:
+        """Returns the ids of the `top_k` most similar jobs, best first."""
+        if len(self.ids) == 0:
+            return []
+        query = self.encoder.encode([text])[0]
+        # Rows are L2-normalised, so one matrix-vector product gives every cosine score
+        scores = self.matrix @ query
+        k = min(top_k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [int(self.ids[i]) for i in top if scores[i] > 0]
+
+    def search_batch(self, texts: List[str], top_k: int = 10, chunk_size: int = 256):
+        """
+        Scores many queries at once, one matrix-matrix product per chunk.
+        Yields one list of job ids per query, in order, as each chunk finishes.
+        """
+        k = min(top_k, len(self.ids))
+        for start in range(0, len(texts), chunk_size):
+            chunk = texts[start:start + chunk_size]
+            if k == 0:
+                yield from ([] for _ in chunk)
+                continue
+            scores = self.encoder.encode(chunk) @ self.matrix.T
+            top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+            top_scores = np.take_along_axis(scores, top, axis=1)
+            order = np.argsort(-top_scores, axis=1)
+            top = np.take_along_axis(top, order, axis=1)
+            top_scores = np.take_along_axis(top_scores, order, axis=1)
+            for row_ids, row_scores in zip(top, top_scores):
+                yield [int(self.ids[i]) for i, score in zip(row_ids, row_scores) if score > 0]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Embed jobs.json into a vector index for the career service.")
+    parser.add_argument("--jobs-file", default=JOBS_FILE)
+    parser.add_argument("--encoder", choices=["auto", MiniLMEncoder.name, HashedTfidfEncoder.name], default="auto")
+    args = parser.parse_args()
+    build_embedding_index(args.jobs_file, args.encoder)
@@ -0,0 +1,184 @@
+# job_store.py
+"""
+Compact, memory-mapped binary job store.
+
+`python job_store.py` converts jobs.json (or jobs.ndjson) into jobs.bin.
+The career service prefers jobs.bin when it is at least as new as the jobs
+file: opening it only maps the file, and titles, companies and descriptions
+are decoded from one shared string blob when a job is actually read.
+
+Layout (little-endian, sections 8-byte aligned):
+    b"BFJOBS01" | uint32 header length | JSON header | sections...
+    ids                 int64[n]     sorted, so lookups are a binary search
+    skill_offsets       int64[n+1]   row i's skills are skill_ids[off[i]:off[i+1]]
+    skill_ids           uint16[m]    indexes into the header's interned skill list
+                                     (uint32 past 65536 distinct skills; the header records the dtype)
+    <field>_offsets     int64[n+1]   one per string field, into the blob
+    blob                utf-8 bytes
+"""
+import argparse
+import json
+import mmap
+import os
+from typing import Dict, Iterable, Iterator, List, Optional
+
+import numpy as np
+
+JOBS_FILE = "jobs.json"
+MAGIC = b"BFJOBS01"
+STRING_FIELDS = ("title", "company", "description")
+
+
+def iter_job_records(path: str) -> Iterator[dict]:
+    """
+    Yields jobs one at a time from a jobs.json array or a jobs.ndjson file.
+    NDJSON is read line by line, so memory doesn't grow with the corpus.
+    """
+    with open(path, "r") as f:
+        if path.endswith((".ndjson", ".jsonl")):
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            yield from json.load(f)
+
+
+def store_path(jobs_file: str) -> str:
+    """The binary store that sits next to a jobs file."""
+    return f"{os.path.splitext(jobs_file)[0]}.bin"
+
+
+def _pad(f, alignment: int = 8):
+    remainder = f.tell() % alignment
+    if remainder:
+        f.write(b"\0" * (alignment - remainder))
+
+
+def write_job_store(jobs: Iterable[dict], path: str):
+    """Writes jobs (dicts shaped like jobs.json rows) to a binary store at `path`."""
+    by_id = {int(job["id"]): job for job in jobs}  # Last row wins, like the JSON loader
+    ids = sorted(by_id)
+
+    skill_vocab: Dict[str, int] = {}
+    skill_ids: List[int] = []
+    skill_offsets = [0]
+    for job_id in ids:
+        for skill in by_id[job_id].get("required_skills") or []:
+            skill_ids.append(skill_vocab.setdefault(skill, len(skill_vocab)))
+        skill_offsets.append(len(skill_ids))
+
+    blob = bytearray()
+    string_offsets = {}
+    for field in STRING_FIELDS:
+        offsets = []
+        for job_id in ids:
+            offsets.append(len(blob))
+            blob += (by_id[job_id].get(field) or "").encode("utf-8")
+        offsets.append(len(blob))
+        string_offsets[field] = offsets
+
+    arrays = [
+        ("ids", np.array(ids, dtype="<i8")),
+        ("skill_offsets", np.array(skill_offsets, dtype="<i8")),
+        # uint16 keeps the common case compact; a bigger taxonomy would wrap around, so it gets uint32
+        ("skill_ids", np.array(skill_ids, dtype="<u2" if len(skill_vocab) <= 1 << 16 else "<u4")),
+    ] + [(f"{field}_offsets", np.array(string_offsets[field], dtype="<i8")) for field in STRING_FIELDS]
+
+    # Section positions are relative to the start of the data area
+    sections = {}
+    position = 0
+    for name, array in arrays:
+        sections[name] = [position, array.dtype.str, len(array)]
+        position += array.nbytes + (-array.nbytes % 8)
+    sections["blob"] = [position, "|u1", len(blob)]
+    header = json.dumps({"count": len(ids), "skills": list(skill_vocab), "sections": sections}).encode("utf-8")
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(MAGIC)
+        f.write(len(header).to_bytes(4, "little"))
+        f.write(header)
+        _pad(f)
+        for _, array in arrays:
+            f.write(array.tobytes())
+            _pad(f)
+        f.write(blob)
+    os.replace(tmp_path, path)  # Readers never see a half-written store
+
+
+class JobStore:
+    """Read-only view over a binary job store. Nothing is decoded until it is read."""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mm[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"'{path}' is not a job store.")
+        header_len = int.from_bytes(self._mm[len(MAGIC):len(MAGIC) + 4], "little")
+        header_start = len(MAGIC) + 4
+        header = json.loads(self._mm[header_start:header_start + header_len])
+        data_start = header_start + header_len + (-(header_start + header_len) % 8)
+
+        self.count = header["count"]
+        self.skills: List[str] = header["skills"]
+        self._sections = {}
+        for name, (offset, dtype, length) in header["sections"].items():
+            self._sections[name] = np.frombuffer(self._mm, dtype=dtype, count=length, offset=data_start + offset)
+        self.ids = self._sections["ids"]
+        self._blob_start = data_start + header["sections"]["blob"][0]
+
+    def __len__(self) -> int:
+        return self.count
+
+    def row_of(self, job_id: int) -> Optional[int]:
+        """Row number of a job id, or None if it is not in the store."""
+        row = int(np.searchsorted(self.ids, job_id))
+        if row < self.count and self.ids[row] == job_id:
+            return row
+        return None
+
+    def string(self, field: str, row: int) -> str:
+        offsets = self._sections[f"{field}_offsets"]
+        start, end = self._blob_start + int(offsets[row]), self._blob_start + int(offsets[row + 1])
+        return self._mm[start:end].decode("utf-8")
+
+    def skill_ids(self, row: int) -> np.ndarray:
+        offsets = self._sections["skill_offsets"]
+        return self._sections["skill_ids"][offsets[row]:offsets[row + 1]]
+
+    def required_skills(self, row: int) -> List[str]:
+        return [self.skills[skill_id] for skill_id in self.skill_ids(row)]
+
+    def record(self, row: int, with_description: bool = False) -> dict:
+        """One job as a jobs.json-style dict. The description is only decoded if asked for."""
+        job = {
+            "id": int(self.ids[row]),
+            "title": self.string("title", row),
+            "company": self.string("company", row),
+            "required_skills": self.required_skills(row),
+        }
+        if with_description:
+            job["description"] = self.string("description", row)
+        return job
+
+    def iter_records(self, with_description: bool = True) -> Iterator[dict]:
+        for row in range(self.count):
+            yield self.record(row, with_description)
+
+
+def convert_json_to_store(jobs_file: str = JOBS_FILE, output_path: str = None) -> str:
+    """Converts a jobs.json file into the binary store next to it."""
+    output_path = output_path or store_path(jobs_file)
+    write_job_store(iter_job_records(jobs_file), output_path)
+    print(f"Successfully converted {len(JobStore(output_path))} jobs from '{jobs_file}' to '{output_path}' "
+          f"({os.path.getsize(jobs_file) / 1024:.0f} KB -> {os.path.getsize(output_path) / 1024:.0f} KB).")
+    return output_path
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert jobs.json into the compact binary job store.")
+    parser.add_argument("--jobs-file", default=JOBS_FILE)
+    parser.add_argument("--output", default=None, help="Defaults to the jobs file with a .bin extension.")
+    args = parser.parse_args()
+    convert_json_to_store(args.jobs_file, args.output)
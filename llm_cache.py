@@ -0,0 +1,153 @@
+# llm_cache.py
+"""
+Content-addressed cache for LLM responses.
+
+Responses are keyed by a hash of (model, temperature, messages, options).
+Lookups check an in-process LRU first and then a local SQLite file shared
+by every worker on the box. Both tiers expire entries after a TTL and evict
+the least recently used ones past their size limit.
+
+`aget`/`aset` are for the event loop: the memory tier is served inline and
+SQLite is read and written in a worker thread, so a slow disk never stalls
+other requests. `get`/`set` do the same work synchronously.
+"""
+import asyncio
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+# (content, prompt_tokens, completion_tokens)
+CachedResponse = Tuple[str, int, int]
+
+
+def cache_key(model: str, temperature: float, messages: list, options: dict = None) -> str:
+    payload = json.dumps([model, temperature, messages, options or {}], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    """Two-tier (memory LRU + SQLite) response cache with TTL and hit/miss counters."""
+
+    def __init__(self, path: Optional[str] = None, max_memory_entries: int = 1024, max_disk_entries: int = 100_000,
+                 ttl_seconds: float = 7 * 24 * 3600):
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_entries = max_disk_entries
+        self.ttl_seconds = ttl_seconds
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._writes_since_eviction = 0
+        self._memory: "OrderedDict[str, Tuple[float, CachedResponse]]" = OrderedDict()
+        self._lock = threading.Lock()  # Guards the memory tier, never held across SQLite calls
+        self._db_lock = threading.Lock()
+        self._db = None
+        if path:
+            self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+            self._db.execute("PRAGMA journal_mode=WAL")  # Lets several workers read while one writes
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS llm_cache ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, created REAL NOT NULL, last_access REAL NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS llm_cache_last_access ON llm_cache (last_access)")
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        value = self._get_memory(key)
+        if value is None and self._db is not None:
+            value = self._get_disk(key)
+        if value is None:
+            with self._lock:
+                self.misses += 1
+        return value
+
+    async def aget(self, key: str) -> Optional[CachedResponse]:
+        value = self._get_memory(key)
+        if value is None and self._db is not None:
+            value = await asyncio.to_thread(self._get_disk, key)
+        if value is None:
+            with self._lock:
+                self.misses += 1
+        return value
+
+    def set(self, key: str, value: CachedResponse):
+        created = time.time()
+        with self._lock:
+            self._remember(key, created, value)
+        if self._db is not None:
+            self._set_disk(key, value, created)
+
+    async def aset(self, key: str, value: CachedResponse):
+        created = time.time()
+        with self._lock:
+            self._remember(key, created, value)
+        if self._db is not None:
+            await asyncio.to_thread(self._set_disk, key, value, created)
+
+    def _get_memory(self, key: str) -> Optional[CachedResponse]:
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is None:
+                return None
+            created, value = entry
+            if now - created < self.ttl_seconds:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return value
+            del self._memory[key]
+            return None
+
+    def _get_disk(self, key: str) -> Optional[CachedResponse]:
+        now = time.time()
+        with self._db_lock:
+            row = self._db.execute("SELECT value, created FROM llm_cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            if now - row[1] >= self.ttl_seconds:
+                self._db.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                return None
+            self._db.execute("UPDATE llm_cache SET last_access = ? WHERE key = ?", (now, key))
+        value = tuple(json.loads(row[0]))
+        with self._lock:
+            self._remember(key, row[1], value)
+            self.disk_hits += 1
+        return value
+
+    def _set_disk(self, key: str, value: CachedResponse, created: float):
+        with self._db_lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, value, created, last_access) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value), created, created),
+            )
+            self._writes_since_eviction += 1
+            if self._writes_since_eviction >= 100:  # Counting rows is a scan, so batch it
+                self._writes_since_eviction = 0
+                self._evict_disk(created)
+
+    def _remember(self, key: str, created: float, value: CachedResponse):
+        self._memory[key] = (created, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+    def _evict_disk(self, now: float):
+        self._db.execute("DELETE FROM llm_cache WHERE created < ?", (now - self.ttl_seconds,))
+        (count,) = self._db.execute("SELECT COUNT(*) FROM llm_cache").fetchone()
+        if count > self.max_disk_entries:
+            self._db.execute(
+                "DELETE FROM llm_cache WHERE key IN (SELECT key FROM llm_cache ORDER BY last_access LIMIT ?)",
+                (count - self.max_disk_entries,),
+            )
+
+    def stats(self) -> dict:
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+            "memory_entries": len(self._memory),
+        }
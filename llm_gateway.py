@@ -0,0 +1,376 @@
+# llm_gateway.py
+"""
+Shared async LLM client for every agent.
+
+All agents talk to the same OpenAI-compatible chat completions endpoint
+(Groq by default) through one pooled HTTP client, behind a process-wide
+concurrency cap and token-bucket rate limit. Calls time out, are retried
+with jittered backoff, and record latency and token counts.
+
+    llm = get_llm(temperature=0.8)
+    response = await llm.ainvoke(prompt)   # response.content
+    async for token in llm.astream(prompt):
+        ...
+
+Temperature-0 calls are answered from a content-addressed cache
+(llm_cache.py) when the exact same prompt was seen before; other nodes can
+opt in with `ainvoke(prompt, cache=True)`.
+
+Point LLM_API_URL at fake_llm_server.py to run the agents offline.
+"""
+import asyncio
+import json
+import os
+import time
+from collections import deque
+from typing import AsyncIterator, Callable, Dict, List, NamedTuple, Optional, Union
+
+from dotenv import load_dotenv
+
+from instrumentation import current_run
+from llm_cache import LLMCache, cache_key
+from rate_limit import TokenBucket, retry_async
+
+load_dotenv()
+
+LLM_API_URL = os.getenv("LLM_API_URL", "https://api.groq.com/openai/v1")
+LLM_API_KEY = os.getenv("LLM_API_KEY") or os.getenv("GROQ_API_KEY")
+DEFAULT_MODEL = os.getenv("LLM_MODEL", "openai/gpt-oss-120b")
+MAX_CONCURRENT_LLM_CALLS = int(os.getenv("LLM_MAX_CONCURRENCY", "16"))
+LLM_REQUESTS_PER_SECOND = float(os.getenv("LLM_REQUESTS_PER_SECOND", "20"))
+LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", "60"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "3"))
+# Persistent cache tier, shared by the workers on this box. Empty disables the cache.
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", ".llm_cache.sqlite")
+LLM_CACHE_TTL_SECONDS = float(os.getenv("LLM_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+
+# A prompt is either a plain string (sent as one user message) or a list of
+# (role, content) pairs / {"role": ..., "content": ...} dicts.
+Prompt = Union[str, List]
+
+
+class LLMResponse(NamedTuple):
+    content: str
+    prompt_tokens: int
+    completion_tokens: int
+    latency_seconds: float
+
+
+class RetryableLLMError(Exception):
+    """A 429 or 5xx response from the LLM API."""
+
+
+class LLMMetrics:
+    """Process-wide call counters and a window of recent latencies."""
+
+    def __init__(self, window: int = 1000):
+        self.calls = 0
+        self.errors = 0
+        self.retries = 0
+        self.cache_hits = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.latencies = deque(maxlen=window)
+        self.streams = 0
+        self.cancelled_streams = 0
+        self.first_token_latencies = deque(maxlen=window)
+
+    def record(self, response: LLMResponse):
+        self.calls += 1
+        self.prompt_tokens += response.prompt_tokens
+        self.completion_tokens += response.completion_tokens
+        self.latencies.append(response.latency_seconds)
+
+    def snapshot(self) -> Dict[str, float]:
+        latencies = sorted(self.latencies)
+        first_token_latencies = sorted(self.first_token_latencies)
+
+        def percentile(p: float, values: List[float] = latencies) -> float:
+            return values[min(len(values) - 1, int(p * len(values)))] if values else 0.0
+
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "retries": self.retries,
+            "cache_hits": self.cache_hits,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "latency_p50_seconds": percentile(0.50),
+            "latency_p95_seconds": percentile(0.95),
+            "streams": self.streams,
+            "cancelled_streams": self.cancelled_streams,
+            "first_token_p50_seconds": percentile(0.50, first_token_latencies),
+            "first_token_p95_seconds": percentile(0.95, first_token_latencies),
+        }
+
+
+def to_messages(prompt: Prompt) -> List[Dict[str, str]]:
+    if isinstance(prompt, str):
+        return [{"role": "user", "content": prompt}]
+    return [message if isinstance(message, dict) else {"role": message[0], "content": message[1]} for message in prompt]
+
+
+class LLMGateway:
+    """
+    Pooled, rate-limited client for an OpenAI-compatible chat completions API.
+    The HTTP client, semaphore and rate limiter belong to one event loop, so
+    they are rebuilt if the gateway is used from a new loop (e.g. successive
+    asyncio.run calls in a script). Each client is closed on its own loop,
+    since its connections can't be closed from another one.
+    """
+
+    def __init__(self, base_url: str = LLM_API_URL, api_key: Optional[str] = LLM_API_KEY,
+                 max_concurrency: int = MAX_CONCURRENT_LLM_CALLS, requests_per_second: float = LLM_REQUESTS_PER_SECOND,
+                 timeout: float = LLM_TIMEOUT_SECONDS, max_retries: int = LLM_MAX_RETRIES,
+                 cache: Optional[LLMCache] = None):
+        self.base_url = base_url.rstrip("/")
+        self.api_key = api_key
+        self.max_concurrency = max_concurrency
+        self.requests_per_second = requests_per_second
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.cache = cache
+        self.metrics = LLMMetrics()
+        self._loop = None
+        self._closer = None
+
+    def _bind_to_running_loop(self):
+        import httpx
+
+        loop = asyncio.get_running_loop()
+        if loop is self._loop:
+            return
+        if self._closer is not None and not self._loop.is_closed():
+            # The old loop is still alive (another thread, or not finished yet): close its client there
+            self._loop.call_soon_threadsafe(self._closer.cancel)
+        self._loop = loop
+        headers = {"Authorization": f"Bearer {self.api_key}"} if self.api_key else {}
+        limits = httpx.Limits(max_connections=self.max_concurrency, max_keepalive_connections=self.max_concurrency)
+        self._client = httpx.AsyncClient(base_url=self.base_url, headers=headers, limits=limits,
+                                         timeout=httpx.Timeout(self.timeout))
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._bucket = TokenBucket(self.requests_per_second, capacity=self.max_concurrency)
+        self._closer = loop.create_task(self._close_with_loop(self._client))
+
+    @staticmethod
+    async def _close_with_loop(client):
+        """
+        Waits until cancelled, then closes `client`. asyncio.run cancels
+        leftover tasks before closing its loop, so a script's client is closed
+        on the loop that owns its connections instead of leaking them.
+        """
+        try:
+            await asyncio.get_running_loop().create_future()
+        finally:
+            await client.aclose()
+
+    async def ainvoke(self, prompt: Prompt, model: str = DEFAULT_MODEL, temperature: float = 0.0,
+                      cache: Optional[bool] = None, cache_if: Optional[Callable[[str], bool]] = None,
+                      **options) -> LLMResponse:
+        """
+        One chat completion. Raises after `max_retries` failed retries.
+        `cache` defaults to on for temperature-0 calls and off otherwise;
+        `cache_if(content)` can veto caching an answer the caller can't use.
+        """
+        import httpx
+
+        messages = to_messages(prompt)
+        run = current_run()  # The instrumented graph node making this call, if any
+        if run is not None:
+            run.llm_calls += 1
+        use_cache = self.cache is not None and (cache if cache is not None else temperature == 0)
+        if use_cache:
+            key = cache_key(model, temperature, messages, options)
+            cached = await self.cache.aget(key)
+            if cached is not None:
+                self.metrics.cache_hits += 1
+                if run is not None:
+                    run.cache_hits += 1
+                return LLMResponse(cached[0], cached[1], cached[2], 0.0)
+
+        self._bind_to_running_loop()
+        payload = {"model": model, "temperature": temperature, "messages": messages, **options}
+
+        async def attempt() -> LLMResponse:
+            await self._bucket.acquire()
+            async with self._semaphore:
+                start = time.perf_counter()
+                response = await self._client.post("/chat/completions", json=payload)
+                latency = time.perf_counter() - start
+            if response.status_code == 429 or response.status_code >= 500:
+                raise RetryableLLMError(f"HTTP {response.status_code}: {response.text[:200]}")
+            response.raise_for_status()
+            data = response.json()
+            usage = data.get("usage") or {}
+            return LLMResponse(
+                content=data["choices"][0]["message"]["content"] or "",
+                prompt_tokens=usage.get("prompt_tokens", 0),
+                completion_tokens=usage.get("completion_tokens", 0),
+                latency_seconds=latency,
+            )
+
+        def count_retry(attempt_number, error):
+            self.metrics.retries += 1
+            if run is not None:
+                run.retries += 1
+
+        if run is not None:
+            run.llm_started()
+        try:
+            response = await retry_async(attempt, retries=self.max_retries,
+                                         retry_on=(RetryableLLMError, httpx.TransportError), on_retry=count_retry)
+        except Exception:
+            self.metrics.errors += 1
+            raise
+        finally:
+            if run is not None:
+                run.llm_finished()
+        self.metrics.record(response)
+        if run is not None:
+            run.prompt_tokens += response.prompt_tokens
+            run.completion_tokens += response.completion_tokens
+        if use_cache and (cache_if is None or cache_if(response.content)):
+            await self.cache.aset(key, (response.content, response.prompt_tokens, response.completion_tokens))
+        return response
+
+    async def astream(self, prompt: Prompt, model: str = DEFAULT_MODEL, temperature: float = 0.0,
+                      **options) -> AsyncIterator[str]:
+        """
+        Yields the completion's content deltas as they arrive. Only the request
+        itself is retried; once tokens have been yielded a failure is raised.
+        Closing the iterator early (e.g. the client went away) closes the
+        upstream connection, which stops generation.
+        """
+        import httpx
+
+        self._bind_to_running_loop()
+        payload = {"model": model, "temperature": temperature, "messages": to_messages(prompt), "stream": True,
+                   "stream_options": {"include_usage": True}, **options}
+        usage = {}
+        run = current_run()
+        if run is not None:
+            run.llm_calls += 1
+
+        async with self._semaphore:
+            async def open_stream():
+                await self._bucket.acquire()
+                request = self._client.build_request("POST", "/chat/completions", json=payload)
+                response = await self._client.send(request, stream=True)
+                if response.status_code == 429 or response.status_code >= 500:
+                    body = await response.aread()
+                    await response.aclose()
+                    raise RetryableLLMError(f"HTTP {response.status_code}: {body[:200]!r}")
+                if response.is_error:
+                    await response.aread()
+                    await response.aclose()
+                    response.raise_for_status()
+                return response
+
+            def count_retry(attempt_number, error):
+                self.metrics.retries += 1
+                if run is not None:
+                    run.retries += 1
+
+            start = time.perf_counter()
+            if run is not None:
+                run.llm_started()
+            try:
+                response = await retry_async(open_stream, retries=self.max_retries,
+                                             retry_on=(RetryableLLMError, httpx.TransportError), on_retry=count_retry)
+            except Exception:
+                self.metrics.errors += 1
+                if run is not None:
+                    run.llm_finished()
+                raise
+
+            self.metrics.streams += 1
+            first_token = True
+            parts = []
+            try:
+                async for line in response.aiter_lines():
+                    if not line.startswith("data:"):
+                        continue
+                    data = line[len("data:"):].strip()
+                    if data == "[DONE]":
+                        break
+                    chunk = json.loads(data)
+                    usage = chunk.get("usage") or usage
+                    for choice in chunk.get("choices") or []:
+                        delta = (choice.get("delta") or {}).get("content")
+                        if delta:
+                            if first_token:
+                                self.metrics.first_token_latencies.append(time.perf_counter() - start)
+                                first_token = False
+                            parts.append(delta)
+                            yield delta
+            except (GeneratorExit, asyncio.CancelledError):
+                self.metrics.cancelled_streams += 1
+                raise
+            except Exception:
+                self.metrics.errors += 1
+                raise
+            finally:
+                await response.aclose()
+                if run is not None:
+                    run.llm_finished()
+            self.metrics.record(LLMResponse("".join(parts), usage.get("prompt_tokens", 0),
+                                            usage.get("completion_tokens", 0), time.perf_counter() - start))
+            if run is not None:
+                run.prompt_tokens += usage.get("prompt_tokens", 0)
+                run.completion_tokens += usage.get("completion_tokens", 0)
+
+    async def aclose(self):
+        if self._loop is not None:
+            self._closer.cancel()
+            await self._client.aclose()
+            self._loop, self._closer = None, None
+
+
+class ChatModel:
+    """A model and temperature bound to the shared gateway, used by agent nodes."""
+
+    def __init__(self, gateway: Optional[LLMGateway] = None, model: str = DEFAULT_MODEL, temperature: float = 0.0):
+        self._gateway = gateway
+        self.model = model
+        self.temperature = temperature
+
+    @property
+    def gateway(self) -> LLMGateway:
+        # Resolved on the first call, so agent modules can create models at
+        # import time without opening the cache or reading settings yet
+        if self._gateway is None:
+            self._gateway = get_gateway()
+        return self._gateway
+
+    async def ainvoke(self, prompt: Prompt, cache: Optional[bool] = None,
+                      cache_if: Optional[Callable[[str], bool]] = None, **options) -> LLMResponse:
+        return await self.gateway.ainvoke(prompt, self.model, self.temperature, cache, cache_if, **options)
+
+    def astream(self, prompt: Prompt, **options) -> AsyncIterator[str]:
+        return self.gateway.astream(prompt, self.model, self.temperature, **options)
+
+    async def astream_text(self, prompt: Prompt, on_token: Callable[[str], None], **options) -> str:
+        """Passes each token to `on_token` as it arrives and returns the whole completion."""
+        parts = []
+        async for token in self.astream(prompt, **options):
+            on_token(token)
+            parts.append(token)
+        return "".join(parts)
+
+    def invoke(self, prompt: Prompt, cache: Optional[bool] = None, **options) -> LLMResponse:
+        """Blocking call for scripts. Don't use it inside a running event loop."""
+        return asyncio.run(self.ainvoke(prompt, cache, **options))
+
+
+_GATEWAY: Optional[LLMGateway] = None
+
+def get_gateway() -> LLMGateway:
+    """The process-wide gateway, created on first use from the LLM_* settings."""
+    global _GATEWAY
+    if _GATEWAY is None:
+        cache = LLMCache(LLM_CACHE_PATH, ttl_seconds=LLM_CACHE_TTL_SECONDS) if LLM_CACHE_PATH else None
+        _GATEWAY = LLMGateway(cache=cache)
+    return _GATEWAY
+
+def get_llm(temperature: float = 0.0, model: str = DEFAULT_MODEL) -> ChatModel:
+    return ChatModel(None, model, temperature)
@@ -0,0 +1,54 @@
+# rate_limit.py
+"""Async rate limiting and retry helpers shared by the ingestion and LLM clients."""
+import asyncio
+import random
+import time
+from typing import Awaitable, Callable, Tuple, Type, TypeVar
+
+T = TypeVar("T")
+
+
+class TokenBucket:
+    """
+    Token-bucket rate limiter: `rate` tokens per second, with bursts of up
+    to `capacity`. Callers await `acquire()` before each request.
+    """
+
+    def __init__(self, rate: float, capacity: float = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self, tokens: float = 1.0):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                await asyncio.sleep((tokens - self._tokens) / self.rate)
+
+
+def backoff_delay(attempt: int, base_delay: float = 0.5, max_delay: float = 30.0) -> float:
+    """Exponential backoff with full jitter for the given retry attempt (0-based)."""
+    return random.uniform(0, min(max_delay, base_delay * 2 ** attempt))
+
+
+async def retry_async(call: Callable[[], Awaitable[T]], retries: int = 3,
+                      retry_on: Tuple[Type[BaseException], ...] = (Exception,),
+                      base_delay: float = 0.5, max_delay: float = 30.0,
+                      on_retry: Callable[[int, BaseException], None] = None) -> T:
+    """Awaits `call()`, retrying up to `retries` times on the given exceptions."""
+    for attempt in range(retries + 1):
+        try:
+            return await call()
+        except retry_on as e:
+            if attempt == retries:
+                raise
+            if on_retry:
+                on_retry(attempt + 1, e)
+            await asyncio.sleep(backoff_delay(attempt, base_delay, max_delay))
@@ -0,0 +1,212 @@
+# skill_extractor.py
+"""
+Single-pass, word-boundary-aware skill extraction.
+
+Every synonym in the taxonomy is compiled into one regular expression shaped
+as a trie, so the text is scanned once and each position only follows the
+branches that share its prefix, however many skills there are. Matches must
+start and end on token boundaries, so "R" no longer matches inside "Research".
+
+    python skill_extractor.py retag jobs.json     # re-tag an existing file in bulk
+    python skill_extractor.py benchmark           # compare with the old extractor
+"""
+import argparse
+import json
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, List
+
+# Canonical skill -> synonyms. Synonyms are matched case-insensitively, except
+# those listed in CASE_SENSITIVE_SYNONYMS (one-letter names are too ambiguous).
+SKILL_TAXONOMY: Dict[str, List[str]] = {
+    "python": ["python", "python3"],
+    "r": ["R", "R programming", "RStudio"],
+    "sql": ["sql", "t-sql", "pl/sql"],
+    "tensorflow": ["tensorflow", "tensor flow", "tf.keras"],
+    "scikit-learn": ["scikit-learn", "scikit learn", "sklearn"],
+    "aws": ["aws", "amazon web services"],
+    "docker": ["docker", "dockerfile"],
+    "kubernetes": ["kubernetes", "k8s"],
+    "ci/cd": ["ci/cd", "ci-cd", "cicd", "continuous integration", "continuous delivery", "continuous deployment"],
+    "django": ["django"],
+    "rest apis": ["rest api", "rest apis", "restful api", "restful apis", "restful services"],
+    "data analysis": ["data analysis", "data analytics"],
+    "pytorch": ["pytorch"],
+}
+CASE_SENSITIVE_SYNONYMS = {"R", "RStudio"}
+
+# A match may not be glued to a neighbouring word character ("R" in "R&D" or "Research")
+_BOUNDARY_BEFORE = r"(?<![\w+#&])"
+_BOUNDARY_AFTER = r"(?![\w+#&])"
+_SEPARATOR = "\0"  # Spaces and hyphens inside a synonym match any run of either
+_SEPARATOR_RE = re.compile(r"[\s\-]+")
+
+
+def normalize(text: str) -> str:
+    return _SEPARATOR_RE.sub(" ", text.strip().lower())
+
+
+def _trie_pattern(words: Iterable[str]) -> str:
+    """Compiles words into one alternation that shares common prefixes."""
+    trie: dict = {}
+    for word in words:
+        node = trie
+        for char in _SEPARATOR_RE.sub(_SEPARATOR, word):
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def build(node: dict) -> str:
+        is_word_end = "" in node
+        branches = []
+        for char, child in sorted(node.items()):
+            if char == "":
+                continue
+            token = r"[\s\-]+" if char == _SEPARATOR else re.escape(char)
+            branches.append(token + build(child))
+        if not branches:
+            return ""
+        pattern = branches[0] if len(branches) == 1 and not is_word_end else f"(?:{'|'.join(branches)})"
+        # Greedy '?': try the longer synonym first, back off to the shorter one
+        return f"(?:{pattern})?" if is_word_end else pattern
+
+    return build(trie)
+
+
+class SkillMatcher:
+    """Finds every taxonomy skill in a text in one pass over it."""
+
+    def __init__(self, taxonomy: Dict[str, List[str]] = SKILL_TAXONOMY,
+                 case_sensitive: Iterable[str] = CASE_SENSITIVE_SYNONYMS):
+        case_sensitive = set(case_sensitive)
+        # Labels keep the format already stored in jobs.json, e.g. "Sql", "Ci/cd"
+        self.synonym_to_label: Dict[str, str] = {}
+        insensitive, sensitive = [], []
+        for canonical, synonyms in taxonomy.items():
+            for synonym in synonyms:
+                self.synonym_to_label[normalize(synonym)] = canonical.capitalize()
+                (sensitive if synonym in case_sensitive else insensitive).append(
+                    synonym if synonym in case_sensitive else synonym.lower())
+
+        alternatives = []
+        if insensitive:
+            alternatives.append(_trie_pattern(insensitive))
+        if sensitive:
+            alternatives.append(f"(?-i:{_trie_pattern(sensitive)})")
+        self.pattern = re.compile(f"{_BOUNDARY_BEFORE}(?:{'|'.join(alternatives)}){_BOUNDARY_AFTER}", re.IGNORECASE)
+
+    def extract(self, text: str) -> List[str]:
+        """Sorted, de-duplicated skill labels found in the text."""
+        if not text:
+            return []
+        found = {self.synonym_to_label[normalize(match)] for match in self.pattern.findall(text)}
+        return sorted(found)
+
+
+_DEFAULT_MATCHER = None
+
+def default_matcher() -> SkillMatcher:
+    """The taxonomy matcher, compiled once per process."""
+    global _DEFAULT_MATCHER
+    if _DEFAULT_MATCHER is None:
+        _DEFAULT_MATCHER = SkillMatcher()
+    return _DEFAULT_MATCHER
+
+
+def extract_skills(description: str) -> List[str]:
+    return default_matcher().extract(description)
+
+
+def _extract_chunk(descriptions: List[str]) -> List[List[str]]:
+    matcher = default_matcher()
+    return [matcher.extract(description) for description in descriptions]
+
+
+def retag_jobs_file(jobs_file: str, output_file: str = None, workers: int = None, chunk_size: int = 500) -> int:
+    """
+    Re-extracts `required_skills` for every job in a jobs.json or jobs.ndjson
+    file across a process pool, and writes the result in the same format.
+    """
+    from job_store import iter_job_records
+
+    output_file = output_file or jobs_file
+    jobs = list(iter_job_records(jobs_file))
+    descriptions = [job.get("description") or "" for job in jobs]
+    chunks = [descriptions[i:i + chunk_size] for i in range(0, len(descriptions), chunk_size)]
+
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        row = 0
+        for skills_chunk in pool.map(_extract_chunk, chunks):
+            for skills in skills_chunk:
+                jobs[row]["required_skills"] = skills
+                row += 1
+    elapsed = time.perf_counter() - start
+
+    tmp_path = f"{output_file}.tmp"
+    with open(tmp_path, "w") as f:
+        if output_file.endswith((".ndjson", ".jsonl")):
+            for job in jobs:
+                f.write(json.dumps(job) + "\n")
+        else:
+            json.dump(jobs, f, indent=2)
+    os.replace(tmp_path, output_file)
+    print(f"Re-tagged {len(jobs)} jobs in {elapsed:.2f}s and saved them to '{output_file}'.")
+    return len(jobs)
+
+
+def legacy_extract_skills(description: str, known_skills: List[str]) -> list:
+    """The previous substring-per-skill extractor, kept for benchmarking."""
+    found_skills = {skill.capitalize() for skill in known_skills if skill in description.lower()}
+    return list(found_skills)
+
+
+def benchmark(jobs_file: str = "jobs.json", repeat: int = 20, synthetic_skills: int = 2000):
+    """Times the old and new extractors on real descriptions, with and without a large taxonomy."""
+    from job_store import iter_job_records
+
+    descriptions = [job.get("description") or "" for job in iter_job_records(jobs_file)]
+    known_skills = [synonym.lower() for synonyms in SKILL_TAXONOMY.values() for synonym in synonyms]
+
+    def time_it(extract) -> float:
+        start = time.perf_counter()
+        for _ in range(repeat):
+            for description in descriptions:
+                extract(description)
+        return (time.perf_counter() - start) / (repeat * len(descriptions)) * 1e6
+
+    # Synthetic taxonomy to show how each approach scales with the number of skills
+    big_taxonomy = dict(SKILL_TAXONOMY)
+    for i in range(synthetic_skills):
+        big_taxonomy[f"skill{i}"] = [f"skill{i}", f"skill {i} framework"]
+    big_known = known_skills + [synonym for i in range(synthetic_skills) for synonym in (f"skill{i}", f"skill {i} framework")]
+    big_matcher = SkillMatcher(big_taxonomy)
+
+    r_before = sum("R" in legacy_extract_skills(d, known_skills) for d in descriptions)
+    r_after = sum("R" in extract_skills(d) for d in descriptions)
+
+    print(f"{len(descriptions)} descriptions from '{jobs_file}', {repeat} repeats (microseconds per description):")
+    print(f"  {len(known_skills)} synonyms:   legacy {time_it(lambda d: legacy_extract_skills(d, known_skills)):8.1f}"
+          f"   compiled {time_it(extract_skills):8.1f}")
+    print(f"  {len(big_known)} synonyms: legacy {time_it(lambda d: legacy_extract_skills(d, big_known)):8.1f}"
+          f"   compiled {time_it(big_matcher.extract):8.1f}")
+    print(f"  Jobs tagged 'R': legacy {r_before}, compiled {r_after}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Taxonomy-based skill extraction.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    retag = subparsers.add_parser("retag", help="Re-tag an existing jobs file in bulk.")
+    retag.add_argument("jobs_file")
+    retag.add_argument("--output", default=None)
+    retag.add_argument("--workers", type=int, default=None)
+    bench = subparsers.add_parser("benchmark", help="Compare with the previous extractor.")
+    bench.add_argument("--jobs-file", default="jobs.json")
+    bench.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    if args.command == "retag":
+        retag_jobs_file(args.jobs_file, args.output, args.workers)
+    else:
+        benchmark(args.jobs_file, args.repeat)
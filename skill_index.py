@@ -0,0 +1,115 @@
+# skill_index.py
+"""
+Normalized skill ids and lookup tables for skill-gap analysis.
+
+Skills are interned to small integers when the jobs are loaded, so a job's
+required skills (and a student's skills) become one integer bitmask. A skill
+gap is then `job_mask & ~student_mask`, and course recommendations are a
+dictionary lookup per missing skill instead of a scan of the catalog.
+
+    python skill_index.py    # benchmark against the linear scan as the catalog grows
+"""
+import random
+import time
+from collections import namedtuple
+from typing import Dict, Iterable, List
+
+
+def normalize_skill(skill: str) -> str:
+    return skill.strip().lower()
+
+
+class SkillIndex:
+    """Interns normalized skill names to bit positions."""
+
+    def __init__(self, skills: Iterable[str] = ()):
+        self.ids: Dict[str, int] = {}
+        self.names: List[str] = []
+        for skill in skills:
+            self.add(skill)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def add(self, skill: str) -> int:
+        name = normalize_skill(skill)
+        skill_id = self.ids.get(name)
+        if skill_id is None:
+            skill_id = self.ids[name] = len(self.names)
+            self.names.append(name)
+        return skill_id
+
+    def add_mask(self, skills: Iterable[str]) -> int:
+        """Interns the skills and returns their bitmask."""
+        mask = 0
+        for skill in skills:
+            mask |= 1 << self.add(skill)
+        return mask
+
+    def mask(self, skills: Iterable[str]) -> int:
+        """Bitmask of the given skills. Skills the index doesn't know are ignored."""
+        mask = 0
+        for skill in skills:
+            skill_id = self.ids.get(normalize_skill(skill))
+            if skill_id is not None:
+                mask |= 1 << skill_id
+        return mask
+
+    def names_of(self, mask: int) -> List[str]:
+        """The normalized skill names in a bitmask, in id order."""
+        names = []
+        while mask:
+            lowest = mask & -mask
+            names.append(self.names[lowest.bit_length() - 1])
+            mask ^= lowest
+        return names
+
+
+class CourseIndex:
+    """Normalized skill name -> courses that teach it, in catalog order."""
+
+    def __init__(self, courses: Iterable = ()):
+        self.by_skill: Dict[str, list] = {}
+        for course in courses:
+            self.by_skill.setdefault(normalize_skill(course.skill_taught), []).append(course)
+
+    def courses_for(self, skill: str) -> list:
+        return self.by_skill.get(normalize_skill(skill), [])
+
+
+def benchmark(catalog_sizes=(100, 1_000, 10_000, 100_000), num_skills: int = 2_000, requests: int = 2_000):
+    """Compares per-request skill-gap + course lookup cost with the linear-scan approach."""
+    BenchCourse = namedtuple("BenchCourse", "id title skill_taught")
+    rng = random.Random(0)
+    skill_names = [f"Skill {i}" for i in range(num_skills)]
+    jobs = [rng.sample(skill_names, 6) for _ in range(1_000)]
+    students = [rng.sample(skill_names, 4) + rng.sample(jobs[i % len(jobs)], 2) for i in range(requests)]
+
+    print(f"{requests} skill-gap requests, {num_skills} distinct skills (microseconds per request):")
+    print(f"{'courses':>10} {'linear scan':>12} {'indexed':>10}")
+    for size in catalog_sizes:
+        catalog = [BenchCourse(i, f"Course {i}", rng.choice(skill_names)) for i in range(size)]
+
+        start = time.perf_counter()
+        for i, student in enumerate(students):
+            required = set(skill.lower() for skill in jobs[i % len(jobs)])
+            missing = required - set(skill.lower() for skill in student)
+            for skill in missing:
+                [course for course in catalog if course.skill_taught.lower() == skill]
+        linear = (time.perf_counter() - start) / requests * 1e6
+
+        skills = SkillIndex(skill_names)
+        courses = CourseIndex(catalog)
+        job_masks = [skills.mask(job) for job in jobs]
+        start = time.perf_counter()
+        for i, student in enumerate(students):
+            missing_mask = job_masks[i % len(jobs)] & ~skills.mask(student)
+            for skill in skills.names_of(missing_mask):
+                courses.courses_for(skill)
+        indexed = (time.perf_counter() - start) / requests * 1e6
+
+        print(f"{size:>10} {linear:>12.1f} {indexed:>10.1f}")
+
+
+if __name__ == "__main__":
+    benchmark()
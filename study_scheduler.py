@@ -0,0 +1,256 @@
+# study_scheduler.py
+"""
+Deterministic study scheduler for the personalised planner.
+
+A student's `personal_calendar` ("6 PM - 8 PM: Soccer Practice", "Free", ...)
+is parsed into busy intervals per weekday, and the free time inside the study
+window is found with a sorted sweep. Study tasks are then placed greedily:
+tasks for the weakest topics first, into "Free" days first, over a horizon of
+one or more weeks. Plans come back in the same shape the LLM used to produce
+({"Thursday": ["9 AM - 10 AM: Study 'Topic' - ..."]}), with no LLM call.
+
+    python study_scheduler.py --students 10000 --weeks 4   # batch benchmark
+"""
+import argparse
+import random
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+WEEKDAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+STUDY_DAY_START = 9 * 60   # Minutes after midnight
+STUDY_DAY_END = 22 * 60
+SESSION_MINUTES = 60
+MAX_SESSIONS_PER_DAY = 2
+
+Interval = Tuple[int, int]  # [start, end) in minutes after midnight
+WHOLE_DAY: Interval = (0, 24 * 60)
+
+_TIME_RE = r"(\d{1,2})(?::(\d{2}))?\s*([AaPp]\.?[Mm]\.?)?"
+_ENTRY_RE = re.compile(rf"^\s*{_TIME_RE}\s*(?:-|–|to)\s*{_TIME_RE}\s*(?::\s*(.*))?$")
+
+
+class StudySession(NamedTuple):
+    day: str  # "Thursday", or "Week 2 Thursday" for multi-week plans
+    start: int
+    end: int
+    task: dict
+
+
+def _to_minutes(hours: str, minutes: Optional[str], meridiem: Optional[str]) -> int:
+    hour = int(hours) % 24
+    if meridiem:
+        meridiem = meridiem[0].lower()
+        hour = hour % 12 + (12 if meridiem == "p" else 0)
+    return hour * 60 + int(minutes or 0)
+
+
+@lru_cache(maxsize=4096)
+def parse_entry(entry: str) -> Optional[Interval]:
+    """
+    "6 PM - 8 PM: Soccer Practice" -> (1080, 1200). "Free" -> None.
+    A range that ends past midnight is clipped to the end of the day, and an
+    entry that isn't a time range ("Busy all day") blocks the whole day.
+    Calendars repeat the same strings across students, hence the cache.
+    """
+    if entry.strip().lower() in ("free", ""):
+        return None
+    match = _ENTRY_RE.match(entry)
+    if not match:
+        print(f"WARNING: Can't parse calendar entry {entry!r}. Treating the day as busy.")
+        return WHOLE_DAY
+    start_h, start_m, start_mer, end_h, end_m, end_mer, _ = match.groups()
+    start = _to_minutes(start_h, start_m, start_mer or end_mer)
+    end = _to_minutes(end_h, end_m, end_mer or start_mer)
+    # A time without AM/PM borrows the other one's ("6 - 8 PM" is 6 PM to 8 PM),
+    # unless that puts the start after the end: "11 - 1 PM" is 11 AM to 1 PM
+    if start >= end and bool(start_mer) != bool(end_mer):
+        if not start_mer:
+            start = (start + 12 * 60) % (24 * 60)
+        else:
+            end = (end + 12 * 60) % (24 * 60)
+    if end <= start:
+        end = 24 * 60
+    return start, end
+
+
+def busy_intervals(calendar: Dict[str, List[str]]) -> Dict[str, List[Interval]]:
+    """Weekday -> merged, sorted busy intervals."""
+    busy = {}
+    for day in WEEKDAYS:
+        intervals = sorted(interval for interval in map(parse_entry, calendar.get(day, [])) if interval)
+        merged: List[Interval] = []
+        for start, end in intervals:
+            if merged and start <= merged[-1][1]:
+                merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+            else:
+                merged.append((start, end))
+        busy[day] = merged
+    return busy
+
+
+def free_intervals(busy: List[Interval], window: Interval = (STUDY_DAY_START, STUDY_DAY_END)) -> List[Interval]:
+    """The gaps between sorted, merged busy intervals inside the study window."""
+    free, cursor = [], window[0]
+    for start, end in busy:
+        if start > cursor:
+            free.append((cursor, min(start, window[1])))
+        cursor = max(cursor, end)
+        if cursor >= window[1]:
+            break
+    if cursor < window[1]:
+        free.append((cursor, window[1]))
+    return [(start, end) for start, end in free if end > start]
+
+
+def session_slots(free: List[Interval], length: int = SESSION_MINUTES) -> List[Interval]:
+    return [(start, start + length) for begin, end in free for start in range(begin, end - length + 1, length)]
+
+
+def format_time(minutes: int) -> str:
+    hour, minute = divmod(minutes % (24 * 60), 60)
+    label = f"{hour % 12 or 12}" + (f":{minute:02d}" if minute else "")
+    return f"{label} {'AM' if hour < 12 else 'PM'}"
+
+
+def day_order(calendar: Dict[str, List[str]], weeks: int = 1) -> List[Tuple[str, str]]:
+    """(label, weekday) over the horizon: each week's "Free" days first, then the rest in weekday order."""
+    free_days = [day for day in WEEKDAYS if all(parse_entry(entry) is None for entry in calendar.get(day, []))]
+    other_days = [day for day in WEEKDAYS if day not in free_days]
+    order = []
+    for week in range(1, weeks + 1):
+        for day in free_days + other_days:
+            order.append((f"Week {week} {day}" if weeks > 1 else day, day))
+    return order
+
+
+def schedule_tasks(calendar: Dict[str, List[str]], tasks: List[dict], weeks: int = 1,
+                   session_minutes: int = SESSION_MINUTES, max_sessions_per_day: int = MAX_SESSIONS_PER_DAY,
+                   window: Interval = (STUDY_DAY_START, STUDY_DAY_END)) -> Tuple[List[StudySession], List[dict]]:
+    """
+    Places each task in one free session, highest priority (lowest `priority`
+    value) first, and returns (sessions, tasks that didn't fit).
+    """
+    busy = busy_intervals(calendar)
+    slots_by_day = {day: session_slots(free_intervals(busy[day], window), session_minutes) for day in WEEKDAYS}
+    queue = sorted(enumerate(tasks), key=lambda item: (item[1].get("priority", 0), item[0]))
+
+    sessions = []
+    position = 0
+    for label, day in day_order(calendar, weeks):
+        if position == len(queue):
+            break
+        for start, end in slots_by_day[day][:max_sessions_per_day]:
+            if position == len(queue):
+                break
+            sessions.append(StudySession(label, start, end, queue[position][1]))
+            position += 1
+    return sessions, [task for _, task in queue[position:]]
+
+
+def format_plan(sessions: List[StudySession], unscheduled: List[dict] = ()) -> Dict[str, List[str]]:
+    """{"Thursday": ["9 AM - 10 AM: Study 'Topic' - description"], ...}, in calendar order."""
+    plan: Dict[str, List[str]] = {}
+    for session in sorted(sessions, key=_calendar_position):
+        task = session.task
+        plan.setdefault(session.day, []).append(
+            f"{format_time(session.start)} - {format_time(session.end)}: Study '{task['topic']}' - {task['task_description']}")
+    if unscheduled:
+        plan["unscheduled"] = [f"{task['topic']}: {task['task_description']}" for task in unscheduled]
+    return plan
+
+
+def _calendar_position(session: StudySession) -> Tuple[int, int, int]:
+    parts = session.day.split()
+    week = int(parts[1]) if parts[0] == "Week" else 1
+    return week, WEEKDAYS.index(parts[-1]), session.start
+
+
+def build_study_tasks(profile: dict) -> List[dict]:
+    """Two tasks per struggling topic; topics listed first are treated as the weakest."""
+    tasks = []
+    struggling_topics = profile["performance_data"]["topics_struggling"]
+    for priority, topic in enumerate(struggling_topics):
+        materials = profile["course_materials"][topic]
+        tasks.append({"topic": topic, "priority": priority,
+                      "task_description": f"Deeply review the '{materials[0]}' to solidify foundational knowledge."})
+        tasks.append({"topic": topic, "priority": priority,
+                      "task_description": f"Engage with the '{materials[1]}' to get a different perspective."})
+    return tasks
+
+
+def plan_for_profile(profile: dict, weeks: int = 1) -> Dict[str, List[str]]:
+    sessions, unscheduled = schedule_tasks(profile["personal_calendar"], build_study_tasks(profile), weeks)
+    return format_plan(sessions, unscheduled)
+
+
+def _plan_or_error(profile: dict, weeks: int) -> dict:
+    # One malformed profile shouldn't fail the rest of the batch
+    try:
+        return plan_for_profile(profile, weeks)
+    except (KeyError, IndexError, TypeError, AttributeError) as e:
+        return {"error": f"Invalid profile: {type(e).__name__}: {e}"}
+
+
+def _plan_chunk(args: Tuple[List[dict], int]) -> List[dict]:
+    profiles, weeks = args
+    return [_plan_or_error(profile, weeks) for profile in profiles]
+
+
+def schedule_batch(profiles: Iterable[dict], weeks: int = 1, workers: Optional[int] = None,
+                   chunk_size: int = 500) -> List[dict]:
+    """
+    Plans for many students, in input order. workers=1 runs in-process.
+    A profile that can't be planned gets {"error": ...} in its place.
+    """
+    profiles = list(profiles)
+    chunks = [(profiles[i:i + chunk_size], weeks) for i in range(0, len(profiles), chunk_size)]
+    if workers == 1 or len(chunks) <= 1:
+        return [plan for chunk in chunks for plan in _plan_chunk(chunk)]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return [plan for plans in pool.map(_plan_chunk, chunks) for plan in plans]
+
+
+def synthetic_profiles(count: int, seed: int = 0) -> List[dict]:
+    rng = random.Random(seed)
+    activities = ["Soccer Practice", "Part-time Job", "Social Outing", "Lab Shift", "Choir"]
+    topics = [f"Topic {i}" for i in range(20)]
+    profiles = []
+    for _ in range(count):
+        calendar = {}
+        for day in WEEKDAYS:
+            entries = []
+            for _ in range(rng.randint(0, 3)):
+                start = rng.randint(8, 20)
+                entries.append(f"{format_time(start * 60)} - {format_time(min(start + rng.randint(1, 3), 23) * 60)}: "
+                               f"{rng.choice(activities)}")
+            calendar[day] = entries or ["Free"]
+        struggling = rng.sample(topics, rng.randint(1, 6))
+        profiles.append({
+            "performance_data": {"topics_struggling": struggling},
+            "course_materials": {topic: [f"{topic} Reading", f"{topic} Video"] for topic in struggling},
+            "personal_calendar": calendar,
+        })
+    return profiles
+
+
+def benchmark(students: int = 10_000, weeks: int = 4, workers: Optional[int] = None):
+    profiles = synthetic_profiles(students)
+    for label, worker_count in (("in-process", 1), ("process pool", workers)):
+        start = time.perf_counter()
+        plans = schedule_batch(profiles, weeks, worker_count)
+        elapsed = time.perf_counter() - start
+        unscheduled = sum(len(plan.get("unscheduled", [])) for plan in plans)
+        print(f"{label:>12}: {students} students over {weeks} week(s) in {elapsed:.2f}s "
+              f"({elapsed / students * 1e6:.0f}us per student, {unscheduled} tasks unscheduled)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the study scheduler on synthetic students.")
+    parser.add_argument("--students", type=int, default=10_000)
+    parser.add_argument("--weeks", type=int, default=4)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+    benchmark(args.students, args.weeks, args.workers)
@@ -1,14 +1,43 @@
+# syllabus_agent.py
+"""
+Turns a course syllabus into a week-by-week roadmap of LMS modules.
+
+The syllabus is split on its "Unit N:" markers (and trailing sections such as
+"Practical Syllabus"), and each part is converted into modules by its own
+LLM call, all in parallel through LangGraph's Send fan-out. Each unit's JSON
+is validated against the module schema; when it doesn't parse or validate,
+only that unit is retried, with the specific problems quoted back to the
+model. Units are merged in syllabus order and weeks renumbered 1..N. A unit
+that still fails is reported in `failed_units` instead of failing the run.
+
+    python syllabus_agent.py                               # the sample syllabus
+    python syllabus_agent.py syllabi/ --output roadmaps/   # every .txt file in a directory
+"""
+import argparse
 import os
+import re
 import json
-from langchain_groq import ChatGroq
-from langgraph.graph import END, StateGraph
-from typing import TypedDict, List, Dict, Any
+import asyncio
+import operator
+from functools import lru_cache
+from typing import Annotated, TypedDict, List, Dict, Any, Optional, Tuple
 from dotenv import load_dotenv
 
+from instrumentation import record_parse_failure, state_graph
+from llm_gateway import get_llm
+
 
 load_dotenv()
 
-llm = ChatGroq(temperature=0.2, model_name="openai/gpt-oss-120b")
+llm = get_llm(temperature=0.2)
+
+MAX_REPAIR_ATTEMPTS = int(os.getenv("SYLLABUS_MAX_REPAIR_ATTEMPTS", "2"))
+UNIT_CONCURRENCY = int(os.getenv("SYLLABUS_UNIT_CONCURRENCY", "8"))
+SYLLABUS_CONCURRENCY = int(os.getenv("SYLLABUS_CONCURRENCY", "4"))
+
+# Where one part of a syllabus ends and the next begins
+SECTION_RE = re.compile(r"\b(?=Unit\s+\d+\s*:)|\b(?=(?:Practical|Lab|Laboratory|Project)\s+(?:Syllabus|Work)\b)")
+MODULE_KEYS = {"week": int, "title": str, "learning_materials": list, "assessments": list}
 
 syllabus_text = """
 Class 11 Physics Syllabus Unit 1: Physical World and Measurement Physical World: Nature of physical laws. Scope and excitement of physics. Physics, technology, and society. Units and Measurements: Need for measurement. Systems of units: SI units, Fundamental and derived units. Dimensions of physical quantities. Accuracy, precision, and errors in measurement. Unit 2: Kinematics Motion in a Straight Line: Position, displacement, and distance. Speed and velocity. Acceleration. Equations of motion. Uniform and non-uniform motion. Motion in a Plane: Scalars and vectors. Vector addition and subtraction. Relative velocity. Uniform circular motion. Unit 3: Laws of Motion Force and Inertia: Newton’s First Law of Motion. Concept of force. Momentum and Impulse: Newton’s Second Law of Motion. Momentum and impulse. Conservation of Momentum: Newton’s Third Law of Motion. Applications of third law. Friction: Types of friction: static, kinetic. Laws of friction. Limiting friction. Circular Motion: Centripetal force. Banked curves. Unit 4: Work, Energy, and Power Work: Work done by a force. Work-energy theorem. Energy: Kinetic energy, potential energy. Conservation of energy. Power: Concept of power. Rate of doing work. Unit 5: Motion of System of Particles and Rigid Body Centre of Mass: Motion of centre of mass. Translational motion. Rigid Body: Moment of inertia. Rotational motion. Torque. Unit 6: Gravitation Universal Law of Gravitation: Gravitational force and its properties. Acceleration due to gravity. Kepler’s laws of planetary motion. Gravitational Potential Energy: Escape velocity. Orbital velocity. Earth and Satellites: Artificial satellites and their uses. Unit 7: Properties of Bulk Matter Elasticity: Hooke’s law. Stress-strain relationship. Fluid Mechanics: Pressure in fluids. Pascal’s law. Buoyancy and Archimedes’ principle. Thermal Properties of Matter: Specific heat. Calorimetry. Heat transfer methods. Unit 8: Thermodynamics Thermodynamic Systems: Types of systems: Open, closed, isolated. Laws of Thermodynamics: First law of thermodynamics (conservation of energy). Second law of thermodynamics (entropy). Heat engines and refrigerators. Unit 9: Behaviour of Perfect Gas and Kinetic Theory Kinetic Theory of Gases: Gas laws and molecular interpretation. Kinetic energy of gas molecules. Ideal gas equation. Unit 10: Oscillations and Waves Oscillations: Simple harmonic motion. Restoring force. Time period and frequency. Waves: Types of waves: Transverse and longitudinal. Wave motion, speed, and amplitude. Sound waves and Doppler effect. Practical Syllabus Measurement of Length, Mass, Time: Measurement using a meter scale, vernier caliper, micrometer screw gauge. Vector Addition: Using graphical method. Acceleration Due to Gravity: Using a simple pendulum. Work and Energy: Experiment with simple machines. Properties of Fluids: Determining the coefficient of viscosity. Heat Transfer: Specific heat of a solid and liquid.
@@ -16,46 +45,218 @@ Class 11 Physics Syllabus Unit 1: Physical World and Measurement Physical World:
 
 class RoadmapState(TypedDict):
     syllabus_text: str
+    course: str
+    units: List[str]
+    # One entry per unit branch, merged by the reducer in completion order
+    unit_results: Annotated[List[Dict[str, Any]], operator.add]
     structured_roadmap: List[Dict[str, Any]]
+    failed_units: List[str]
+
+
+class UnitState(TypedDict):
+    course: str
+    unit_text: str
+    index: int
+
+
+def split_syllabus(text: str) -> Tuple[str, List[str]]:
+    """(course preamble, units) - the text before the first marker, then one string per unit or section."""
+    parts = [part.strip() for part in SECTION_RE.split(text.strip())]
+    if len(parts) == 1:
+        return "", [part for part in parts if part]  # A blank syllabus has no units
+    return parts[0], [part for part in parts[1:] if part]
 
 
-def generate_roadmap(state):
-    print("NODE: Generating Structured Roadmap")
-    syllabus_text = state["syllabus_text"]
-    
-    prompt = f"""
-    You are an expert curriculum designer for an LMS. Your task is to analyze the following syllabus text and convert it into a structured JSON object.
+def unit_name(unit_text: str) -> str:
+    """The unit's marker ("Unit 3", "Practical Syllabus"); the title itself has no reliable end in flattened text."""
+    marker = re.match(r"Unit\s+\d+|(?:Practical|Lab|Laboratory|Project)\s+(?:Syllabus|Work)", unit_text)
+    return marker.group(0) if marker else "Syllabus"
+
+
+def validate_modules(data: Any) -> List[str]:
+    """Problems with a unit's modules, or [] if they match the schema."""
+    if isinstance(data, dict) and isinstance(data.get("modules"), list):
+        data = data["modules"]
+    if not isinstance(data, list):
+        return ["The output must be a JSON array of module objects."]
+    if not data:
+        return ["The array is empty; every unit needs at least one module."]
+    problems = []
+    for position, module in enumerate(data, start=1):
+        if not isinstance(module, dict):
+            problems.append(f"Item {position} is not an object.")
+            continue
+        for key, expected in MODULE_KEYS.items():
+            value = module.get(key)
+            if not isinstance(value, expected) or (expected is int and isinstance(value, bool)):
+                problems.append(f"Module {position}: \"{key}\" must be a{'n' if expected is int else ''} "
+                                f"{ {int: 'integer', str: 'string', list: 'list of strings'}[expected]}.")
+            elif expected is list and not all(isinstance(item, str) for item in value):
+                problems.append(f"Module {position}: \"{key}\" must only contain strings.")
+            elif expected is str and not value.strip():
+                problems.append(f"Module {position}: \"{key}\" must not be empty.")
+    return problems
+
+
+def parse_modules(text: str) -> Tuple[Optional[List[Dict[str, Any]]], List[str]]:
+    cleaned = text.strip().replace("```json", "").replace("```", "")
+    try:
+        data = json.loads(cleaned)
+    except json.JSONDecodeError as e:
+        return None, [f"The output is not valid JSON ({e})."]
+    problems = validate_modules(data)
+    if problems:
+        return None, problems
+    return (data["modules"] if isinstance(data, dict) else data), []
+
+
+def unit_prompt(course: str, unit_text: str) -> str:
+    return f"""
+    You are an expert curriculum designer for an LMS. Your task is to convert one unit of a syllabus into structured JSON.
 
     The JSON should be an array of "modules," where each module represents a week.
     Each module object should have the following keys:
-    - "week" (integer)
+    - "week" (integer, starting from 1 within this unit)
     - "title" (a string for the week's topic)
     - "learning_materials" (a list of strings, e.g., readings)
     - "assessments" (a list of strings, e.g., assignments, quizzes, projects)
 
-    Syllabus Text:
-    {syllabus_text}
-    
+    Course: {course or "(not given)"}
+
+    Syllabus Unit:
+    {unit_text}
+
 
     Structured JSON Output:
     """
-    
-    response = llm.invoke(prompt)
-    cleaned_response = response.content.strip().replace("```json", "").replace("```", "")
-    roadmap = json.loads(cleaned_response)
-    
-    print("SUCCESS: Roadmap Generated")
-    return {"structured_roadmap": roadmap}
-
-roadmap_workflow = StateGraph(RoadmapState)
-roadmap_workflow.add_node("generate_roadmap", generate_roadmap)
-roadmap_workflow.set_entry_point("generate_roadmap")
-roadmap_workflow.add_edge("generate_roadmap", END)
-roadmap_app = roadmap_workflow.compile()
-
-
-inputs = {"syllabus_text": syllabus_text}
-result = roadmap_app.invoke(inputs)
-
-print("\n--- FINAL STRUCTURED ROADMAP")
-print(json.dumps(result['structured_roadmap'], indent=2))
\ No newline at end of file
+
+
+def split_into_units(state):
+    print("NODE: Splitting Syllabus into Units")
+    course, units = split_syllabus(state["syllabus_text"])
+    print(f"  - {len(units)} units")
+    return {"course": course, "units": units}
+
+
+def fan_out_units(state):
+    """One generate_unit_modules branch per unit; straight to merging if there are none."""
+    if not state["units"]:
+        return "merge_roadmap"
+    from langgraph.types import Send
+
+    return [Send("generate_unit_modules", {"course": state["course"], "unit_text": unit, "index": index})
+            for index, unit in enumerate(state["units"])]
+
+
+async def generate_unit_modules(state: UnitState):
+    name = unit_name(state["unit_text"])
+    prompt = unit_prompt(state["course"], state["unit_text"])
+    result = {"index": state["index"], "unit": name}
+    try:
+        # A unit we've already seen maps to the same modules, once they've validated
+        response = await llm.ainvoke(prompt, cache=True, cache_if=lambda content: not parse_modules(content)[1])
+        modules, problems = parse_modules(response.content)
+        for attempt in range(MAX_REPAIR_ATTEMPTS):
+            if modules is not None:
+                break
+            record_parse_failure()
+            print(f"  - Repairing '{name}' (attempt {attempt + 1}): {' '.join(problems)}")
+            repair_prompt = [
+                ("user", prompt),
+                ("assistant", response.content),
+                ("user", "Your output has these problems:\n- " + "\n- ".join(problems)
+                 + "\nReturn the corrected JSON array only."),
+            ]
+            response = await llm.ainvoke(repair_prompt, cache=False)
+            modules, problems = parse_modules(response.content)
+        if modules is None:
+            record_parse_failure()
+    except Exception as e:
+        modules, problems = None, [str(e)]
+    if modules is None:
+        # Only this unit is lost; the rest of the roadmap still comes back
+        print(f"  - FAILED to generate modules for '{name}': {' '.join(problems)}")
+        result["error"] = " ".join(problems)
+    else:
+        result["modules"] = modules
+    return {"unit_results": [result]}
+
+
+def merge_roadmap(state):
+    print("NODE: Merging Unit Modules")
+    roadmap, failed = [], []
+    for result in sorted(state.get("unit_results", []), key=lambda result: result["index"]):
+        if "modules" not in result:
+            failed.append(result["unit"])
+            continue
+        # Keep the unit's own week order, then number weeks across the whole course
+        for module in sorted(result["modules"], key=lambda module: module["week"]):
+            roadmap.append({**module, "week": len(roadmap) + 1, "unit": result["unit"]})
+    print(f"SUCCESS: Roadmap Generated ({len(roadmap)} weeks, {len(failed)} units failed)")
+    return {"structured_roadmap": roadmap, "failed_units": failed}
+
+
+@lru_cache(maxsize=None)
+def get_app():
+    """The compiled graph, built on first use."""
+    from langgraph.graph import END
+
+    workflow = state_graph(RoadmapState, "syllabus")
+    workflow.add_node("split_into_units", split_into_units)
+    workflow.add_node("generate_unit_modules", generate_unit_modules)
+    workflow.add_node("merge_roadmap", merge_roadmap)
+    workflow.set_entry_point("split_into_units")
+    workflow.add_conditional_edges("split_into_units", fan_out_units, ["generate_unit_modules", "merge_roadmap"])
+    workflow.add_edge("generate_unit_modules", "merge_roadmap")
+    workflow.add_edge("merge_roadmap", END)
+    return workflow.compile()
+
+
+async def generate_roadmap(text: str) -> Dict[str, Any]:
+    result = await get_app().ainvoke({"syllabus_text": text, "unit_results": []},
+                                       {"max_concurrency": UNIT_CONCURRENCY})
+    return {"structured_roadmap": result["structured_roadmap"], "failed_units": result["failed_units"]}
+
+
+async def process_directory(input_dir: str, output_dir: str, concurrency: int = SYLLABUS_CONCURRENCY) -> Dict[str, str]:
+    """
+    Writes <name>.roadmap.json to `output_dir` for every .txt syllabus in
+    `input_dir`, at most `concurrency` syllabi at a time. Returns a status
+    per file; a syllabus that fails doesn't stop the others.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    names = sorted(name for name in os.listdir(input_dir) if name.endswith(".txt"))
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(name: str) -> str:
+        async with semaphore:
+            try:
+                with open(os.path.join(input_dir, name)) as f:
+                    roadmap = await generate_roadmap(f.read())
+            except Exception as e:
+                print(f"FAILED: '{name}' ({e})")
+                return f"failed: {e}"
+            output_path = os.path.join(output_dir, f"{os.path.splitext(name)[0]}.roadmap.json")
+            with open(output_path, "w") as f:
+                json.dump(roadmap, f, indent=2)
+            weeks, failed = len(roadmap["structured_roadmap"]), len(roadmap["failed_units"])
+            return f"{weeks} weeks" + (f", {failed} units failed" if failed else "")
+
+    statuses = await asyncio.gather(*(one(name) for name in names))
+    return dict(zip(names, statuses))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert syllabi into week-by-week roadmaps.")
+    parser.add_argument("input_dir", nargs="?", help="Directory of .txt syllabi. Defaults to the built-in sample.")
+    parser.add_argument("--output", default="roadmaps", help="Directory to write <name>.roadmap.json files to.")
+    parser.add_argument("--concurrency", type=int, default=SYLLABUS_CONCURRENCY)
+    args = parser.parse_args()
+
+    if args.input_dir:
+        for name, status in asyncio.run(process_directory(args.input_dir, args.output, args.concurrency)).items():
+            print(f"{name}: {status}")
+    else:
+        result = asyncio.run(generate_roadmap(syllabus_text))
+        print("\n--- FINAL STRUCTURED ROADMAP")
+        print(json.dumps(result['structured_roadmap'], indent=2))
@@ -0,0 +1,259 @@
+# tutor_agent.py
+"""
+The RAG tutor from LMS_Tutor_Agents.ipynb, as an importable module.
+
+Course material is indexed offline by tutor_index.py and loaded from
+TUTOR_INDEX_DIR; without a saved index, the built-in sample material is
+embedded in memory. The graph retrieves the closest chunks, decides whether
+they are relevant, and then either answers from them or falls back to a
+general answer.
+
+Relevance is decided from the top retrieval score where that is clear: at
+or above the band it goes straight to generate, below it straight to
+fallback. Only questions inside the band cost an LLM call before the
+answer: the yes/no grader (TUTOR_RELEVANCE_MODE=fast, the default), or one
+call that grades and answers together (combined). "grade" restores the
+grader on every question. tutor_eval.py measures the trade-off.
+
+Answer tokens are written to the LangGraph stream as
+they arrive, so `graph.astream(..., stream_mode="custom")` yields them one
+by one (agent_service.py forwards them to clients over SSE).
+
+    LLM_API_URL=http://127.0.0.1:8002/v1 python tutor_agent.py
+"""
+import asyncio
+import os
+import re
+from contextlib import aclosing
+from functools import lru_cache
+from typing import List, Optional, Tuple, TypedDict
+
+
+from instrumentation import state_graph
+from llm_gateway import get_llm
+from tutor_index import TutorIndex, get_or_build_index
+
+llm = get_llm(temperature=0.0)
+
+RELEVANCE_MODE = os.getenv("TUTOR_RELEVANCE_MODE", "fast")  # "fast", "combined" or "grade"
+# (irrelevant below, relevant at or above) for the top cosine score, per encoder.
+# Recalibrate with `python tutor_eval.py --calibrate` when the material changes;
+# TUTOR_IRRELEVANT_SCORE and TUTOR_RELEVANT_SCORE override them.
+RELEVANCE_BANDS = {"minilm": (0.25, 0.55), "hashed-tfidf": (0.08, 0.19)}
+
+SAMPLE_SYLLABUS_TEXT = """
+Introduction to Photosynthesis
+
+Photosynthesis is the process used by plants, algae, and certain bacteria to convert light energy into chemical energy, through a process that converts carbon dioxide and water into sugars and oxygen. The overall chemical equation for photosynthesis is:
+6CO2 + 6H2O + Light Energy → C6H12O6 + 6O2
+
+Key Components:
+1.  Chlorophyll: This is the green pigment located in chloroplasts that absorbs light energy.
+2.  Chloroplasts: These are the organelles within plant cells where photosynthesis takes place.
+3.  Stomata: These are small pores on the surface of leaves through which carbon dioxide enters and oxygen is released.
+
+Two Main Stages:
+1.  Light-Dependent Reactions: Occur in the thylakoid membranes of chloroplasts. Light energy is captured by chlorophyll and used to split water molecules (photolysis). This produces oxygen (O2), ATP, and NADPH. ATP and NADPH are energy-carrying molecules.
+2.  Light-Independent Reactions (Calvin Cycle): Occur in the stroma of the chloroplasts. These reactions do not directly require light. They use the ATP and NADPH from the light-dependent reactions to convert carbon dioxide into glucose (C6H12O6), a sugar that stores chemical energy.
+"""
+
+_INDEX = None
+
+
+def get_index() -> TutorIndex:
+    global _INDEX
+    if _INDEX is None:
+        _INDEX = get_or_build_index([SAMPLE_SYLLABUS_TEXT])
+    return _INDEX
+
+
+def relevance_band(encoder_name: str) -> Tuple[float, float]:
+    low, high = RELEVANCE_BANDS.get(encoder_name, RELEVANCE_BANDS["minilm"])
+    return float(os.getenv("TUTOR_IRRELEVANT_SCORE", low)), float(os.getenv("TUTOR_RELEVANT_SCORE", high))
+
+
+class GraphState(TypedDict):
+    question: str
+    documents: List[str]
+    scores: List[float]
+    relevant: Optional[bool]  # None until decided, or when the combined call decides
+    relevance: str            # How it was decided: "score", "grader" or "combined"
+    answer: str
+
+
+async def retrieve_documents(state):
+    print("---NODE: Retrieving Documents---")
+    # Embedding the question and scoring the index are CPU work; NumPy (and
+    # the sentence-transformer) release the GIL, so a thread keeps the event loop free
+    results = await asyncio.to_thread(get_index().search_scored, state["question"])
+    return {"documents": [text for text, _ in results], "scores": [score for _, score in results]}
+
+
+async def grade_documents(state):
+    print("---NODE: Grading Documents---")
+    top_score = max(state["scores"], default=0.0)
+    low, high = relevance_band(get_index().encoder.name)
+    if RELEVANCE_MODE != "grade" and (top_score >= high or top_score < low):
+        relevant = top_score >= high
+        print(f"---DECISION: Documents are {'' if relevant else 'NOT '}relevant (score {top_score:.2f})---")
+        return {"relevant": relevant, "relevance": "score"}
+    if RELEVANCE_MODE == "combined":
+        return {"relevant": None, "relevance": "combined"}
+
+    prompt = [
+        ("system", "You are a grader. Your purpose is to determine if the retrieved documents are relevant to the user's question. Respond with 'yes' or 'no' only."),
+        ("user", f"Retrieved Documents:\n\n{state['documents']}\n\nUser Question: {state['question']}"),
+    ]
+    response = await llm.ainvoke(prompt)
+    relevant = "yes" in response.content.lower()
+    print(f"---DECISION: Documents are {'' if relevant else 'NOT '}relevant---")
+    return {"relevant": relevant, "relevance": "grader"}
+
+
+def route_after_grading(state):
+    if state["relevant"] is None:
+        return "grade_and_generate"
+    return "generate" if state["relevant"] else "fallback"
+
+
+async def generate_answer(state):
+    print("---NODE: Generating Answer---")
+    context = "\n\n".join(state["documents"])
+    prompt = f"""You are a helpful AI Tutor for a Learning Management System named BrainFog.
+        Answer the user's question based *only* on the following context. Be concise and clear.
+        If the context does not contain the answer, state that the information is not available in the provided materials.
+
+        Context: {context}
+        Question: {state["question"]}"""
+
+    from langgraph.config import get_stream_writer
+
+    writer = get_stream_writer()
+    answer = await llm.astream_text(prompt, lambda token: writer({"token": token}))
+    print("---SUCCESS: Generated Answer---")
+    return {"answer": answer}
+
+
+RELEVANT_HEADER = re.compile(r"^\s*RELEVANT:\s*(yes|no)\b", re.IGNORECASE)
+HEADER_SEPARATORS = " \t\r\n.,;:-"
+
+
+def route_after_combined(state):
+    from langgraph.graph import END
+
+    if not state["relevant"]:
+        return "fallback"
+    return END if state.get("answer") else "generate"
+
+
+async def grade_and_generate(state):
+    """
+    One call that grades and answers: the reply starts with a "RELEVANT: yes/no"
+    header, and only the answer after it (same line or next) is streamed. On
+    "no" the stream is closed straight away and the graph moves on to the
+    fallback; a "yes" with no answer goes on to generate.
+    """
+    print("---NODE: Grading and Generating Answer---")
+    context = "\n\n".join(state["documents"])
+    prompt = f"""You are a helpful AI Tutor for a Learning Management System named BrainFog.
+        First decide whether the context below is relevant to the user's question, and start your reply with
+        exactly one line: "RELEVANT: yes" or "RELEVANT: no".
+        If it is relevant, answer the question on the following lines based *only* on the context. Be concise and clear.
+        If it is not relevant, stop after that first line.
+
+        Context: {context}
+        Question: {state["question"]}"""
+
+    from langgraph.config import get_stream_writer
+
+    writer = get_stream_writer()
+    header, parts, relevant = "", [], None
+    async with aclosing(llm.astream(prompt)) as tokens:
+        async for token in tokens:
+            if relevant is None:
+                header += token
+                match = RELEVANT_HEADER.match(header)
+                if match and match.end() < len(header):
+                    # The verdict word is complete; the rest, on this line or the next, is answer
+                    relevant = match.group(1).lower() == "yes"
+                    if not relevant:
+                        break
+                    token = header[match.end():].lstrip(HEADER_SEPARATORS)
+                elif not match and "\n" in header.lstrip():
+                    relevant = False  # No header at all; don't trust the reply
+                    break
+                else:
+                    continue
+            if token:
+                writer({"token": token})
+                parts.append(token)
+    if relevant is None:
+        # The stream ended inside or right after the header
+        match = RELEVANT_HEADER.match(header)
+        relevant = bool(match) and match.group(1).lower() == "yes"
+        answer = header[match.end():].lstrip(HEADER_SEPARATORS) if relevant else ""
+        if answer:
+            writer({"token": answer})
+            parts.append(answer)
+    print(f"---DECISION: Documents are {'' if relevant else 'NOT '}relevant---")
+    if not relevant:
+        return {"relevant": False}
+    if not parts:
+        return {"relevant": True}  # A bare "RELEVANT: yes": generate answers from the context
+    print("---SUCCESS: Generated Answer---")
+    return {"relevant": True, "answer": "".join(parts)}
+
+
+async def fallback_answer(state):
+    print("---NODE: Fallback - Answering without context---")
+    prompt = f"""You are a helpful AI Tutor named BrainFog. A document search failed to find relevant information.
+        Answer the user's question generally, but explicitly state that the answer is not from their specific course materials.
+
+        Question: {state["question"]}"""
+
+    from langgraph.config import get_stream_writer
+
+    writer = get_stream_writer()
+    answer = await llm.astream_text(prompt, lambda token: writer({"token": token}))
+    print("---SUCCESS: Generated Fallback Answer---")
+    return {"documents": [], "answer": answer}
+
+
+@lru_cache(maxsize=None)
+def get_app():
+    """The compiled graph, built on first use."""
+    from langgraph.graph import END
+
+    workflow = state_graph(GraphState, "tutor")
+
+    workflow.add_node("retrieve", retrieve_documents)
+    workflow.add_node("grade_documents", grade_documents)
+    workflow.add_node("generate", generate_answer)
+    workflow.add_node("grade_and_generate", grade_and_generate)
+    workflow.add_node("fallback", fallback_answer)
+
+    workflow.set_entry_point("retrieve")
+    workflow.add_edge("retrieve", "grade_documents")
+    workflow.add_conditional_edges(
+        "grade_documents",
+        route_after_grading,
+        {
+            "generate": "generate",
+            "grade_and_generate": "grade_and_generate",
+            "fallback": "fallback",
+        },
+    )
+    workflow.add_conditional_edges("grade_and_generate", route_after_combined, [END, "generate", "fallback"])
+    workflow.add_edge("generate", END)
+    workflow.add_edge("fallback", END)
+
+    return workflow.compile()
+
+
+if __name__ == "__main__":
+    for question in ["What are the two main stages of photosynthesis?",
+                     "Who was the first president of the United States?"]:
+        print(f"--- QUESTION: {question} ---")
+        result = asyncio.run(get_app().ainvoke({"question": question}))
+        print("\n--- FINAL ANSWER ---")
+        print(result["answer"])
@@ -0,0 +1,119 @@
+# tutor_eval.py
+"""
+Eval harness for the tutor's relevance routing (tutor_agent.py).
+
+Runs every labeled question in tutor_eval.jsonl through the tutor graph in
+each relevance mode and reports how often the answer was grounded exactly
+when it should have been, how many LLM calls that took (and saved against
+grading every question), and the p50/p95 latency. --calibrate prints the
+top retrieval scores per label and suggests a relevance band for the
+current encoder.
+
+    LLM_API_URL=http://127.0.0.1:8002/v1 python tutor_eval.py --calibrate
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import time
+from collections import Counter
+from typing import List, Tuple
+
+import tutor_agent
+from llm_gateway import get_gateway
+
+EVAL_FILE = "tutor_eval.jsonl"
+MODES = ["grade", "fast", "combined"]
+
+
+def load_questions(path: str = EVAL_FILE) -> List[Tuple[str, bool]]:
+    with open(path) as f:
+        return [(record["question"], record["relevant"]) for record in map(json.loads, f) if record]
+
+
+def _percentile(values: List[float], p: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(p * len(values)))]
+
+
+def top_score(question: str) -> float:
+    return max((score for _, score in tutor_agent.get_index().search_scored(question)), default=0.0)
+
+
+def calibrate(questions: List[Tuple[str, bool]], target_precision: float = 0.95) -> Tuple[float, float]:
+    """
+    The widest-confidence band: `high` is the lowest score at or above which
+    at least `target_precision` of questions are relevant, `low` the highest
+    score below which at least `target_precision` are irrelevant.
+    """
+    scored = sorted((top_score(question), relevant) for question, relevant in questions)
+    high = scored[-1][0] + 1e-6
+    for i in range(len(scored) - 1, -1, -1):
+        above = scored[i:]
+        if sum(relevant for _, relevant in above) / len(above) >= target_precision:
+            high = scored[i][0]
+    low = scored[0][0]
+    for i in range(1, len(scored) + 1):
+        below = scored[:i]
+        if sum(not relevant for _, relevant in below) / len(below) >= target_precision:
+            low = scored[i][0] if i < len(scored) else high
+    low = min(low, high)
+
+    for label in (True, False):
+        scores = [score for score, relevant in scored if relevant is label]
+        print(f"  {'relevant' if label else 'irrelevant':>10} questions: top score min {min(scores):.3f}, "
+              f"median {_percentile(scores, 0.5):.3f}, max {max(scores):.3f}")
+    print(f"  suggested band for '{tutor_agent.get_index().encoder.name}': irrelevant below {low:.3f}, "
+          f"relevant at or above {high:.3f} ({target_precision:.0%} precision on each side)")
+    return low, high
+
+
+async def run_mode(mode: str, questions: List[Tuple[str, bool]]) -> dict:
+    tutor_agent.RELEVANCE_MODE = mode
+    metrics = get_gateway().metrics
+    # Completed calls and streams, plus combined calls closed early on "RELEVANT: no"
+    calls_before = metrics.calls + metrics.cancelled_streams
+    latencies, correct, sources = [], 0, Counter()
+    for question, relevant in questions:
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):  # The nodes' progress prints
+            result = await tutor_agent.get_app().ainvoke({"question": question})
+        latencies.append(time.perf_counter() - start)
+        correct += bool(result["documents"]) == relevant
+        sources[result.get("relevance", "?")] += 1
+    return {"mode": mode, "accuracy": correct / len(questions),
+            "llm_calls": metrics.calls + metrics.cancelled_streams - calls_before,
+            "p50_seconds": _percentile(latencies, 0.5), "p95_seconds": _percentile(latencies, 0.95),
+            "decided_by": dict(sources)}
+
+
+async def evaluate(questions: List[Tuple[str, bool]], modes: List[str] = MODES) -> List[dict]:
+    # Every mode must pay for its own calls, so the eval runs without the LLM cache
+    get_gateway().cache = None
+    low, high = tutor_agent.relevance_band(tutor_agent.get_index().encoder.name)
+    print(f"{len(questions)} labeled questions, relevance band [{low:.3f}, {high:.3f}), run one at a time:")
+    results = []
+    for mode in modes:
+        result = await run_mode(mode, questions)
+        results.append(result)
+        # Grading every question costs one grader call plus one answer call
+        saved = 1 - result["llm_calls"] / (2 * len(questions))
+        print(f"  {mode:>8}: accuracy {result['accuracy']:6.1%}, {result['llm_calls']:3d} LLM calls "
+              f"({saved:5.1%} saved), p50 {result['p50_seconds'] * 1e3:6.1f}ms, "
+              f"p95 {result['p95_seconds'] * 1e3:6.1f}ms, decided by {result['decided_by']}")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Evaluate the tutor's relevance routing.")
+    parser.add_argument("--questions", default=EVAL_FILE)
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=MODES)
+    parser.add_argument("--calibrate", action="store_true", help="Also suggest a relevance band from the labels.")
+    parser.add_argument("--target-precision", type=float, default=0.95)
+    args = parser.parse_args()
+
+    questions = load_questions(args.questions)
+    if args.calibrate:
+        calibrate(questions, args.target_precision)
+    asyncio.run(evaluate(questions, args.modes))
@@ -0,0 +1,233 @@
+# tutor_index.py
+"""
+Offline course material index for the RAG tutor (tutor_agent.py).
+
+Material is split into chunks and each chunk is keyed by the SHA-256 of its
+text. Re-indexing only embeds chunks whose hash isn't in the index yet, in
+batches, so an unchanged course costs no embedding at all and a new document
+costs only its own chunks. Vectors are saved as one float32 matrix and loaded
+memory-mapped, so a cold start reads the index instead of rebuilding it.
+Question embeddings are kept in an LRU cache per loaded index.
+
+    python tutor_index.py course_materials/          # index (or re-sync) a directory
+    python tutor_index.py --add new_chapter.md       # embed one more document
+"""
+import argparse
+import hashlib
+import json
+import os
+import re
+import time
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from job_embeddings import HashedTfidfEncoder, MiniLMEncoder, load_encoder, save_array, save_json
+
+INDEX_DIR = os.getenv("TUTOR_INDEX_DIR", "tutor_index")
+EMBED_BATCH_SIZE = 64
+QUESTION_CACHE_SIZE = int(os.getenv("TUTOR_QUESTION_CACHE_SIZE", "1024"))
+
+
+def split_text(text: str, chunk_size: int = 500, chunk_overlap: int = 50) -> List[str]:
+    """Packs paragraphs into chunks of up to `chunk_size` characters; longer paragraphs are cut with overlap."""
+    chunks, current = [], ""
+    for paragraph in re.split(r"\n\s*\n", text.strip()):
+        paragraph = paragraph.strip()
+        while len(paragraph) > chunk_size:
+            cut = paragraph.rfind(" ", 0, chunk_size)
+            cut = cut if cut > chunk_overlap else chunk_size
+            chunks.append(paragraph[:cut].strip())
+            paragraph = paragraph[max(0, cut - chunk_overlap):]
+        if current and len(current) + len(paragraph) + 2 > chunk_size:
+            chunks.append(current)
+            current = ""
+        current = f"{current}\n\n{paragraph}" if current else paragraph
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def chunk_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def index_paths(index_dir: str) -> dict:
+    return {
+        "matrix": os.path.join(index_dir, "vectors.npy"),
+        "chunks": os.path.join(index_dir, "chunks.json"),
+        "idf": os.path.join(index_dir, "idf.npy"),
+        "meta": os.path.join(index_dir, "meta.json"),
+    }
+
+
+class TutorIndex:
+    """Course material chunks ({"hash", "source", "text"}) and their normalized embeddings."""
+
+    def __init__(self, chunks: List[dict], matrix: np.ndarray, encoder):
+        self.chunks = chunks
+        self.matrix = matrix
+        self.encoder = encoder
+        self.rows = {chunk["hash"]: row for row, chunk in enumerate(chunks)}
+        # Per index, so a reloaded index never serves vectors from another encoder
+        self.question_vector = lru_cache(maxsize=QUESTION_CACHE_SIZE)(self._encode_question)
+
+    @classmethod
+    def from_texts(cls, texts: List[str], encoder=None) -> "TutorIndex":
+        """An in-memory index, embedded from scratch."""
+        chunks, seen = [], set()
+        for number, text in enumerate(texts):
+            for chunk in split_text(text):
+                digest = chunk_hash(chunk)
+                if digest not in seen:
+                    seen.add(digest)
+                    chunks.append({"hash": digest, "source": f"text-{number}", "text": chunk})
+        texts = [chunk["text"] for chunk in chunks]
+        # MiniLM as in the notebook when it's installed, otherwise hashed TF-IDF fitted on the chunks
+        encoder = encoder or load_encoder() or HashedTfidfEncoder.fit(texts)
+        return cls(chunks, encoder.encode(texts), encoder)
+
+    @classmethod
+    def load(cls, index_dir: str = INDEX_DIR) -> "TutorIndex":
+        """Raises FileNotFoundError if the directory hasn't been indexed."""
+        paths = index_paths(index_dir)
+        with open(paths["meta"]) as f:
+            meta = json.load(f)
+        with open(paths["chunks"]) as f:
+            chunks = json.load(f)
+        encoder = (HashedTfidfEncoder(np.load(paths["idf"])) if meta["encoder"] == HashedTfidfEncoder.name
+                   else MiniLMEncoder())
+        return cls(chunks, np.load(paths["matrix"], mmap_mode="r"), encoder)
+
+    def save(self, index_dir: str = INDEX_DIR):
+        paths = index_paths(index_dir)
+        os.makedirs(index_dir, exist_ok=True)
+        save_array(paths["matrix"], np.ascontiguousarray(self.matrix, dtype=np.float32))
+        if isinstance(self.encoder, HashedTfidfEncoder):
+            save_array(paths["idf"], self.encoder.idf)
+        save_json(paths["chunks"], self.chunks)
+        # Written last: an index without meta.json doesn't load
+        save_json(paths["meta"], {"encoder": self.encoder.name, "dim": int(self.matrix.shape[1]),
+                                  "num_chunks": len(self.chunks)})
+
+    def __len__(self) -> int:
+        return len(self.chunks)
+
+    def _encode_question(self, question: str) -> np.ndarray:
+        vector = self.encoder.encode([question])[0]
+        vector.setflags(write=False)  # Shared by every caller that hits the cache
+        return vector
+
+    def search_scored(self, question: str, top_k: int = 4) -> List[Tuple[str, float]]:
+        """(chunk text, cosine similarity) for the `top_k` closest chunks, best first."""
+        if not self.chunks:
+            return []
+        scores = self.matrix @ self.question_vector(question.strip())
+        k = min(top_k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        return [(self.chunks[row]["text"], float(scores[row])) for row in top[np.argsort(-scores[top])]]
+
+    def search(self, question: str, top_k: int = 4) -> List[str]:
+        return [text for text, _ in self.search_scored(question, top_k)]
+
+    def update(self, documents: Dict[str, str], prune: bool = False) -> Tuple["TutorIndex", int]:
+        """
+        A new index with `documents` ({source: text}) re-split and re-indexed,
+        and how many chunks had to be embedded. Chunks already in this index
+        reuse their vectors. Other sources are kept unless `prune` is set.
+        """
+        chunks, seen = [], set()
+        if not prune:
+            for chunk in self.chunks:
+                if chunk["source"] not in documents:
+                    chunks.append(chunk)
+                    seen.add(chunk["hash"])
+        for source, text in documents.items():
+            for piece in split_text(text):
+                digest = chunk_hash(piece)
+                if digest not in seen:
+                    seen.add(digest)
+                    chunks.append({"hash": digest, "source": source, "text": piece})
+
+        missing = [row for row, chunk in enumerate(chunks) if chunk["hash"] not in self.rows]
+        matrix = np.empty((len(chunks), self.matrix.shape[1]), dtype=np.float32)
+        known = [row for row, chunk in enumerate(chunks) if chunk["hash"] in self.rows]
+        if known:
+            matrix[known] = self.matrix[[self.rows[chunks[row]["hash"]] for row in known]]
+        for start in range(0, len(missing), EMBED_BATCH_SIZE):
+            batch = missing[start:start + EMBED_BATCH_SIZE]
+            matrix[batch] = self.encoder.encode([chunks[row]["text"] for row in batch])
+        return TutorIndex(chunks, matrix, self.encoder), len(missing)
+
+
+def load_documents(path: str) -> Dict[str, str]:
+    """A single text file, or every .txt/.md file in a directory (sorted by name), keyed by file name."""
+    if os.path.isfile(path):
+        with open(path) as f:
+            return {os.path.basename(path): f.read()}
+    documents = {}
+    for name in sorted(os.listdir(path)):
+        if name.endswith((".txt", ".md")):
+            with open(os.path.join(path, name)) as f:
+                documents[name] = f.read()
+    return documents
+
+
+def index_documents(documents: Dict[str, str], index_dir: str = INDEX_DIR, prune: bool = True,
+                    encoder: str = "auto", rebuild: bool = False) -> Tuple[TutorIndex, int]:
+    """
+    Brings the index in `index_dir` up to date with `documents` and saves it.
+    `prune` drops sources that aren't in `documents` (a directory sync);
+    without it the documents are added to what's indexed. The encoder is
+    chosen when the index is first built and kept until `rebuild`.
+    """
+    existing = None
+    if not rebuild:
+        try:
+            existing = TutorIndex.load(index_dir)
+        except FileNotFoundError:
+            pass
+    if existing is None:
+        texts = [chunk for text in documents.values() for chunk in split_text(text)]
+        # The hashed fallback's IDF is fitted once here; later documents reuse it
+        # so that vectors already in the index stay comparable
+        model = load_encoder(encoder) or HashedTfidfEncoder.fit(texts)
+        existing = TutorIndex([], np.empty((0, getattr(model, "dim", 384)), dtype=np.float32), model)
+    index, embedded = existing.update(documents, prune)
+    index.save(index_dir)
+    return index, embedded
+
+
+def get_or_build_index(texts: List[str], index_dir: Optional[str] = INDEX_DIR) -> TutorIndex:
+    """The saved index if there is one, otherwise an in-memory one over `texts`."""
+    if index_dir:
+        try:
+            return TutorIndex.load(index_dir)
+        except FileNotFoundError:
+            print(f"No tutor index in '{index_dir}'. Run 'tutor_index.py <materials>' to build one. "
+                  f"Embedding the built-in material in memory.")
+    return TutorIndex.from_texts(texts)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Index course material for the RAG tutor.")
+    parser.add_argument("path", nargs="?", help="A directory of .txt/.md material (or one file) to sync the index to.")
+    parser.add_argument("--add", nargs="+", default=None, help="Add (or update) these files without pruning others.")
+    parser.add_argument("--index-dir", default=INDEX_DIR)
+    parser.add_argument("--encoder", choices=["auto", MiniLMEncoder.name, HashedTfidfEncoder.name], default="auto")
+    parser.add_argument("--rebuild", action="store_true", help="Ignore the saved index and embed everything again.")
+    args = parser.parse_args()
+    if not args.path and not args.add:
+        parser.error("give a material directory or --add files")
+
+    start = time.perf_counter()
+    if args.add:
+        documents = {}
+        for path in args.add:
+            documents.update(load_documents(path))
+        index, embedded = index_documents(documents, args.index_dir, False, args.encoder, args.rebuild)
+    else:
+        index, embedded = index_documents(load_documents(args.path), args.index_dir, True, args.encoder, args.rebuild)
+    print(f"Indexed {len(index)} chunks with the '{index.encoder.name}' encoder into '{args.index_dir}': "
+          f"{embedded} embedded, {len(index) - embedded} reused ({time.perf_counter() - start:.2f}s).")
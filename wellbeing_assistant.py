@@ -1,15 +1,18 @@
 import os
 import json
-from langchain_groq import ChatGroq
-from langgraph.graph import END, StateGraph
+import asyncio
+from functools import lru_cache
 from typing import TypedDict, Literal
 
 from dotenv import load_dotenv
 
+from instrumentation import state_graph
+from llm_gateway import get_llm
+
 
 load_dotenv()
 
-llm = ChatGroq(temperature=0.8, model_name="openai/gpt-oss-120b")
+llm = get_llm(temperature=0.8)
 
 Intent = Literal["stress", "time_management", "motivation", "general_query"]
 
@@ -18,34 +21,20 @@ class WellbeingState(TypedDict):
     classified_intent: Intent
     agent_response: str
 
-def classify_intent(state):
+async def classify_intent(state):
     print("---NODE: Classifying Intent---")
     student_input = state["student_input"]
+    from intent_classifier import aclassify  # NumPy and the model load on the first message
 
-    prompt = f"""
-    You are an expert at classifying the intent of a student's message in a wellbeing context.
-    Based on the user's message, classify it into one of the following categories:
-    - stress (feeling overwhelmed, anxious about exams, pressure)
-    - time_management (procrastinating, struggling to balance work, feeling disorganized)
-    - motivation (feeling down, lack of drive, feeling stuck)
-    - general_query (a simple question or greeting)
-
-    Respond with ONLY the category name.
-
-    User Message: "{student_input}"
-    Classification:
-    """
+    # Rules and the local model answer confident cases in well under a
+    # millisecond; only the rest costs an LLM round-trip
+    prediction = await aclassify(student_input, llm)
+    intent = prediction.label
 
-    response = llm.invoke(prompt)
-    intent = response.content.strip().lower()
-
-    if intent not in ["stress", "time_management", "motivation", "general_query"]:
-        intent = "general_query"
-
-    print(f"  - Classified Intent: {intent}")
+    print(f"  - Classified Intent: {intent} ({prediction.source}, {prediction.confidence:.2f})")
     return {"classified_intent": intent}
 
-def generate_strategy_response(state):
+async def generate_strategy_response(state):
     print("---NODE: Generating Strategy Response---")
     student_input = state["student_input"]
     intent = state["classified_intent"]
@@ -67,32 +56,42 @@ def generate_strategy_response(state):
     Keep your response concise (2-4 sentences). End by gently reassuring them that this conversation is a private and safe space.
     """
 
-    response = llm.invoke(prompt)
-    print(f"  - Generated Response: {response.content}")
-    return {"agent_response": response.content}
+    from langgraph.config import get_stream_writer
+
+    # Tokens go to the graph's custom stream as they arrive (see agent_service.py)
+    writer = get_stream_writer()
+    response = await llm.astream_text(prompt, lambda token: writer({"token": token}))
+    print(f"  - Generated Response: {response}")
+    return {"agent_response": response}
+
 
+@lru_cache(maxsize=None)
+def get_app():
+    """The compiled graph, built on first use."""
+    from langgraph.graph import END
 
-workflow = StateGraph(WellbeingState)
+    workflow = state_graph(WellbeingState, "wellbeing")
 
-workflow.add_node("classify_intent", classify_intent)
-workflow.add_node("generate_strategy_response", generate_strategy_response)
+    workflow.add_node("classify_intent", classify_intent)
+    workflow.add_node("generate_strategy_response", generate_strategy_response)
 
-workflow.set_entry_point("classify_intent")
-workflow.add_edge("classify_intent", "generate_strategy_response")
-workflow.add_edge("generate_strategy_response", END)
+    workflow.set_entry_point("classify_intent")
+    workflow.add_edge("classify_intent", "generate_strategy_response")
+    workflow.add_edge("generate_strategy_response", END)
 
-app = workflow.compile()
+    return workflow.compile()
 
 def run_test(student_input):
     print(f"RUNNING TEST")
     print(f"Student Input: '{student_input}'")
     inputs = {"student_input": student_input}
-    result = app.invoke(inputs)
+    result = asyncio.run(get_app().ainvoke(inputs))
     print("\nFinal Response")
     print(result['agent_response'])
 
-# test Cases
-run_test("I have so many exams coming up, I'm freaking out and can't focus.") # 'stress'
-run_test("I know I need to study for my history final but I just can't get started.") #'time_management' or 'motivation'
-run_test("hey")
-run_test("I'm feeling like giving up") 
\ No newline at end of file
+if __name__ == "__main__":
+    # test Cases
+    run_test("I have so many exams coming up, I'm freaking out and can't focus.") # 'stress'
+    run_test("I know I need to study for my history final but I just can't get started.") #'time_management' or 'motivation'
+    run_test("hey")
+    run_test("I'm feeling like giving up") 
\ No newline at end of file